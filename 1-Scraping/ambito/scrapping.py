@@ -1,13 +1,47 @@
+"""
+Scraper asincrónico de Ámbito por secciones.
+
+Pipeline productor/consumidor:
+- por cada sección, un productor pide las páginas de listado `/{seccion}/{index}`
+  con `--prefetch` páginas por adelantado (en orden);
+- las URLs nuevas van a una cola acotada que consumen `--concurrency` workers;
+- cuando una página de listado termina de procesarse se guarda y, si su primera
+  noticia es anterior a `--desde`, esa sección deja de pedir páginas;
+- el parseo del HTML (CPU) corre en un pool de procesos (`--parse-pool`) para no
+  bloquear el event loop; al final se reporta tiempo de red vs. de parseo;
+- las notas se guardan en un dataset particionado por mes (`noticias_ambito/mes=YYYY-MM/`)
+  que se compacta al final de cada corrida (ver ../dataset_store.py);
+- cada request y cada parseo quedan en la telemetría (../telemetria.py): progreso periódico
+  (el objetivo crece con cada listado), textfile de Prometheus (`--metricas`) y traza JSONL (`--traza`).
+
+Uso:
+  python scrapping.py --secciones economia politica opinion --concurrency 16 --prefetch 3 \
+    --parser lxml --parse-pool process --metricas ambito.prom --traza ambito.trace.jsonl
+"""
+
+import argparse
 import asyncio
 import aiohttp
 from bs4 import BeautifulSoup
 import pandas as pd
 import re
-import shutil
-from datetime import datetime
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
 
-SECCION = "opinion"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from dataset_store import PartitionedStore  # noqa: E402
+from fechas import TZ, parse_fecha_es  # noqa: E402
+from telemetria import TELEMETRIA, configurar  # noqa: E402
+
+SECCIONES = ["economia", "politica", "opinion"]
 
 
 # --- Helpers ---
@@ -15,39 +49,6 @@ def clean_text(text):
     return re.sub(r"\s+", " ", text).strip()
 
 
-meses = {
-    "enero": "01",
-    "febrero": "02",
-    "marzo": "03",
-    "abril": "04",
-    "mayo": "05",
-    "junio": "06",
-    "julio": "07",
-    "agosto": "08",
-    "septiembre": "09",
-    "octubre": "10",
-    "noviembre": "11",
-    "diciembre": "12",
-}
-
-
-def parse_fecha(fecha):
-    if not isinstance(fecha, str):
-        return fecha
-    fecha_str = fecha.lower()
-    for mes, num in meses.items():
-        if mes in fecha_str:
-            fecha_str = fecha_str.replace(mes, num)
-            break
-    fecha_str = re.sub(r"\bde\b", "", fecha_str)
-    fecha_str = fecha_str.replace("-", "").strip()
-    try:
-        return pd.to_datetime(fecha_str, format="%d %m %Y %H:%M")
-    except:
-        print(f"Error al parsear la fecha: {fecha}")
-        return fecha
-
-
 headers = {
     "User-Agent": (
         "Mozilla/5.0 (X11; Linux x86_64) "
@@ -58,116 +59,335 @@ headers = {
 }
 
 # --- Archivos ---
+# Dataset particionado por mes (ver ../dataset_store.py): noticias_ambito/mes=YYYY-MM/part-*.parquet
 script_dir = Path(__file__).parent
-backup_dir = script_dir / "backups"
-backup_dir.mkdir(exist_ok=True)
+dataset_dir = script_dir / "noticias_ambito"
+legacy_parquet = script_dir / "noticias_ambito.parquet"  # formato anterior (un solo archivo)
 
-parquet_file = script_dir / "noticias_ambito.parquet"
+AMBITO_SCHEMA = pa.schema([
+    ("fecha", pa.timestamp("us", tz=TZ)),
+    ("titulo", pa.string()),
+    ("resumen", pa.string()),
+    ("articulo", pa.string()),
+    ("url", pa.string()),
+    ("seccion", pa.string()),
+])
 
-if parquet_file.exists():
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_file = backup_dir / f"noticias_ambito_backup_{timestamp}.parquet"
-    shutil.copy(parquet_file, backup_file)
-    print(f"Backup creado en: {backup_file}")
+store = PartitionedStore(dataset_dir, AMBITO_SCHEMA)
+urls_guardadas = set()
 
-try:
-    df_url = pd.read_parquet(parquet_file, columns=["url"])
-    urls_guardadas = set(df_url["url"].values)
-except FileNotFoundError:
-    df = pd.DataFrame(columns=["fecha", "titulo", "resumen", "articulo", "url"])
-    df.to_parquet(parquet_file, index=False, engine="fastparquet")
-    urls_guardadas = set()
 
+def preparar_archivos(keep_snapshots=10):
+    """Snapshot del dataset (manifiesto + hardlinks) y carga de las URLs ya guardadas."""
+    if not store.exists() and legacy_parquet.exists():
+        print(f"Migrando {legacy_parquet.name} al dataset particionado {dataset_dir.name}/ ...")
+        for batch in pq.ParquetFile(legacy_parquet).iter_batches(batch_size=20_000):
+            store.append(batch.to_pandas())
+        store.compact()
 
-# --- Función async para scrapear una noticia ---
-async def fetch_noticia(session, url_nota):
+    snap = store.snapshot(keep=keep_snapshots)
+    if snap:
+        print(f"Snapshot creado en: {snap}")
+
+    urls_guardadas.update(store.read(columns=["url"])["url"].values)
+
+
+def guardar(noticias):
+    store.append(noticias)
+
+
+# --- Extracción (CPU): funciones puras, se ejecutan fuera del event loop ---
+def extraer_noticia(html, url_nota, seccion, parser="html.parser"):
+    """Parsea el HTML de una nota. Devuelve (noticia o None, segundos de parseo)."""
+    t0 = time.perf_counter()
+    soup_nota = BeautifulSoup(html, parser)
+
+    # Saltar notas en vivo
+    if soup_nota.find("span", class_="news-headline-lbp__live-badge"):
+        return None, time.perf_counter() - t0
+
+    titulo_tag = soup_nota.find("h1", class_="news-headline__title")
+    titulo = titulo_tag.get_text(strip=True) if titulo_tag else "No encontrado"
+
+    fecha_tag = soup_nota.find("span", class_="news-headline__publication-date")
+    fecha = fecha_tag.get_text(strip=True) if fecha_tag else "No encontrada"
+
+    summary_tag = soup_nota.find("h2", class_="news-headline__article-summary")
+    summary = summary_tag.get_text() if summary_tag else "No encontrado"
+
+    article_body_tags = soup_nota.find_all("article", class_="article-body")
+    article_body = (
+        " ".join(tag.get_text() for tag in article_body_tags)
+        if article_body_tags
+        else "No encontrado"
+    )
+
+    noticia = {
+        "fecha": fecha,  # texto crudo; se parsea vectorizado por página (fechas.parse_fecha_es)
+        "titulo": clean_text(titulo),
+        "resumen": clean_text(summary),
+        "articulo": clean_text(article_body),
+        "url": url_nota,
+        "seccion": seccion,
+    }
+    return noticia, time.perf_counter() - t0
+
+
+def extraer_listado(html, parser="html.parser"):
+    """URLs de notas de una página de listado. Devuelve (urls, segundos de parseo)."""
+    t0 = time.perf_counter()
+    soup = BeautifulSoup(html, parser)
+    urls = []
+    for art in soup.find_all("article", class_="news-article"):
+        a_tag = art.find("a", href=True)
+        if a_tag:
+            urls.append(a_tag["href"])
+    return urls, time.perf_counter() - t0
+
+
+@dataclass
+class Tiempos:
+    """Tiempo acumulado de red vs. parseo (suma sobre requests concurrentes)."""
+    red: float = 0.0
+    parseo: float = 0.0
+    notas: int = 0
+    listados: int = 0
+
+    def resumen(self, wall):
+        n = max(1, self.notas + self.listados)
+        return (
+            f"{self.notas} notas + {self.listados} listados en {wall:.1f}s "
+            f"({self.notas / wall if wall else 0:.1f} notas/s) | "
+            f"red: {1000 * self.red / n:.0f} ms/pág (total {self.red:.1f}s) | "
+            f"parseo: {1000 * self.parseo / n:.0f} ms/pág (total {self.parseo:.1f}s)"
+        )
+
+
+class Parser:
+    """Despacha la extracción a un pool (procesos o threads) o la corre inline."""
+
+    def __init__(self, backend="html.parser", pool="process", workers=None):
+        self.backend = backend
+        if pool == "process":
+            self.executor = ProcessPoolExecutor(max_workers=workers)
+        elif pool == "thread":
+            self.executor = ThreadPoolExecutor(max_workers=workers)
+        else:
+            self.executor = None
+        self.tiempos = Tiempos()
+
+    async def run(self, fn, *args):
+        if self.executor is None:
+            resultado, segundos = fn(*args, self.backend)
+        else:
+            loop = asyncio.get_running_loop()
+            resultado, segundos = await loop.run_in_executor(self.executor, fn, *args, self.backend)
+        self.tiempos.parseo += segundos
+        TELEMETRIA.observar_span(fn.__name__, segundos)
+        return resultado
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+async def descargar(session, url, tiempos):
+    """GET de una página; devuelve el HTML (None si status != 200) y suma el tiempo de red."""
+    t0 = time.perf_counter()
+    status = nbytes = error = None
     try:
-        async with session.get(url_nota, headers=headers) as resp:
+        async with session.get(url, headers=headers) as resp:
+            status = resp.status
             if resp.status != 200:
+                print(f"Error {resp.status} en {url}")
                 return None
+            nbytes = len(await resp.read())  # queda cacheado: text() no vuelve a leer
+            return await resp.text()
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        segundos = time.perf_counter() - t0
+        tiempos.red += segundos
+        if status is not None or error is not None:  # una tarea cancelada no cuenta como request
+            TELEMETRIA.request(url, status, segundos, nbytes=nbytes, error=error)
 
-            html = await resp.text()
-            soup_nota = BeautifulSoup(html, "html.parser")
-
-            # Saltar notas en vivo
-            if soup_nota.find("span", class_="news-headline-lbp__live-badge"):
-                return None
 
-            titulo_tag = soup_nota.find("h1", class_="news-headline__title")
-            titulo = titulo_tag.get_text(strip=True) if titulo_tag else "No encontrado"
-
-            fecha_tag = soup_nota.find("span", class_="news-headline__publication-date")
-            fecha = fecha_tag.get_text(strip=True) if fecha_tag else "No encontrada"
-
-            summary_tag = soup_nota.find("h2", class_="news-headline__article-summary")
-            summary = summary_tag.get_text() if summary_tag else "No encontrado"
-
-            article_body_tags = soup_nota.find_all("article", class_="article-body")
-            article_body = (
-                " ".join(tag.get_text() for tag in article_body_tags)
-                if article_body_tags
-                else "No encontrado"
-            )
-
-            return {
-                "fecha": parse_fecha(fecha),
-                "titulo": clean_text(titulo),
-                "resumen": clean_text(summary),
-                "articulo": clean_text(article_body),
-                "url": url_nota,
-                "seccion": SECCION,
-            }
+# --- Función async para scrapear una noticia ---
+async def fetch_noticia(session, url_nota, seccion, parser):
+    try:
+        html = await descargar(session, url_nota, parser.tiempos)
+        if html is None:
+            return None
+        parser.tiempos.notas += 1
+        return await parser.run(extraer_noticia, html, url_nota, seccion)
     except Exception as e:
         print(f"Error en {url_nota}: {e}")
+        TELEMETRIA.error("noticia", url=url_nota, error=str(e))
         return None
+    finally:
+        TELEMETRIA.avance()
 
 
-# --- Main ---
-async def main():
-    async with aiohttp.ClientSession() as session:
-        for index in range(1, 1000):
-            url = f"https://www.ambito.com/{SECCION}/{index}"
-            resp = await session.get(url, headers=headers)
-            if resp.status != 200:
-                print(f"Error {resp.status} en la página {url}")
-                continue
+# --- Listados ---
+async def fetch_listado(session, seccion, index, parser):
+    """Devuelve las URLs de notas de una página de listado (None si falló)."""
+    url = f"https://www.ambito.com/{seccion}/{index}"
+    try:
+        html = await descargar(session, url, parser.tiempos)
+        if html is None:
+            return None
+        parser.tiempos.listados += 1
+        return await parser.run(extraer_listado, html)
+    except Exception as e:
+        print(f"Error en la página {url}: {e}")
+        TELEMETRIA.error("listado", url=url, error=str(e))
+        return None
+
+
+@dataclass
+class Pagina:
+    """Una página de listado en vuelo: se guarda cuando terminan todas sus notas."""
+    seccion: str
+    index: int
+    resultados: List[Optional[dict]]
+    pendientes: int = field(init=False)
+
+    def __post_init__(self):
+        self.pendientes = len(self.resultados)
 
-            html = await resp.text()
-            soup = BeautifulSoup(html, "html.parser")
-            articulos = soup.find_all("article", class_="news-article")
+
+class Crawler:
+    def __init__(self, session, secciones, parser, concurrency=16, prefetch=3, max_paginas=999,
+                 desde="2025-01-01"):
+        self.session = session
+        self.parser = parser
+        self.secciones = secciones
+        self.concurrency = concurrency
+        self.prefetch = max(1, prefetch)
+        self.max_paginas = max_paginas
+        self.desde = pd.Timestamp(desde).tz_localize(TZ)
+        # cola acotada: los productores se frenan si los workers no dan abasto
+        self.cola = asyncio.Queue(maxsize=concurrency * 4)
+        self.stop = {s: asyncio.Event() for s in secciones}
+
+    # --- productor: listados de una sección, `prefetch` páginas por adelantado ---
+    async def producir(self, seccion):
+        en_vuelo = deque()
+        siguiente = 1
+        while True:
+            while (not self.stop[seccion].is_set() and siguiente <= self.max_paginas
+                   and len(en_vuelo) < self.prefetch):
+                tarea = asyncio.create_task(fetch_listado(self.session, seccion, siguiente, self.parser))
+                en_vuelo.append((siguiente, tarea))
+                siguiente += 1
+            if not en_vuelo:
+                break
+            index, tarea = en_vuelo.popleft()
+            urls = await tarea
+            if urls is None or self.stop[seccion].is_set():
+                continue
 
             # Juntar todas las URLs nuevas
             urls_nuevas = []
-            for art in articulos:
-                a_tag = art.find("a", href=True)
-                if not a_tag:
-                    continue
-                url_nota = a_tag["href"]
+            for url_nota in urls:
                 if url_nota not in urls_guardadas:
                     urls_nuevas.append(url_nota)
                     urls_guardadas.add(url_nota)
 
-            # Pedir todas las noticias en paralelo
-            tasks = [fetch_noticia(session, url) for url in urls_nuevas]
-            resultados = await asyncio.gather(*tasks)
-
-            noticias = [r for r in resultados if r is not None]
-            if noticias:
-                pd.DataFrame(noticias).to_parquet(
-                    parquet_file,
-                    index=False,
-                    engine="fastparquet",
-                    append=True,
-                )
-                print(
-                    f"Página {index} -> {len(noticias)} noticias nuevas - Fecha: {noticias[0]['fecha']} - Total: {len(urls_guardadas)}"
-                )
-                if noticias[0]["fecha"] < pd.to_datetime("2025-01-01"):
-                    print("Noticias anteriores a 2025, deteniendo el scrapping.")
-                    break
-            else:
-                print(f"Página {index} -> 0 noticias nuevas")
+            TELEMETRIA.objetivo(len(urls_nuevas))
+            pagina = Pagina(seccion, index, [None] * len(urls_nuevas))
+            if not urls_nuevas:
+                self.pagina_completa(pagina)
+            for pos, url_nota in enumerate(urls_nuevas):
+                await self.cola.put((pagina, pos, url_nota))
+
+        for _, tarea in en_vuelo:
+            tarea.cancel()
+
+    # --- consumidores: notas con concurrencia fija ---
+    async def worker(self):
+        while True:
+            pagina, pos, url_nota = await self.cola.get()
+            try:
+                pagina.resultados[pos] = await fetch_noticia(self.session, url_nota, pagina.seccion, self.parser)
+            finally:
+                pagina.pendientes -= 1
+                self.cola.task_done()
+            if pagina.pendientes == 0:
+                try:
+                    self.pagina_completa(pagina)
+                except Exception as e:
+                    print(f"[{pagina.seccion}] Error guardando la página {pagina.index}: {e}")
+
+    def pagina_completa(self, pagina):
+        noticias = [r for r in pagina.resultados if r is not None]
+        if not noticias:
+            print(f"[{pagina.seccion}] Página {pagina.index} -> 0 noticias nuevas")
+            return
+        textos = [n["fecha"] for n in noticias]
+        for n, f, texto in zip(noticias, parse_fecha_es(textos), textos):
+            if pd.isna(f):
+                print(f"Error al parsear la fecha: {texto}")
+            n["fecha"] = f
+        guardar(noticias)
+        print(
+            f"[{pagina.seccion}] Página {pagina.index} -> {len(noticias)} noticias nuevas - "
+            f"Fecha: {noticias[0]['fecha']} - Total: {len(urls_guardadas)}"
+        )
+        fecha = noticias[0]["fecha"]
+        if isinstance(fecha, pd.Timestamp) and fecha < self.desde and not self.stop[pagina.seccion].is_set():
+            print(f"[{pagina.seccion}] Noticias anteriores a {self.desde.date()}, deteniendo la sección.")
+            self.stop[pagina.seccion].set()
+
+    async def run(self):
+        workers = [asyncio.create_task(self.worker()) for _ in range(self.concurrency)]
+        await asyncio.gather(*(self.producir(s) for s in self.secciones))
+        await self.cola.join()
+        for w in workers:
+            w.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+# --- Main ---
+async def main(secciones=SECCIONES, concurrency=16, prefetch=3, max_paginas=999, desde="2025-01-01",
+               parser="html.parser", parse_pool="process", parse_workers=None, metricas=None, traza=None,
+               progreso_cada=10.0):
+    preparar_archivos()
+    tel = configurar("ambito", metricas=metricas, traza=traza, cada=progreso_cada, unidad="notas")
+    parser = Parser(parser, pool=parse_pool, workers=parse_workers)
+    connector = aiohttp.TCPConnector(limit=concurrency + prefetch * len(secciones))
+    t0 = time.perf_counter()
+    try:
+        async with aiohttp.ClientSession(connector=connector) as session:
+            crawler = Crawler(session, secciones, parser, concurrency=concurrency, prefetch=prefetch,
+                              max_paginas=max_paginas, desde=desde)
+            await crawler.run()
+    finally:
+        parser.close()
+        print(f"[Tiempos] {parser.tiempos.resumen(time.perf_counter() - t0)}")
+        tel.cerrar()
+        # un archivo por página y por mes -> se unen en row groups grandes al terminar
+        store.compact()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    ap = argparse.ArgumentParser(description="Scraper asincrónico de Ámbito por secciones.")
+    ap.add_argument("--secciones", nargs="+", default=SECCIONES, help="Secciones a recorrer en paralelo")
+    ap.add_argument("--concurrency", type=int, default=16, help="Notas descargándose a la vez (default 16)")
+    ap.add_argument("--prefetch", type=int, default=3, help="Páginas de listado pedidas por adelantado")
+    ap.add_argument("--max-paginas", type=int, default=999, help="Última página de listado a recorrer")
+    ap.add_argument("--desde", default="2025-01-01", help="Detener cada sección al llegar a esta fecha")
+    ap.add_argument("--parser", default="html.parser", choices=["html.parser", "lxml"],
+                    help="Backend de BeautifulSoup (lxml es bastante más rápido)")
+    ap.add_argument("--parse-pool", default="process", choices=["process", "thread", "inline"],
+                    help="Dónde parsear el HTML: pool de procesos (default), threads o en el event loop")
+    ap.add_argument("--parse-workers", type=int, default=None, help="Workers del pool de parseo (default: #cores)")
+    ap.add_argument("--metricas", default=None, help="Textfile de Prometheus (se reescribe periódicamente)")
+    ap.add_argument("--traza", default=None, help="Traza JSONL con cada request, parseo y error")
+    ap.add_argument("--progreso-cada", type=float, default=10.0,
+                    help="Segundos entre líneas de progreso / exportaciones (0 = solo al final)")
+    args = ap.parse_args()
+    asyncio.run(main(args.secciones, args.concurrency, args.prefetch, args.max_paginas, args.desde,
+                     args.parser, args.parse_pool, args.parse_workers, args.metricas, args.traza,
+                     args.progreso_cada))
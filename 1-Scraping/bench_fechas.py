@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de normalización de fechas: funciones anteriores fila por fila
+(`parse_fecha` de Ámbito, `normalize_dt` de RSS con dateutil, `solo_fecha` de la
+consolidación) vs. los parsers vectorizados de `fechas.py`.
+
+Genera datos sintéticos con los formatos de cada fuente, mide el mejor tiempo de N
+repeticiones y verifica que ambos caminos den las mismas fechas. No toca la red.
+
+Uso:
+  python bench_fechas.py
+  python bench_fechas.py --n 200000 --repeat 5
+"""
+
+import argparse
+import random
+import re
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytz
+from dateutil import parser as dateparser
+
+from fechas import MESES_ES, TZ, a_dia, parse_fecha_es, parse_iso, parse_rfc822
+
+LOCAL_TZ = pytz.timezone(TZ)
+MESES = ["enero", "febrero", "marzo", "abril", "mayo", "junio", "julio", "agosto",
+         "septiembre", "octubre", "noviembre", "diciembre"]
+
+
+# --- funciones anteriores (copiadas tal cual de cada scraper) ---
+def legacy_parse_fecha(fecha):
+    if not isinstance(fecha, str):
+        return fecha
+    fecha_str = fecha.lower()
+    for mes, num in MESES_ES.items():
+        if mes in fecha_str:
+            fecha_str = fecha_str.replace(mes, num)
+            break
+    fecha_str = re.sub(r"\bde\b", "", fecha_str)
+    fecha_str = fecha_str.replace("-", "").strip()
+    try:
+        return pd.to_datetime(fecha_str, format="%d %m %Y %H:%M")
+    except Exception:
+        return fecha
+
+
+def legacy_normalize_dt(dt_str):
+    if not dt_str:
+        dt = datetime.now(tz=LOCAL_TZ)
+    else:
+        try:
+            dt = dateparser.parse(dt_str)
+            if dt.tzinfo is None:
+                dt = pytz.utc.localize(dt)
+            dt = dt.astimezone(LOCAL_TZ)
+        except Exception:
+            dt = datetime.now(tz=LOCAL_TZ)
+    return dt.strftime("%Y-%m-%d"), dt
+
+
+def legacy_solo_fecha(f):
+    try:
+        return dateparser.isoparse(f).date()
+    except Exception:
+        return pd.NaT
+
+
+# --- datos sintéticos ---
+def sample_dates(n: int, seed: int = 0):
+    rnd = random.Random(seed)
+    base = datetime(2024, 1, 1)
+    return [base + timedelta(minutes=rnd.randrange(0, 2 * 365 * 24 * 60)) for _ in range(n)]
+
+
+def ambito_strings(dates):
+    return [f"{d.day:02d} de {MESES[d.month - 1]} de {d.year} - {d:%H:%M}" for d in dates]
+
+
+def rss_strings(dates):
+    out = []
+    for i, d in enumerate(dates):
+        if i % 3 == 0:
+            out.append(d.strftime("%a, %d %b %Y %H:%M:%S GMT"))
+        elif i % 3 == 1:
+            out.append(d.strftime("%a, %d %b %Y %H:%M:%S -0300"))
+        else:
+            out.append(d.strftime("%Y-%m-%dT%H:%M:%S-03:00"))  # feeds Atom
+    return out
+
+
+def iso_strings(dates):
+    return [d.strftime("%Y-%m-%dT%H:%M:%S-03:00") for d in dates]
+
+
+def best_of(fn, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return out, best
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark de parseo de fechas (fila por fila vs vectorizado).")
+    ap.add_argument("--n", type=int, default=50_000, help="Filas por formato")
+    ap.add_argument("--repeat", type=int, default=3, help="Repeticiones (se reporta la mejor)")
+    args = ap.parse_args()
+
+    dates = sample_dates(args.n)
+    casos = []
+
+    # Ámbito: "15 de abril de 2025 - 10:30" (hora local)
+    s = ambito_strings(dates)
+    old, t_old = best_of(lambda: pd.Series([legacy_parse_fecha(x) for x in s]), args.repeat)
+    new, t_new = best_of(lambda: parse_fecha_es(s), args.repeat)
+    assert old.astype("datetime64[ns]").equals(new.dt.tz_localize(None)), "Ámbito: resultados distintos"
+    casos.append(("Ámbito (es)", t_old, t_new))
+
+    # RSS: RFC 822 con GMT / offset y algunos ISO (Atom)
+    s = rss_strings(dates)
+    old, t_old = best_of(lambda: pd.Series([legacy_normalize_dt(x)[1] for x in s]), args.repeat)
+    new, t_new = best_of(lambda: parse_rfc822(s), args.repeat)
+    old = pd.to_datetime(old, utc=True).dt.tz_convert(TZ)
+    assert (old.to_numpy() == new.to_numpy()).all(), "RSS: resultados distintos"
+    casos.append(("RSS (rfc822)", t_old, t_new))
+
+    # La Nación / consolidación: ISO con offset -> día
+    s = iso_strings(dates)
+    old, t_old = best_of(lambda: pd.to_datetime(pd.Series([legacy_solo_fecha(x) for x in s])), args.repeat)
+    new, t_new = best_of(lambda: a_dia(parse_iso(s)), args.repeat)
+    assert (old.to_numpy() == new.to_numpy()).all(), "ISO: resultados distintos"
+    casos.append(("La Nación (iso -> día)", t_old, t_new))
+
+    print(f"{args.n} filas por formato, mejor de {args.repeat}")
+    print(f"{'formato':<26}{'anterior (s)':>14}{'vectorizado (s)':>17}{'speedup':>10}")
+    for name, a, b in casos:
+        print(f"{name:<26}{a:>14.3f}{b:>17.3f}{a / b:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
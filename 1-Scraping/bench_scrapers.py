@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark offline de los caminos de extracción de todos los scrapers (grabar / reproducir).
+
+`grabar` corre una muestra chica de cada fuente contra los sitios reales dentro de
+`replay.grabando`: las respuestas quedan en un archivo comprimido (`fixtures/scrapers.zip`)
+junto con la configuración de la muestra y lo que extrajo cada fuente (la referencia).
+
+`bench` vuelve a correr exactamente las mismas muestras contra `replay.ServidorReplay` (sin
+red), cada fuente en un proceso propio, y reporta por fuente:
+- páginas servidas y páginas/s (wall de la fuente),
+- parseo: ms por nota (o por entrada, en RSS) sumando el tiempo de las funciones de
+  extracción (en threads/procesos el total puede superar al wall),
+- pico de RSS del proceso (y de sus hijos, si el parseo usa un pool de procesos),
+- correctitud: notas de la referencia encontradas y % de campos idénticos a la referencia.
+Sirve para comparar un cambio de parser o de concurrencia antes de correrlo en producción.
+
+Fuentes y caminos ejercitados:
+- lanacion: índices de sitemaps + sitemap mensual (`iter_sitemap_url`) y `parse_article`
+  sobre `http_get` (`http_fetch.Fetcher`).
+- ambito: `fetch_listado` / `fetch_noticia` con una `aiohttp.ClientSession` y su `Parser`.
+- clarin, pagina12: `PaginadoCrawler.listado` / `.nota` (`requests` vía `Fetcher`).
+- rss: `scrap_news.fetch_all_feeds` (descarga + `feedparser`).
+
+Uso:
+  python bench_scrapers.py grabar --fuentes lanacion ambito clarin pagina12 rss --n 40
+  python bench_scrapers.py bench
+  python bench_scrapers.py bench --fuentes ambito --parser lxml --parse-pool thread --concurrency 32
+  python bench_scrapers.py bench --latencia grabada     # con la latencia real de cada respuesta
+"""
+
+import argparse
+import asyncio
+import datetime as dt
+import json
+import multiprocessing as mp
+import resource
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+script_dir = Path(__file__).resolve().parent
+for sub in ("", "lanacion", "ambito"):
+    sys.path.insert(0, str(script_dir / sub))
+
+from replay import Archivo, ServidorReplay, grabando, redirigiendo, tiempo_red  # noqa: E402
+
+ARCHIVO = script_dir / "fixtures" / "scrapers.zip"
+
+# muestra por defecto de cada fuente (se guarda en el archivo al grabar)
+CONFIG = {
+    "lanacion": {"desde": "2025-03-01", "hasta": "2025-03-31", "secciones": ["politica", "economia"], "n": 40},
+    "ambito": {"secciones": ["economia", "politica"], "paginas": 1, "n": 40},
+    "clarin": {"paginas": 2, "n": 40},
+    "pagina12": {"paginas": 2, "n": 40},
+    "rss": {"diarios": []},  # vacío = todos los de scrap_news.DIARIOS_RSS
+}
+# campo que identifica cada registro al comparar con la referencia
+CLAVE = {"lanacion": "url", "ambito": "url", "clarin": "url", "pagina12": "url", "rss": "link"}
+
+
+class Cronometro:
+    """Envuelve funciones de parseo y acumula su tiempo (desde varios threads)."""
+
+    def __init__(self):
+        self.segundos: List[float] = []
+
+    def envolver(self, fn: Callable) -> Callable:
+        def f(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.segundos.append(time.perf_counter() - t0)
+        return f
+
+    @property
+    def total(self) -> float:
+        return sum(self.segundos)
+
+
+# --- drivers: misma muestra al grabar y al reproducir. Devuelven (registros, s de parseo, n parseados) ---
+def correr_lanacion(cfg: dict, op: dict) -> Tuple[List[dict], float, int]:
+    import lanacion_scraper as ln
+
+    fetcher = ln.configure_fetcher(concurrency=op["concurrency"], rps=op["rps"])
+    desde, hasta = dt.date.fromisoformat(cfg["desde"]), dt.date.fromisoformat(cfg["hasta"])
+    sitemaps = [s for s in ln.month_sitemaps_in_range(desde, hasta) if ln.yyyymm(desde) in s] or [ln.SITEMAP_NEWS]
+    urls = []
+    for loc, _, _ in ln.extract_urls_from_sitemap(sitemaps[0]):
+        if ln.url_matches_sections(loc, cfg["secciones"]):
+            urls.append(loc)
+            if len(urls) >= cfg["n"]:
+                break
+
+    parseo: List[float] = []
+
+    def nota(url):  # parse_article descarga y parsea: se descuenta el tiempo de red del thread
+        r0, t0 = tiempo_red(), time.perf_counter()
+        art = ln.parse_article(url, with_text=True)
+        parseo.append(time.perf_counter() - t0 - (tiempo_red() - r0))
+        return art
+
+    arts = [a for _, a in fetcher.map(nota, urls) if not isinstance(a, Exception)]
+    fetcher.close()
+    return arts, sum(parseo), len(parseo)
+
+
+def correr_ambito(cfg: dict, op: dict) -> Tuple[List[dict], float, int]:
+    import aiohttp
+    import scrapping as amb
+
+    async def correr():
+        parser = amb.Parser(op["parser"], pool=op["parse_pool"])
+        sem = asyncio.Semaphore(op["concurrency"])
+        try:
+            async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=op["concurrency"])) as session:
+                urls = []
+                for seccion in cfg["secciones"]:
+                    for index in range(1, cfg["paginas"] + 1):
+                        urls += [(u, seccion) for u in await amb.fetch_listado(session, seccion, index, parser) or []]
+                urls = list(dict.fromkeys(urls))[:cfg["n"]]
+
+                async def una(url, seccion):
+                    async with sem:
+                        return await amb.fetch_noticia(session, url, seccion, parser)
+
+                notas = await asyncio.gather(*(una(u, s) for u, s in urls))
+        finally:
+            parser.close()
+        t = parser.tiempos
+        return [n for n in notas if n], t.parseo, t.notas + t.listados
+
+    return asyncio.run(correr())
+
+
+def _paginado(nombre: str) -> Callable:
+    def correr(cfg: dict, op: dict) -> Tuple[List[dict], float, int]:
+        import paginado as pg
+        from dataset_store import PartitionedStore
+        from http_fetch import Fetcher
+
+        sitio = pg.SITIOS[nombre]
+        crono = Cronometro()
+        originales = pg.parse_listado, pg.parse_nota
+        pg.parse_listado, pg.parse_nota = crono.envolver(pg.parse_listado), crono.envolver(pg.parse_nota)
+        try:
+            with Fetcher(concurrency=op["concurrency"], rps=op["rps"]) as fetcher, \
+                    tempfile.TemporaryDirectory() as tmp:
+                crawler = pg.PaginadoCrawler(sitio, fetcher, store=PartitionedStore(tmp, pg.SCHEMA))
+                paginas = dict(fetcher.map(crawler.listado, range(1, cfg["paginas"] + 1)))
+                links = [n["link"] for p in sorted(paginas) if not isinstance(paginas[p], Exception)
+                         for n in paginas[p]]
+                links = list(dict.fromkeys(links))[:cfg["n"]]
+                notas = [r for _, r in fetcher.map(crawler.nota, links) if not isinstance(r, Exception)]
+        finally:
+            pg.parse_listado, pg.parse_nota = originales
+        return notas, crono.total, len(crono.segundos)
+    return correr
+
+
+def correr_rss(cfg: dict, op: dict) -> Tuple[List[dict], float, int]:
+    import scrap_news as sn
+
+    selected = OrderedDict((k, v) for k, v in sn.DIARIOS_RSS.items() if not cfg["diarios"] or k in cfg["diarios"])
+    crono = Cronometro()
+    original = sn.parse_feed_entries
+    sn.parse_feed_entries = crono.envolver(original)
+    try:
+        feeds, _ = sn.fetch_all_feeds(selected, pause=1.0 / op["rps"] if op["rps"] else 0, cache={})
+    finally:
+        sn.parse_feed_entries = original
+    rows = [dict(r, source=s) for s, por_feed in feeds.items() for filas in por_feed for r in filas]
+    return rows, crono.total, len(rows)
+
+
+DRIVERS: Dict[str, Callable] = {
+    "lanacion": correr_lanacion,
+    "ambito": correr_ambito,
+    "clarin": _paginado("clarin"),
+    "pagina12": _paginado("pagina12"),
+    "rss": correr_rss,
+}
+
+
+def correctitud(fuente: str, esperado: List[dict], obtenido: List[dict]) -> dict:
+    """Notas de la referencia encontradas y fracción de campos iguales (por clave de registro)."""
+    clave = CLAVE[fuente]
+    norm = lambda v: v.strip() if isinstance(v, str) else v  # noqa: E731
+    por_clave = {r.get(clave): r for r in obtenido}
+    encontradas, iguales, total, malos = 0, 0, 0, {}
+    for ref in esperado:
+        r = por_clave.get(ref.get(clave))
+        if r is None:
+            continue
+        encontradas += 1
+        for campo, v in ref.items():
+            total += 1
+            if norm(json.loads(json.dumps(r.get(campo), default=str))) == norm(v):
+                iguales += 1
+            else:
+                malos[campo] = malos.get(campo, 0) + 1
+    return {"cobertura": encontradas / len(esperado) if esperado else 1.0,
+            "campos_ok": iguales / total if total else 1.0,
+            "peores": sorted(malos, key=malos.get, reverse=True)[:3]}
+
+
+def correr_fuente(fuente: str, cfg: dict, op: dict, base_url: str) -> dict:
+    """Se ejecuta en un proceso aparte por fuente (el pico de RSS es solo suyo)."""
+    with redirigiendo(base_url):
+        t0 = time.perf_counter()
+        registros, parseo, n = DRIVERS[fuente](cfg, op)
+        wall = time.perf_counter() - t0
+    rss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+              resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) / 1024  # KB en Linux
+    return {"registros": json.loads(json.dumps(registros, default=str)), "wall": wall,
+            "parse_ms": 1000 * parseo / max(1, n), "rss_mb": rss}
+
+
+def grabar(args) -> None:
+    archivo = Archivo(args.archivo)
+    op = {"concurrency": args.concurrency, "rps": args.rps, "parser": args.parser, "parse_pool": args.parse_pool}
+    for fuente in args.fuentes:
+        cfg = dict(CONFIG[fuente], **({"n": args.n} if args.n and "n" in CONFIG[fuente] else {}))
+        antes = len(archivo.entradas)
+        t0 = time.perf_counter()
+        with grabando(archivo):
+            registros, _, _ = DRIVERS[fuente](cfg, op)
+        archivo.esperado[fuente] = json.loads(json.dumps(registros, default=str))
+        archivo.config[fuente] = cfg
+        print(f"[{fuente}] {len(registros)} registros, {len(archivo.entradas) - antes} respuestas nuevas "
+              f"en {time.perf_counter() - t0:.1f}s")
+    archivo.guardar()
+    print(f"[OK] {archivo.path}: {archivo.resumen()}")
+
+
+def bench(args) -> None:
+    archivo = Archivo(args.archivo)
+    if not archivo.entradas:
+        sys.exit(f"[ERROR] {args.archivo} no existe o está vacío: correr primero `grabar`.")
+    latencia = args.latencia if args.latencia == "grabada" else float(args.latencia)
+    op = {"concurrency": args.concurrency, "rps": 0, "parser": args.parser, "parse_pool": args.parse_pool}
+    fuentes = [f for f in args.fuentes if f in archivo.config]
+    print(f"Archivo: {archivo.resumen()} | latencia {latencia} | concurrencia {args.concurrency} | "
+          f"parser {args.parser} ({args.parse_pool})")
+    print(f"{'fuente':<10} {'páginas':>7} {'pág/s':>8} {'parse ms':>9} {'RSS MB':>7} {'faltan':>6} "
+          f"{'cobert.':>7} {'campos ok':>9}  peores campos")
+    ctx = mp.get_context("spawn")
+    with ServidorReplay(archivo, latencia=latencia) as srv:
+        for fuente in fuentes:
+            hits, misses = srv.stats["hits"], srv.stats["misses"]
+            # ProcessPoolExecutor (y no mp.Pool): sus workers no son daemon y pueden tener su propio
+            # pool de parseo (Ámbito con --parse-pool process)
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                r = pool.submit(correr_fuente, fuente, archivo.config[fuente], op, srv.base_url).result()
+            paginas = srv.stats["hits"] - hits
+            c = correctitud(fuente, archivo.esperado.get(fuente, []), r["registros"])
+            print(f"{fuente:<10} {paginas:>7} {paginas / r['wall']:>8.1f} {r['parse_ms']:>9.1f} "
+                  f"{r['rss_mb']:>7.0f} {srv.stats['misses'] - misses:>6} {c['cobertura']:>7.1%} "
+                  f"{c['campos_ok']:>9.1%}  {', '.join(c['peores'])}")
+    if srv.faltantes:
+        print(f"[WARN] {len(srv.faltantes)} requests sin grabar (p.ej. {srv.faltantes[0]}): "
+              f"la muestra cambió, volver a grabar esa fuente.")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark offline (grabar / reproducir) de los scrapers.")
+    ap.add_argument("modo", choices=["grabar", "bench"])
+    ap.add_argument("--fuentes", nargs="+", choices=list(DRIVERS), default=list(DRIVERS))
+    ap.add_argument("--archivo", default=str(ARCHIVO))
+    ap.add_argument("--n", type=int, default=0, help="Notas por fuente al grabar (0 = default de CONFIG)")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--rps", type=float, default=2.0, help="Requests/seg por host al grabar (en bench no hay límite)")
+    ap.add_argument("--latencia", default="0", help="Latencia del replay: segundos o 'grabada'")
+    ap.add_argument("--parser", default="html.parser", choices=["html.parser", "lxml"],
+                    help="Backend de BeautifulSoup de Ámbito")
+    ap.add_argument("--parse-pool", default="process", choices=["process", "thread", "inline"],
+                    help="Pool de parseo de Ámbito")
+    args = ap.parse_args()
+    grabar(args) if args.modo == "grabar" else bench(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Consolidación incremental de los cuatro diarios en un único dataset (`df.parquet/`).
+
+Reemplaza a `init.ipynb` y a los `consolidar_outputs_a_parquet.ipynb` de Clarín y Página/12:
+
+- Cada fuente declara dónde están sus archivos y cómo se mapean sus columnas al esquema
+  unificado (`FUENTES`): renombres, constantes (`diario`, `seccion`) y parseo de fecha.
+- Se procesan solo los archivos nuevos o modificados desde la última corrida (manifiesto
+  `df.parquet/_manifest.json` con tamaño y mtime de cada archivo fuente). Los archivos
+  fuente que desaparecen (p.ej. parts de Ámbito compactados) se dan de baja.
+- Cada archivo fuente produce un archivo de salida, escrito en streaming por lotes:
+  la memoria depende del tamaño de lote, no del tamaño del corpus.
+- Cada nota recibe un `cluster_id` de casi-duplicados (`near_dup.py`, índice incremental
+  MinHash + LSH): las copias de un mismo cable comparten cluster entre diarios.
+
+`df.parquet/` es un directorio de Parquets con el mismo esquema; se lee igual que antes:
+  pd.read_parquet("1-Scraping/dataset_consolidado/df.parquet")
+
+Uso:
+  python consolidar.py
+  python consolidar.py --desde 2025-01-01 --hasta 2025-04-30
+  python consolidar.py --fuentes clarin pagina12 --rebuild
+  python consolidar.py --export df_unico.parquet     # además, un único archivo (streaming)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from fechas import a_dia, parse_iso  # noqa: E402
+from near_dup import NearDupIndex  # noqa: E402
+
+script_dir = Path(__file__).parent
+scraping_dir = script_dir.parent
+
+MANIFEST = "_manifest.json"
+
+# esquema unificado (mismo orden de columnas que el dataset de Clarín)
+SCHEMA = pa.schema([
+    ("diario", pa.string()),
+    ("fecha", pa.timestamp("ns")),     # día (medianoche, hora de Buenos Aires)
+    ("titulo", pa.string()),
+    ("contenido", pa.string()),
+    ("url", pa.string()),
+    ("seccion", pa.string()),
+    ("cluster_id", pa.int64()),        # grupo de casi-duplicados (near_dup.py)
+])
+
+# mapeo declarativo por fuente. `archivos`: alternativas de globs (relativos a 1-Scraping/);
+# se usa la primera que encuentre archivos.
+FUENTES = {
+    "ambito": {
+        "archivos": [["ambito/noticias_ambito/mes=*/part-*.parquet"], ["ambito/noticias_ambito.parquet"]],
+        "renombrar": {"articulo": "contenido"},
+        "constantes": {"diario": "Ámbito Financiero"},
+    },
+    "clarin": {
+        "archivos": [["clarin/noticias_clarin/mes=*/part-*.parquet"], ["clarin/outputs/*.csv"]],
+        "renombrar": {"titulo noticia": "titulo", "link": "url"},
+        "constantes": {"seccion": "economia"},
+    },
+    "pagina12": {
+        "archivos": [["pagina12/noticias_pagina12/mes=*/part-*.parquet"], ["pagina12/outputs/*.csv"]],
+        "renombrar": {"titulo noticia": "titulo", "link": "url"},
+        "constantes": {"seccion": "economia"},
+    },
+    "lanacion": {
+        "archivos": [["lanacion/noticias_*.parquet"]],
+        "renombrar": {"fecha_publicacion": "fecha", "texto": "contenido"},
+        "constantes": {"diario": "La Nación"},
+    },
+}
+
+
+def archivos_fuente(fuente: str) -> List[Path]:
+    for alternativa in FUENTES[fuente]["archivos"]:
+        files = sorted(f for patron in alternativa for f in scraping_dir.glob(patron))
+        if files:
+            return files
+    return []
+
+
+def leer_lotes(path: Path, batch_size: int) -> Iterator[pd.DataFrame]:
+    """Lee un archivo fuente por lotes (Parquet por row batches, CSV por chunks)."""
+    if path.suffix == ".csv":
+        yield from pd.read_csv(path, chunksize=batch_size, dtype=str, keep_default_na=False, na_values=[""])
+    else:
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            yield batch.to_pandas()
+
+
+def normalizar_fecha(col: pd.Series) -> pd.Series:
+    """Cualquier representación de fecha de las fuentes -> día naive (hora de Buenos Aires)."""
+    if pd.api.types.is_datetime64_any_dtype(col):
+        if col.dt.tz is None:
+            return col.dt.normalize().astype("datetime64[ns]")
+        return a_dia(col).astype("datetime64[ns]")
+    return a_dia(parse_iso(col.astype("string"))).astype("datetime64[ns]")
+
+
+def mapear(df: pd.DataFrame, fuente: str) -> pd.DataFrame:
+    spec = FUENTES[fuente]
+    df = df.rename(columns=spec["renombrar"])
+    for col, valor in spec["constantes"].items():
+        df[col] = valor
+    for col in SCHEMA.names:
+        if col not in df.columns:
+            df[col] = None
+    df["fecha"] = normalizar_fecha(df["fecha"])
+    return df[SCHEMA.names]
+
+
+def filtrar(df: pd.DataFrame, desde: Optional[str], hasta: Optional[str]) -> pd.DataFrame:
+    if desde:
+        df = df[df["fecha"] >= pd.Timestamp(desde)]
+    if hasta:
+        df = df[df["fecha"] <= pd.Timestamp(hasta)]
+    return df
+
+
+def nombre_salida(fuente: str, rel: str) -> str:
+    # estable por archivo fuente: re-procesar un archivo pisa su salida anterior
+    return f"{fuente}-{Path(rel).stem}-{hashlib.sha1(rel.encode()).hexdigest()[:8]}.parquet"
+
+
+def consolidar_archivo(path: Path, fuente: str, out_path: Path, desde: Optional[str],
+                       hasta: Optional[str], batch_size: int, near_dup: Optional[NearDupIndex] = None) -> int:
+    """Mapea un archivo fuente al esquema unificado y lo escribe lote a lote. Devuelve filas."""
+    n = 0
+    tmp = out_path.parent / f".{out_path.name}.tmp"
+    with pq.ParquetWriter(tmp, SCHEMA, compression="zstd") as w:
+        for df in leer_lotes(path, batch_size):
+            df = filtrar(mapear(df, fuente), desde, hasta)
+            if len(df) and near_dup is not None:
+                df["cluster_id"] = near_dup.assign(df["url"], df["contenido"]).to_numpy()
+            if len(df):
+                w.write_table(pa.Table.from_pandas(df, schema=SCHEMA, preserve_index=False))
+                n += len(df)
+    os.replace(tmp, out_path)
+    return n
+
+
+def cargar_manifest(out: Path) -> Dict:
+    path = out / MANIFEST
+    if path.exists():
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return {"header": None, "archivos": {}}
+
+
+def guardar_manifest(out: Path, manifest: Dict) -> None:
+    tmp = out / (MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True, ensure_ascii=False)
+    os.replace(tmp, out / MANIFEST)
+
+
+def consolidar(out: Path, fuentes: List[str], desde: Optional[str] = None, hasta: Optional[str] = None,
+               batch_size: int = 20_000, rebuild: bool = False,
+               near_dup: Optional[NearDupIndex] = None) -> Dict[str, int]:
+    out.mkdir(parents=True, exist_ok=True)
+    manifest = cargar_manifest(out)
+    header = {"desde": desde, "hasta": hasta, "schema": SCHEMA.to_string()}
+    if manifest["header"] != header:
+        if manifest["archivos"]:
+            print("[INFO] Cambió la configuración (rango de fechas / esquema): se re-procesa todo.")
+        for entry in manifest["archivos"].values():
+            (out / entry["salida"]).unlink(missing_ok=True)
+        manifest = {"header": header, "archivos": {}}
+    elif rebuild:
+        # solo las fuentes pedidas; el resto del dataset queda intacto
+        for rel in [r for r, e in manifest["archivos"].items() if e["fuente"] in fuentes]:
+            (out / manifest["archivos"].pop(rel)["salida"]).unlink(missing_ok=True)
+
+    stats = {"nuevos": 0, "sin_cambios": 0, "bajas": 0, "filas": 0}
+    for fuente in fuentes:
+        actuales = {}
+        for f in archivos_fuente(fuente):
+            st = f.stat()
+            actuales[f.relative_to(scraping_dir).as_posix()] = (f, st.st_size, st.st_mtime_ns)
+
+        # bajas: archivos de esta fuente que ya no existen
+        for rel in [r for r, e in manifest["archivos"].items() if e["fuente"] == fuente and r not in actuales]:
+            (out / manifest["archivos"].pop(rel)["salida"]).unlink(missing_ok=True)
+            stats["bajas"] += 1
+
+        for rel, (path, size, mtime) in actuales.items():
+            prev = manifest["archivos"].get(rel)
+            if prev and prev["size"] == size and prev["mtime_ns"] == mtime:
+                stats["sin_cambios"] += 1
+                continue
+            salida = nombre_salida(fuente, rel)
+            try:
+                n = consolidar_archivo(path, fuente, out / salida, desde, hasta, batch_size, near_dup)
+            except Exception as e:
+                print(f"[WARN] Error consolidando {rel}: {e}", file=sys.stderr)
+                continue
+            manifest["archivos"][rel] = {"fuente": fuente, "size": size, "mtime_ns": mtime,
+                                         "filas": n, "salida": salida}
+            # se guarda después de cada archivo: una corrida cortada no repite trabajo
+            guardar_manifest(out, manifest)
+            stats["nuevos"] += 1
+            stats["filas"] += n
+            print(f"[OK] {rel}: {n} filas")
+
+    guardar_manifest(out, manifest)
+    return stats
+
+
+def exportar(out: Path, destino: Path) -> int:
+    """Une el dataset en un único Parquet, row group a row group (memoria acotada)."""
+    manifest = cargar_manifest(out)
+    n = 0
+    tmp = destino.parent / f".{destino.name}.tmp"
+    with pq.ParquetWriter(tmp, SCHEMA, compression="zstd") as w:
+        for rel in sorted(manifest["archivos"]):
+            pf = pq.ParquetFile(out / manifest["archivos"][rel]["salida"])
+            for i in range(pf.num_row_groups):
+                rg = pf.read_row_group(i)
+                w.write_table(rg)
+                n += rg.num_rows
+    os.replace(tmp, destino)
+    return n
+
+
+def resumen(out: Path) -> pd.DataFrame:
+    manifest = cargar_manifest(out)
+    df = pd.DataFrame(manifest["archivos"].values(), columns=["fuente", "filas"])
+    return df.groupby("fuente").agg(archivos=("filas", "size"), filas=("filas", "sum"))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Consolidación incremental de noticias de los cuatro diarios.")
+    ap.add_argument("--out", default=str(script_dir / "df.parquet"), help="Directorio del dataset unificado")
+    ap.add_argument("--fuentes", nargs="+", default=list(FUENTES), choices=list(FUENTES))
+    ap.add_argument("--desde", help="Fecha mínima (YYYY-MM-DD) a conservar")
+    ap.add_argument("--hasta", help="Fecha máxima (YYYY-MM-DD) a conservar")
+    ap.add_argument("--batch-size", type=int, default=20_000, help="Filas por lote de lectura/escritura")
+    ap.add_argument("--rebuild", action="store_true", help="Re-procesar todos los archivos de las fuentes elegidas")
+    ap.add_argument("--export", help="Además, escribir todo el dataset en un único archivo Parquet")
+    ap.add_argument("--near-dup-db", default=str(script_dir / "near_dup.sqlite"),
+                    help="Índice de casi-duplicados (MinHash + LSH) para la columna cluster_id")
+    ap.add_argument("--sin-clusters", action="store_true", help="No calcular cluster_id (queda nulo)")
+    args = ap.parse_args()
+
+    out = Path(args.out)
+    if out.is_file():
+        raise SystemExit(f"[ERROR] {out} es un archivo (formato anterior): moverlo o usar otro --out")
+
+    t0 = time.perf_counter()
+    near_dup = None if args.sin_clusters else NearDupIndex(args.near_dup_db)
+    try:
+        stats = consolidar(out, args.fuentes, args.desde, args.hasta, args.batch_size, args.rebuild, near_dup)
+    finally:
+        if near_dup is not None:
+            near_dup.close()
+    print(f"[INFO] Archivos procesados: {stats['nuevos']} ({stats['filas']} filas) | sin cambios: "
+          f"{stats['sin_cambios']} | bajas: {stats['bajas']} | {time.perf_counter() - t0:.1f}s")
+    print(resumen(out).to_string())
+    if args.export:
+        print(f"[OK] Exportadas {exportar(out, Path(args.export))} filas a {args.export}")
+
+
+if __name__ == "__main__":
+    main()
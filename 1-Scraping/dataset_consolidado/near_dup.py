@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Detección de casi-duplicados entre diarios (MinHash + LSH), incremental.
+
+Las notas de agencia / cables aparecen en varios diarios con cambios menores. Cada nota
+recibe un `cluster_id`: el id de la primera nota vista de su grupo de casi-duplicados.
+
+- Shingles de 5 palabras sobre `contenido` normalizado (NFKC, minúsculas).
+- Firma MinHash de `num_perm` permutaciones (numpy, vectorizado por nota).
+- LSH por bandas: `bands` bandas de `num_perm / bands` filas; dos notas son candidatas si
+  coinciden en al menos una banda. Nunca se compara todo contra todo: cada nota nueva
+  solo se compara (Jaccard estimado con las firmas) contra los candidatos de sus buckets.
+- Índice persistente en SQLite (notas, firmas y buckets): se alimenta a medida que
+  llegan notas nuevas; una URL ya indexada devuelve su cluster sin recalcular.
+
+Uso:
+  python near_dup.py --data df.parquet --db near_dup.sqlite --out clusters.parquet
+  python near_dup.py --data df.parquet --threshold 0.7 --bands 32
+
+  from near_dup import NearDupIndex
+  with NearDupIndex("near_dup.sqlite") as idx:
+      df["cluster_id"] = idx.assign(df["url"], df["contenido"])
+"""
+
+import argparse
+import json
+import re
+import sqlite3
+import time
+import unicodedata
+import zlib
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+RE_WORD = re.compile(r"\w+")
+
+
+class MinHasher:
+    """Firmas MinHash de textos sobre shingles de `shingle` palabras."""
+
+    def __init__(self, num_perm: int = 128, shingle: int = 5, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        # h_i(x) = (a_i * x + b_i) mod 2^32 con a_i impar (biyección); uint32 desborda solo
+        self.a = rng.integers(0, 1 << 32, size=(num_perm, 1), dtype=np.uint32) | np.uint32(1)
+        self.b = rng.integers(0, 1 << 32, size=(num_perm, 1), dtype=np.uint32)
+        self.num_perm = num_perm
+        self.k = shingle
+
+    def shingles(self, text: Optional[str]) -> np.ndarray:
+        """Hashes (32 bits, únicos) de los shingles de palabras del texto."""
+        if not isinstance(text, str):
+            return np.empty(0, dtype=np.uint32)
+        words = RE_WORD.findall(unicodedata.normalize("NFKC", text).lower())
+        n = len(words) - self.k + 1
+        if n <= 0:
+            return np.empty(0, dtype=np.uint32)
+        h = np.array([zlib.crc32(w.encode()) for w in words], dtype=np.uint64)  # estable entre corridas
+        acc = np.zeros(n, dtype=np.uint64)
+        for j in range(self.k):  # hash polinomial de k palabras consecutivas (mod 2^64)
+            acc = acc * np.uint64(1_000_003) + h[j:j + n]
+        return np.unique(((acc ^ (acc >> np.uint64(32))) & np.uint64(0xFFFFFFFF)).astype(np.uint32))
+
+    def signature(self, text: Optional[str]) -> Optional[np.ndarray]:
+        """Firma MinHash (uint32[num_perm]); None si el texto es demasiado corto."""
+        x = self.shingles(text)
+        if x.size == 0:
+            return None
+        return (self.a * x + self.b).min(axis=1)
+
+
+_MULT = np.random.default_rng(7).integers(0, 1 << 63, size=(1, 64), dtype=np.uint64) | np.uint64(1)
+_SALT = np.random.default_rng(8).integers(0, 1 << 63, size=256, dtype=np.uint64)
+
+
+def band_keys(sig: np.ndarray, bands: int) -> List[int]:
+    """Una clave int64 por banda (con sal por banda: buckets distintos por banda)."""
+    rows = sig.reshape(bands, -1).astype(np.uint64)
+    keys = (rows * _MULT[:, :rows.shape[1]]).sum(axis=1) ^ _SALT[:bands]
+    return keys.view(np.int64).tolist()
+
+
+class NearDupIndex:
+    """Índice LSH persistente: asigna `cluster_id` a notas nuevas comparando solo candidatos."""
+
+    def __init__(self, path, num_perm: int = 128, bands: int = 16, threshold: float = 0.8,
+                 shingle: int = 5, max_candidates: int = 200):
+        if num_perm % bands or num_perm // bands > 64 or bands > 256:
+            raise ValueError("num_perm debe ser múltiplo de bands (hasta 256 bandas de hasta 64 filas)")
+        self.path = Path(path)
+        self.bands = bands
+        self.threshold = threshold
+        self.max_candidates = max_candidates
+        self.hasher = MinHasher(num_perm=num_perm, shingle=shingle)
+
+        self.con = sqlite3.connect(self.path)
+        self.con.execute("PRAGMA journal_mode=WAL")
+        self.con.execute("PRAGMA synchronous=NORMAL")
+        self.con.execute("PRAGMA cache_size=-131072")  # 128 MB
+        self.con.execute("CREATE TABLE IF NOT EXISTS meta (params TEXT)")
+        self.con.execute("CREATE TABLE IF NOT EXISTS docs (id INTEGER PRIMARY KEY, url TEXT UNIQUE, "
+                         "cluster INTEGER, sig BLOB)")
+        # tabla agrupada por key: los candidatos de un bucket quedan contiguos en disco
+        self.con.execute("CREATE TABLE IF NOT EXISTS bands (key INTEGER, doc INTEGER, "
+                         "PRIMARY KEY (key, doc)) WITHOUT ROWID")
+
+        # las firmas solo son comparables con los mismos parámetros
+        params = json.dumps({"num_perm": num_perm, "bands": bands, "shingle": shingle})
+        row = self.con.execute("SELECT params FROM meta").fetchone()
+        if row is None:
+            self.con.execute("INSERT INTO meta VALUES (?)", (params,))
+            self.con.commit()
+        elif row[0] != params:
+            raise ValueError(f"{self.path} fue creado con otros parámetros: {row[0]}")
+
+    def _candidatos(self, keys: List[int]):
+        marks = ",".join("?" * len(keys))
+        return self.con.execute(
+            f"SELECT DISTINCT d.id, d.cluster, d.sig FROM bands b JOIN docs d ON d.id = b.doc "
+            f"WHERE b.key IN ({marks}) LIMIT {self.max_candidates}", keys).fetchall()
+
+    def assign(self, urls: Iterable[Optional[str]], textos: Iterable[Optional[str]]) -> pd.Series:
+        """Indexa las notas (en orden) y devuelve su `cluster_id` (Int64).
+
+        Una consulta de candidatos por nota nueva; las notas del mismo lote se ven entre sí
+        por un índice en memoria y se escriben juntas al final (una transacción por lote).
+        """
+        urls = [u if isinstance(u, str) else None for u in urls]
+        textos = list(textos)
+        conocidas = {}
+        validas = [u for u in set(urls) if u is not None]
+        for i in range(0, len(validas), 900):  # límite de parámetros de SQLite
+            chunk = validas[i:i + 900]
+            conocidas.update(self.con.execute(
+                f"SELECT url, cluster FROM docs WHERE url IN ({','.join('?' * len(chunk))})", chunk))
+
+        next_id = (self.con.execute("SELECT MAX(id) FROM docs").fetchone()[0] or 0) + 1
+        lote_bands = {}   # key -> [(id, cluster, sig)] del lote actual
+        docs, bands, out = [], [], []
+        for url, text in zip(urls, textos):
+            if url is None:
+                out.append(None)
+                continue
+            if url in conocidas:
+                out.append(conocidas[url])
+                continue
+            doc, cluster = next_id, next_id
+            next_id += 1
+            sig = self.hasher.signature(text)
+            if sig is not None:
+                keys = band_keys(sig, self.bands)
+                cands = [(c, np.frombuffer(s_, dtype=np.uint32)) for _, c, s_ in self._candidatos(keys)]
+                cands += [(c, s_) for k in keys for _, c, s_ in lote_bands.get(k, ())]
+                best = self.threshold
+                for c_cluster, c_sig in cands:
+                    j = float(np.mean(c_sig == sig))  # Jaccard estimado
+                    if j >= best:
+                        best, cluster = j, c_cluster
+                for k in keys:
+                    lote_bands.setdefault(k, []).append((doc, cluster, sig))
+                    bands.append((k, doc))
+            docs.append((doc, url, cluster, sig.tobytes() if sig is not None else None))
+            conocidas[url] = cluster
+            out.append(cluster)
+
+        with self.con:
+            self.con.executemany("INSERT INTO docs (id, url, cluster, sig) VALUES (?, ?, ?, ?)", docs)
+            self.con.executemany("INSERT INTO bands VALUES (?, ?)", bands)
+        return pd.Series(out, dtype="Int64")
+
+    def clusters(self) -> pd.DataFrame:
+        """url -> cluster_id de todo lo indexado."""
+        return pd.read_sql_query("SELECT url, cluster AS cluster_id FROM docs", self.con)
+
+    def __len__(self) -> int:
+        return self.con.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def close(self) -> None:
+        self.con.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Casi-duplicados (MinHash + LSH) sobre el dataset consolidado.")
+    ap.add_argument("--data", default="df.parquet", help="Parquet o directorio de Parquets con url y contenido")
+    ap.add_argument("--db", default="near_dup.sqlite", help="Índice SQLite (se actualiza incrementalmente)")
+    ap.add_argument("--out", help="Parquet de salida url -> cluster_id")
+    ap.add_argument("--threshold", type=float, default=0.8, help="Jaccard mínimo para considerar duplicado")
+    ap.add_argument("--num-perm", type=int, default=128)
+    ap.add_argument("--bands", type=int, default=16)
+    ap.add_argument("--batch-size", type=int, default=5_000)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    n = 0
+    with NearDupIndex(args.db, num_perm=args.num_perm, bands=args.bands, threshold=args.threshold) as idx:
+        scanner = ds.dataset(args.data, format="parquet").scanner(columns=["url", "contenido"],
+                                                                   batch_size=args.batch_size)
+        for batch in scanner.to_batches():
+            idx.assign(batch.column("url").to_pylist(), batch.column("contenido").to_pylist())
+            n += batch.num_rows
+        clusters = idx.clusters()
+    dt = time.perf_counter() - t0
+
+    tam = clusters["cluster_id"].map(clusters["cluster_id"].value_counts())
+    print(f"[INFO] {n} notas en {dt:.1f}s ({n / max(dt, 1e-9):,.0f} notas/s) | índice: {len(clusters)} notas")
+    print(f"[INFO] clusters: {clusters['cluster_id'].nunique()} | notas en clusters con duplicados: "
+          f"{int((tam > 1).sum())}")
+    if args.out:
+        pq.write_table(pa.Table.from_pandas(clusters, preserve_index=False), args.out)
+        print(f"[OK] {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Dataset Parquet particionado por mes (`<root>/mes=YYYY-MM/part-*.parquet`).
+
+- `append()` escribe cada lote como archivos nuevos, uno por partición tocada (nunca reescribe).
+- El manifiesto es el punto de commit: los archivos se escriben con nombre temporal y se
+  renombran recién después de guardar el manifiesto que los lista; `compact()` anota en ese
+  mismo manifiesto (`_borrar`) los archivos que reemplaza. Los lectores solo ven lo que está
+  en el manifiesto y la primera escritura de cada instancia completa lo que un crash dejó a
+  medias (renombra, borra lo reemplazado, adopta partes sueltas de versiones anteriores).
+- `compact()` une los archivos chicos de cada partición en uno solo, ordenado por fecha,
+  con row groups grandes y estadísticas por columna.
+- `snapshot()` guarda un manifiesto (archivos + filas + min/max de fecha por partición)
+  y hardlinks a los archivos: O(#archivos), sin copiar datos. `restore()` vuelve a ese estado.
+- `read(desde, hasta)` filtra por fecha tocando solo las particiones (y row groups) necesarias.
+
+La partición se llama `mes` (y no `fecha`) porque `fecha` ya es una columna de los archivos.
+
+Uso:
+  python dataset_store.py info       --root ambito/noticias_ambito
+  python dataset_store.py compactar  --root ambito/noticias_ambito
+  python dataset_store.py snapshot   --root ambito/noticias_ambito --keep 10
+  python dataset_store.py restaurar  --root ambito/noticias_ambito --snapshot 20250501_120000_3f9a2c
+  python dataset_store.py migrar     --root ambito/noticias_ambito --desde ambito/noticias_ambito.parquet
+"""
+
+import argparse
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+MANIFEST = "_manifest.json"
+BORRAR = "_borrar"  # clave del manifiesto: archivos reemplazados por un compact aún no borrados
+SIN_FECHA = "desconocido"
+
+
+class PartitionedStore:
+    def __init__(self, root, schema: pa.Schema, date_col: str = "fecha",
+                 row_group_size: int = 50_000, compression: str = "zstd"):
+        self.root = Path(root)
+        self.schema = schema
+        self.date_col = date_col
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.snapshots_dir = self.root.parent / f"{self.root.name}_snapshots"
+        self._recuperado = False
+
+    # --- escritura ---
+    def _to_table(self, rows) -> pa.Table:
+        df = pd.DataFrame(rows) if not isinstance(rows, pd.DataFrame) else rows.copy()
+        for name in self.schema.names:
+            if name not in df.columns:
+                df[name] = None
+        ts_type = self.schema.field(self.date_col).type
+        fechas = pd.to_datetime(df[self.date_col], errors="coerce")
+        if getattr(ts_type, "tz", None) and fechas.dt.tz is None:
+            fechas = fechas.dt.tz_localize(ts_type.tz)
+        df[self.date_col] = fechas
+        return pa.Table.from_pandas(df[self.schema.names], schema=self.schema, preserve_index=False)
+
+    def _mes(self, table: pa.Table) -> pa.Array:
+        fechas = table[self.date_col]
+        meses = pc.strftime(fechas, format="%Y-%m")
+        return pc.fill_null(meses, SIN_FECHA)
+
+    def append(self, rows) -> int:
+        """Agrega filas (lista de dicts o DataFrame). Devuelve cuántas se escribieron."""
+        table = self._to_table(rows)
+        if table.num_rows == 0:
+            return 0
+        meses = self._mes(table)
+        manifest = self._recuperar()
+        stamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        tmps = []
+        for mes in pc.unique(meses).to_pylist():
+            part = table.filter(pc.equal(meses, mes))
+            name = f"part-{stamp}-{uuid.uuid4().hex[:8]}.parquet"
+            tmps.append(self._write(part, mes, name, manifest))
+        self.save_manifest(manifest)
+        for tmp in tmps:
+            _publicar(tmp)
+        return table.num_rows
+
+    def _write(self, table: pa.Table, mes: str, name: str, manifest: Dict) -> Path:
+        """Escribe `.<name>.tmp` y lo anota en `manifest`; se publica (`_publicar`) al guardar el manifiesto."""
+        pdir = self.root / f"mes={mes}"
+        pdir.mkdir(parents=True, exist_ok=True)
+        tmp = pdir / f".{name}.tmp"
+        pq.write_table(table, tmp, row_group_size=self.row_group_size,
+                       compression=self.compression, write_statistics=True)
+        fechas = table[self.date_col]
+        manifest.setdefault(mes, {})[name] = {
+            "rows": table.num_rows,
+            "bytes": tmp.stat().st_size,
+            "min": _iso(pc.min(fechas).as_py()),
+            "max": _iso(pc.max(fechas).as_py()),
+        }
+        return tmp
+
+    # --- manifiesto ---
+    def _load_raw(self) -> Optional[Dict]:
+        path = self.root / MANIFEST
+        if path.exists():
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        return None
+
+    def load_manifest(self) -> Dict[str, Dict[str, dict]]:
+        raw = self._load_raw()
+        if raw is not None:
+            raw.pop(BORRAR, None)
+            return raw
+        return self.rebuild_manifest() if self.root.exists() else {}
+
+    def save_manifest(self, manifest: Dict, borrar: Iterable[str] = ()) -> None:
+        """Guarda el manifiesto (atómico). `borrar`: archivos (relativos a root) que ya no forman parte."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / (MANIFEST + ".tmp")
+        data = {**manifest, BORRAR: sorted(borrar)} if borrar else manifest
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.root / MANIFEST)
+
+    def _recuperar(self) -> Dict[str, Dict[str, dict]]:
+        """Deja el directorio igual al manifiesto (una vez por instancia, antes de escribir).
+
+        - entradas cuyo archivo sigue con nombre temporal (crash entre manifiesto y rename): se renombran;
+        - archivos anotados en `_borrar` (crash a mitad de `compact`): se borran;
+        - temporales que no están en el manifiesto (crash antes de guardarlo): se borran;
+        - `part-*.parquet` visibles que no están en el manifiesto (versiones anteriores que
+          escribían el archivo antes del manifiesto): se adoptan leyendo su footer;
+        - entradas sin archivo: se dan de baja.
+        """
+        raw = self._load_raw()
+        if self._recuperado or raw is None:
+            self._recuperado = True
+            return self.load_manifest()
+        borrar = raw.pop(BORRAR, [])
+        manifest: Dict[str, Dict[str, dict]] = raw
+        cambios = bool(borrar)
+        for rel in borrar:
+            (self.root / rel).unlink(missing_ok=True)
+        for mes, files in manifest.items():
+            pdir = self.root / f"mes={mes}"
+            for name in list(files):
+                if (pdir / name).exists():
+                    continue
+                if (pdir / f".{name}.tmp").exists():
+                    _publicar(pdir / f".{name}.tmp")
+                else:
+                    del files[name]
+                    cambios = True
+        for tmp in self.root.glob("mes=*/.part-*.parquet.tmp"):
+            if tmp.name[1:-len(".tmp")] not in manifest.get(tmp.parent.name[len("mes="):], {}):
+                tmp.unlink()
+        for f in self.root.glob("mes=*/part-*.parquet"):
+            mes = f.parent.name[len("mes="):]
+            if f.name not in manifest.get(mes, {}):
+                manifest.setdefault(mes, {})[f.name] = _entrada(f)
+                cambios = True
+        manifest = {mes: files for mes, files in manifest.items() if files}
+        if cambios:
+            self.save_manifest(manifest)
+        self._recuperado = True
+        return manifest
+
+    def rebuild_manifest(self) -> Dict[str, Dict[str, dict]]:
+        """Reconstruye el manifiesto a partir de los footers (sin leer datos)."""
+        manifest: Dict[str, Dict[str, dict]] = {}
+        for f in sorted(self.root.glob("mes=*/part-*.parquet")):
+            manifest.setdefault(f.parent.name[len("mes="):], {})[f.name] = _entrada(f)
+        return manifest
+
+    # --- lectura ---
+    def exists(self) -> bool:
+        return any(self.root.glob("mes=*/part-*.parquet"))
+
+    def dataset(self) -> ds.Dataset:
+        """Solo los archivos del manifiesto: lo que quedó a medias de un crash no se lee.
+
+        Una entrada ya comprometida cuyo archivo sigue con nombre temporal se lee del temporal.
+        """
+        files = []
+        for mes, names in sorted(self.load_manifest().items()):
+            pdir = self.root / f"mes={mes}"
+            for name in sorted(names):
+                f = pdir / name if (pdir / name).exists() else pdir / f".{name}.tmp"
+                if f.exists():
+                    files.append(str(f))
+        part = ds.partitioning(pa.schema([("mes", pa.string())]), flavor="hive")
+        return ds.dataset(files, format="parquet", partitioning=part, partition_base_dir=str(self.root),
+                          schema=self.schema.append(pa.field("mes", pa.string())))
+
+    def read(self, desde=None, hasta=None, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Lee el dataset, opcionalmente filtrando por fecha (poda particiones y row groups)."""
+        if not self.exists():
+            return pd.DataFrame(columns=columns or self.schema.names)
+        filtro = None
+        tz = getattr(self.schema.field(self.date_col).type, "tz", None)
+        if desde is not None:
+            d = _ts(desde, tz)
+            filtro = _and(filtro, (ds.field("mes") >= d.strftime("%Y-%m")) & (ds.field(self.date_col) >= d))
+        if hasta is not None:
+            h = _ts(hasta, tz)
+            filtro = _and(filtro, (ds.field("mes") <= h.strftime("%Y-%m")) & (ds.field(self.date_col) <= h))
+        cols = columns or self.schema.names
+        return self.dataset().to_table(columns=cols, filter=filtro).to_pandas()
+
+    # --- compactación ---
+    def compact(self, particiones: Optional[Iterable[str]] = None, min_files: int = 2) -> int:
+        """Une los archivos de cada partición en uno solo (ordenado por fecha). Devuelve #particiones."""
+        manifest = self._recuperar()
+        hechas = 0
+        for mes in sorted(particiones or manifest.keys()):
+            files = sorted(manifest.get(mes, {}))
+            pdir = self.root / f"mes={mes}"
+            if len(files) < min_files:
+                continue
+            table = pa.concat_tables(pq.read_table(pdir / f, schema=self.schema) for f in files)
+            table = table.sort_by(self.date_col)
+            name = f"part-{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}-c.parquet"
+            nuevos: Dict[str, Dict[str, dict]] = {}
+            tmp = self._write(table, mes, name, nuevos)
+            manifest[mes] = nuevos[mes]
+            # commit: el manifiesto nuevo anota los reemplazados (si hay un crash, `_recuperar` termina)
+            self.save_manifest(manifest, borrar=[f"mes={mes}/{f}" for f in files])
+            _publicar(tmp)
+            # los snapshots tienen hardlinks: borrar acá no pierde datos respaldados
+            for f in files:
+                (pdir / f).unlink(missing_ok=True)
+            self.save_manifest(manifest)
+            hechas += 1
+            print(f"[compactar] mes={mes}: {len(files)} archivos -> 1 ({table.num_rows} filas)")
+        return hechas
+
+    # --- snapshots ---
+    def snapshot(self, keep: Optional[int] = None) -> Optional[Path]:
+        """Snapshot por manifiesto + hardlinks (sin copiar datos)."""
+        if not self.exists():
+            return None
+        manifest = self._recuperar()
+        # sufijo aleatorio: dos snapshots en el mismo segundo no comparten directorio
+        dest = self.snapshots_dir / f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        for mes, files in manifest.items():
+            (dest / f"mes={mes}").mkdir(parents=True, exist_ok=True)
+            for f in files:
+                _link(self.root / f"mes={mes}" / f, dest / f"mes={mes}" / f)
+        with open(dest / MANIFEST, "w", encoding="utf-8") as fh:
+            json.dump(manifest, fh, indent=1, sort_keys=True)
+        if keep:
+            for old in sorted(self.snapshots_dir.iterdir())[:-keep]:
+                shutil.rmtree(old, ignore_errors=True)
+        return dest
+
+    def restore(self, nombre: str) -> None:
+        src = self.snapshots_dir / nombre
+        if not (src / MANIFEST).exists():
+            raise FileNotFoundError(f"No existe el snapshot {src}")
+        shutil.rmtree(self.root, ignore_errors=True)
+        for f in src.glob("mes=*/part-*.parquet"):
+            (self.root / f.parent.name).mkdir(parents=True, exist_ok=True)
+            _link(f, self.root / f.parent.name / f.name)
+        shutil.copy2(src / MANIFEST, self.root / MANIFEST)
+        self._recuperado = False
+
+    def info(self) -> pd.DataFrame:
+        manifest = self.load_manifest()
+        return pd.DataFrame([
+            {"mes": mes, "archivos": len(files), "filas": sum(v["rows"] for v in files.values()),
+             "MB": sum(v["bytes"] for v in files.values()) / 1e6}
+            for mes, files in sorted(manifest.items())
+        ])
+
+
+def _publicar(tmp: Path) -> None:
+    """`.<name>.tmp` -> `<name>`."""
+    os.replace(tmp, tmp.with_name(tmp.name[1:-len(".tmp")]))
+
+
+def _link(src: Path, dst: Path) -> None:
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)  # FS sin hardlinks
+
+
+def _entrada(f: Path) -> dict:
+    """Entrada de manifiesto leída del footer (sin min/max de fecha)."""
+    return {"rows": pq.ParquetFile(f).metadata.num_rows, "bytes": f.stat().st_size, "min": None, "max": None}
+
+
+def _iso(v) -> Optional[str]:
+    return v.isoformat() if v is not None else None
+
+
+def _ts(v, tz) -> pd.Timestamp:
+    t = pd.Timestamp(v)
+    if tz and t.tzinfo is None:
+        t = t.tz_localize(tz)
+    return t
+
+
+def _and(a, b):
+    return b if a is None else (a & b)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Mantenimiento de datasets Parquet particionados por mes.")
+    ap.add_argument("comando", choices=["info", "compactar", "snapshot", "restaurar", "migrar"])
+    ap.add_argument("--root", required=True, help="Directorio del dataset")
+    ap.add_argument("--snapshot", help="Nombre del snapshot a restaurar")
+    ap.add_argument("--keep", type=int, default=None, help="Snapshots a conservar")
+    ap.add_argument("--desde", help="Parquet plano a migrar al dataset")
+    args = ap.parse_args()
+
+    # el esquema se toma de un archivo existente (o del parquet a migrar)
+    fuente = args.desde or next(Path(args.root).glob("mes=*/part-*.parquet"), None)
+    if fuente is None:
+        raise SystemExit(f"[ERROR] {args.root} no tiene archivos (¿falta --desde?)")
+    schema = pq.read_schema(fuente).remove_metadata()
+    if args.comando == "migrar":
+        i = schema.get_field_index("fecha")
+        if i >= 0 and not pa.types.is_timestamp(schema.field(i).type):
+            schema = schema.set(i, pa.field("fecha", pa.timestamp("us")))
+    store = PartitionedStore(args.root, schema)
+
+    if args.comando == "info":
+        print(store.info().to_string(index=False))
+    elif args.comando == "compactar":
+        print(f"[OK] {store.compact()} particiones compactadas")
+    elif args.comando == "snapshot":
+        print(f"[OK] Snapshot: {store.snapshot(keep=args.keep)}")
+    elif args.comando == "restaurar":
+        store.restore(args.snapshot)
+        print(f"[OK] Restaurado {args.snapshot}")
+    elif args.comando == "migrar":
+        n = 0
+        for batch in pq.ParquetFile(args.desde).iter_batches(batch_size=20_000):
+            n += store.append(batch.to_pandas())
+        store.compact()
+        print(f"[OK] Migradas {n} filas a {args.root}")
+
+
+if __name__ == "__main__":
+    main()
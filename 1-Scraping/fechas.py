@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Normalización vectorizada de fechas para todos los scrapers.
+
+Cada parser recibe un array / lista / Series de strings y devuelve una Series
+`datetime64[ns, America/Argentina/Buenos_Aires]` (NaT donde no se pudo parsear):
+
+- `parse_fecha_es`: "15 de abril de 2025 - 10:30" (Ámbito). Hora local de Buenos Aires.
+- `parse_iso`:      "2025-04-15T10:30:00-03:00", "...Z", "2025-04-15" (sitemaps, JSON-LD).
+                    Sin offset se asume hora de Buenos Aires.
+- `parse_rfc822`:   "Tue, 15 Apr 2025 13:30:00 GMT" / "+0000" / "-0300" (RSS).
+                    Sin zona se asume UTC (como publican la mayoría de los RSS).
+- `a_dia`:          timestamps -> fecha del día en Buenos Aires (naive, a medianoche).
+
+Todo se resuelve con operaciones de columna (regex `str.extract` + `pd.to_datetime`
+con formato fijo); solo las filas raras de RSS caen a `dateutil` fila por fila.
+Benchmark contra las funciones anteriores: `python bench_fechas.py`.
+"""
+
+from typing import Iterable, Union
+
+import pandas as pd
+from dateutil import parser as dateparser
+
+TZ = "America/Argentina/Buenos_Aires"
+
+MESES_ES = {
+    "enero": "01", "febrero": "02", "marzo": "03", "abril": "04", "mayo": "05", "junio": "06",
+    "julio": "07", "agosto": "08", "septiembre": "09", "setiembre": "09", "octubre": "10",
+    "noviembre": "11", "diciembre": "12",
+}
+MESES_EN = {
+    "jan": "01", "feb": "02", "mar": "03", "apr": "04", "may": "05", "jun": "06",
+    "jul": "07", "aug": "08", "sep": "09", "oct": "10", "nov": "11", "dec": "12",
+}
+# zonas con nombre que aparecen en RSS (RFC 822)
+ZONAS = {
+    "GMT": "+00:00", "UTC": "+00:00", "UT": "+00:00", "Z": "+00:00",
+    "EST": "-05:00", "EDT": "-04:00", "CST": "-06:00", "CDT": "-05:00",
+    "MST": "-07:00", "MDT": "-06:00", "PST": "-08:00", "PDT": "-07:00",
+    "ART": "-03:00", "": "+00:00",
+}
+
+Valores = Union[pd.Series, Iterable[str]]
+
+RE_ES = (r"(?P<d>\d{1,2})\s+de\s+(?P<mes>[a-záéíóú]+)\s+de\s+(?P<y>\d{4})"
+         r"(?:\D+(?P<H>\d{1,2}):(?P<M>\d{2}))?")
+RE_RFC822 = (r"^\s*(?:[A-Za-z]{3},?\s*)?(?P<d>\d{1,2})\s+(?P<mes>[A-Za-z]{3})[A-Za-z]*\.?\s+(?P<y>\d{2,4})"
+             r"\s+(?P<H>\d{1,2}):(?P<M>\d{2})(?::(?P<S>\d{2}))?\s*(?P<tz>[A-Za-z]{1,4}|[+-]\d{2}:?\d{2})?\s*$")
+RE_OFFSET = r"(?:Z|[+-]\d{2}:?\d{2})$"
+
+
+def _serie(values: Valores) -> pd.Series:
+    if isinstance(values, pd.Series):
+        return values.astype("string")
+    return pd.Series(list(values), dtype="string")
+
+
+def _vacia(s: pd.Series) -> pd.Series:
+    return pd.Series(pd.NaT, index=s.index, dtype=f"datetime64[ns, {TZ}]")
+
+
+def _ns(s: pd.Series) -> pd.Series:
+    # unidad fija para que las Series de distintos parsers sean combinables
+    return s.astype(f"datetime64[ns, {TZ}]")
+
+
+def parse_iso(values: Valores) -> pd.Series:
+    """ISO 8601 con o sin offset. Sin offset -> hora local de Buenos Aires."""
+    s = _serie(values).str.strip()
+    if s.empty:
+        return _vacia(s)
+    con_tz = s.str.contains(RE_OFFSET, regex=True, na=False)
+    a = pd.to_datetime(s.where(con_tz), utc=True, format="ISO8601", errors="coerce").dt.tz_convert(TZ)
+    b = pd.to_datetime(s.where(~con_tz), format="ISO8601", errors="coerce")
+    b = b.dt.tz_localize(TZ, ambiguous="NaT", nonexistent="NaT")
+    return _ns(a).where(con_tz, _ns(b))
+
+
+def parse_fecha_es(values: Valores) -> pd.Series:
+    """'15 de abril de 2025 - 10:30' -> Timestamp (Buenos Aires). La hora es opcional."""
+    s = _serie(values).str.lower()
+    if s.empty:
+        return _vacia(s)
+    e = s.str.extract(RE_ES)
+    mes = e["mes"].map(MESES_ES)
+    iso = (e["y"] + "-" + mes + "-" + e["d"].str.zfill(2) + " "
+           + e["H"].fillna("0").str.zfill(2) + ":" + e["M"].fillna("00"))
+    out = pd.to_datetime(iso, format="%Y-%m-%d %H:%M", errors="coerce")
+    return _ns(out.dt.tz_localize(TZ, ambiguous="NaT", nonexistent="NaT"))
+
+
+def parse_rfc822(values: Valores) -> pd.Series:
+    """Fechas RSS (RFC 822/2822). Sin zona -> UTC. Filas no estándar: ISO y, si no, dateutil."""
+    s = _serie(values)
+    if s.empty:
+        return _vacia(s)
+    e = s.str.extract(RE_RFC822)
+    y = e["y"].where(e["y"].str.len() == 4, "20" + e["y"])
+    tz = e["tz"].fillna("").str.upper().map(ZONAS)
+    tz = tz.fillna(e["tz"].str.replace(r"^([+-]\d{2}):?(\d{2})$", r"\1:\2", regex=True))
+    iso = (y + "-" + e["mes"].str.lower().map(MESES_EN) + "-" + e["d"].str.zfill(2) + "T"
+           + e["H"].str.zfill(2) + ":" + e["M"] + ":" + e["S"].fillna("00") + tz)
+    out = pd.to_datetime(iso, utc=True, format="%Y-%m-%dT%H:%M:%S%z", errors="coerce").dt.tz_convert(TZ)
+    out = _ns(out)
+
+    # resto: ISO (Atom) y, en última instancia, dateutil fila por fila
+    resto = out.isna() & s.notna() & (s.str.strip() != "")
+    if resto.any():
+        out[resto] = parse_iso(s[resto])
+        resto = out.isna() & s.notna() & (s.str.strip() != "")
+        for i in s.index[resto]:
+            out[i] = _dateutil_one(s[i])
+    return out
+
+
+def _dateutil_one(value: str):
+    try:
+        t = pd.Timestamp(dateparser.parse(value))
+    except (ValueError, OverflowError, TypeError):
+        return pd.NaT
+    if t.tzinfo is None:
+        t = t.tz_localize("UTC")
+    return t.tz_convert(TZ)
+
+
+def a_dia(fechas: pd.Series) -> pd.Series:
+    """Timestamps (tz-aware) -> día en Buenos Aires como datetime naive a medianoche."""
+    f = pd.Series(fechas)
+    if f.dt.tz is not None:
+        f = f.dt.tz_convert(TZ).dt.tz_localize(None)
+    return f.dt.normalize()
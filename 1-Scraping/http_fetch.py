@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Motor de descargas concurrente y "educado" para los scrapers.
+
+- Sesión `requests` con pool de conexiones keep-alive (una por host).
+- Límite de concurrencia configurable (pool de threads).
+- Rate limit por host con token bucket (reemplaza los `time.sleep` fijos).
+- Reintentos con backoff exponencial + jitter ante errores de red, 429 y 5xx
+  (respeta `Retry-After` si el servidor lo envía).
+- Cada intento queda en la telemetría (`telemetria.TELEMETRIA`): latencia, bytes, código o
+  tipo de error, reintentos y espera en el rate limit.
+
+Uso:
+  from http_fetch import Fetcher
+  fetcher = Fetcher(concurrency=16, rps=8)
+  r = fetcher.get("https://www.lanacion.com.ar/sitemap-index.xml")
+  for url, res in fetcher.map(parse, urls):
+      ...
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from telemetria import TELEMETRIA, Telemetria, tipo_error
+
+UA = "Mozilla/5.0 (compatible; SantiScraper/1.0; +https://example.com/bot)"
+
+# códigos que vale la pena reintentar
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    """Token bucket thread-safe: `rate` tokens/seg con ráfagas de hasta `burst`."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Bloquea hasta que haya un token disponible."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                wait = (1.0 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class Fetcher:
+    """Cliente HTTP compartido entre threads con rate limit por host y reintentos."""
+
+    def __init__(
+        self,
+        concurrency: int = 8,
+        rps: float = 4.0,
+        timeout: float = 20,
+        retries: int = 4,
+        backoff: float = 1.0,
+        headers: Optional[Dict[str, str]] = None,
+        telemetria: Optional[Telemetria] = None,
+    ):
+        self.concurrency = max(1, int(concurrency))
+        self.rps = rps
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.telemetria = telemetria or TELEMETRIA
+
+        self.session = requests.Session()
+        self.session.headers.update(headers or {"User-Agent": UA})
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._buckets_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    # --- rate limit ---
+    def bucket_for(self, url: str) -> TokenBucket:
+        host = urlparse(url).netloc.lower()
+        with self._buckets_lock:
+            b = self._buckets.get(host)
+            if b is None:
+                b = self._buckets[host] = TokenBucket(self.rps)
+            return b
+
+    def _sleep_backoff(self, url: str, motivo: str, attempt: int, retry_after: Optional[str] = None) -> None:
+        wait = None
+        if retry_after:
+            try:
+                wait = min(float(retry_after), 60.0)
+            except ValueError:
+                pass
+        if wait is None:
+            # "full jitter": uniforme en [0, backoff * 2^attempt]
+            wait = random.uniform(0, self.backoff * (2 ** attempt))
+        self.telemetria.reintento(url, motivo, wait)
+        time.sleep(wait)
+
+    # --- requests ---
+    def get(self, url: str, timeout: Optional[float] = None, **kwargs) -> requests.Response:
+        """GET con rate limit por host y reintentos. Devuelve la última respuesta obtenida."""
+        timeout = timeout or self.timeout
+        bucket = self.bucket_for(url)
+        last_exc: Optional[Exception] = None
+        tel = self.telemetria
+        for attempt in range(self.retries + 1):
+            t0 = time.perf_counter()
+            bucket.acquire()
+            t1 = time.perf_counter()
+            tel.espera(url, t1 - t0)
+            try:
+                r = self.session.get(url, timeout=timeout, **kwargs)
+            except requests.RequestException as e:
+                tel.request(url, None, time.perf_counter() - t1, intento=attempt, error=e)
+                last_exc = e
+                if attempt < self.retries:
+                    self._sleep_backoff(url, tipo_error(e), attempt)
+                continue
+            # con stream=True el cuerpo no se leyó: se cuenta Content-Length (comprimido) si viene
+            nbytes = int(r.headers.get("Content-Length") or 0) if kwargs.get("stream") else len(r.content)
+            tel.request(url, r.status_code, time.perf_counter() - t1, nbytes=nbytes, intento=attempt)
+            if r.status_code in RETRY_STATUS and attempt < self.retries:
+                self._sleep_backoff(url, str(r.status_code), attempt, r.headers.get("Retry-After"))
+                continue
+            return r
+        raise last_exc if last_exc else requests.RequestException(f"Sin respuesta de {url}")
+
+    # --- concurrencia ---
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        return self._executor
+
+    def map(self, fn: Callable, items: Iterable) -> Iterator[Tuple[object, object]]:
+        """Aplica `fn` a cada item en el pool; devuelve (item, resultado) a medida que terminan.
+
+        Si `fn` lanza una excepción, el resultado es la excepción (no corta la iteración).
+        Hay a lo sumo `2 * concurrency` items en vuelo: los resultados no entregados no se
+        acumulan (la memoria no depende de cuántos items haya).
+        """
+        items = iter(items)
+        ventana = 2 * self.concurrency
+        futures: Dict[Future, object] = {}
+
+        def llenar():
+            for it in islice(items, ventana - len(futures)):
+                futures[self.executor.submit(fn, it)] = it
+
+        llenar()
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for fut in done:
+                item = futures.pop(fut)
+                try:
+                    res = fut.result()
+                except Exception as e:
+                    res = e
+                yield item, res
+            llenar()
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark del parseo de sitemaps: camino anterior (BeautifulSoup "xml" + find_all/regex)
+vs. lector en streaming (`lanacion_scraper.iter_sitemap`, lxml iterparse).
+
+Mide tiempo (mejor de N repeticiones) y pico de memoria (tracemalloc) sobre un sitemap
+guardado en disco, sin tocar la red. El fixture por defecto es un sitemap mensual
+sintético con el formato de La Nación (20k <url>, 1/3 con <news:news>).
+
+Uso:
+  python bench_sitemap.py
+  python bench_sitemap.py --fixture fixtures/sitemap-2025-03.xml.gz --repeat 5
+"""
+
+import argparse
+import gzip
+import re
+import time
+import tracemalloc
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from lanacion_scraper import iter_sitemap
+
+FIXTURE = Path(__file__).parent / "fixtures" / "sitemap-2025-03.xml.gz"
+
+
+def legacy_extract(data: bytes):
+    """Camino anterior: DOM completo con BeautifulSoup y búsquedas por regex por entrada."""
+    content = gzip.decompress(data) if data[:2] == b"\x1f\x8b" else data
+    s = BeautifulSoup(content, "xml")
+    results = []
+    for url_tag in s.find_all("url"):
+        loc_tag = url_tag.find("loc")
+        if not loc_tag:
+            continue
+        loc = loc_tag.get_text(strip=True)
+        lastmod = None
+        if url_tag.find("lastmod"):
+            lastmod = url_tag.find("lastmod").get_text(strip=True)
+        pub_date = None
+        news_tag = url_tag.find(re.compile(r"news:news"))
+        if news_tag:
+            pub = news_tag.find(re.compile(r"news:publication_date"))
+            if pub:
+                pub_date = pub.get_text(strip=True)
+        results.append((loc, lastmod, pub_date))
+    return results
+
+
+def streaming_extract(path: Path):
+    with open(path, "rb") as f:
+        return list(iter_sitemap(f))
+
+
+def streaming_count(path: Path) -> int:
+    # consume sin materializar la lista (uso real en run())
+    with open(path, "rb") as f:
+        return sum(1 for _ in iter_sitemap(f))
+
+
+def measure(fn, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out, best, peak
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark de parseo de sitemaps (BeautifulSoup vs iterparse).")
+    ap.add_argument("--fixture", default=str(FIXTURE), help="Sitemap .xml o .xml.gz")
+    ap.add_argument("--repeat", type=int, default=3, help="Repeticiones (se reporta la mejor)")
+    args = ap.parse_args()
+
+    path = Path(args.fixture)
+    data = path.read_bytes()
+
+    legacy, t_legacy, m_legacy = measure(lambda: legacy_extract(data), args.repeat)
+    stream, t_stream, m_stream = measure(lambda: streaming_extract(path), args.repeat)
+    n, t_count, m_count = measure(lambda: streaming_count(path), args.repeat)
+
+    assert legacy == stream, "Los dos caminos no devuelven las mismas entradas"
+
+    print(f"Fixture: {path} ({len(data) / 1e6:.2f} MB, {n} entradas)")
+    print(f"{'camino':<28}{'tiempo (s)':>12}{'entradas/s':>14}{'pico MB':>10}")
+    for name, t, m in [
+        ("bs4 (anterior)", t_legacy, m_legacy),
+        ("iterparse -> lista", t_stream, m_stream),
+        ("iterparse streaming", t_count, m_count),
+    ]:
+        print(f"{name:<28}{t:>12.3f}{n / t:>14,.0f}{m / 1e6:>10.1f}")
+    print(f"Speedup: x{t_legacy / t_count:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,10 +6,17 @@ Respetuoso de robots.txt: usa sitemaps y evita endpoints prohibidos.
 
 Uso:
   python lanacion_scraper.py --start 2025-01-01 --end 2025-04-30 \
-    --sections politica economia --out noticias_2025Q1.parquet --with-text
+    --sections politica economia --out noticias_2025Q1.parquet --with-text \
+    --concurrency 16 --rps 8
+
+  # si se cortó (crash, ban, Ctrl-C), retomar sin volver a descargar lo ya guardado:
+  python lanacion_scraper.py ... --out noticias_2025Q1.parquet --resume
+
+  # métricas para Prometheus (textfile) + traza JSONL de cada request/parseo (ver ../telemetria.py)
+  python lanacion_scraper.py ... --metrics-file lanacion.prom --trace lanacion.trace.jsonl
 
 Requisitos:
-  pip install requests beautifulsoup4 lxml pandas pyarrow (pyarrow opcional)
+  pip install requests beautifulsoup4 lxml pandas pyarrow
 """
 
 import argparse
@@ -18,14 +25,25 @@ import gzip
 import io
 import json
 import re
+import shutil
 import sys
-import time
-from typing import Iterable, List, Optional, Tuple
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple
 from urllib.parse import urlparse
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
 import requests
 from bs4 import BeautifulSoup
+from lxml import etree
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from fechas import TZ, parse_iso  # noqa: E402
+from http_fetch import Fetcher  # noqa: E402
+from parquet_stream import ProgressJournal, RowGroupWriter  # noqa: E402
+from telemetria import TELEMETRIA, configurar  # noqa: E402
 
 BASE = "https://www.lanacion.com.ar"
 SITEMAP_INDEX_HIST = f"{BASE}/sitemap-index-historico.xml"
@@ -33,46 +51,101 @@ SITEMAP_INDEX = f"{BASE}/sitemap-index.xml"         # reciente
 SITEMAP_NEWS = f"{BASE}/sitemap-news.xml"           # muy reciente
 UA = "Mozilla/5.0 (compatible; SantiScraper/1.0; +https://example.com/bot)"
 
+# esquema fijo de salida (row groups homogéneos aunque falte `texto` en alguno)
+ARTICLE_SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("seccion", pa.string()),
+    ("fecha_publicacion", pa.string()),
+    ("titulo", pa.string()),
+    ("url", pa.string()),
+    ("bajada", pa.string()),
+    ("texto", pa.string()),
+    ("status", pa.int64()),
+])
+
+# cliente HTTP compartido (pool keep-alive + rate limit por host); se configura en run()
+FETCHER: Optional[Fetcher] = None
+
 
 def yyyymm(date: dt.date) -> str:
     return f"{date.year:04d}-{date.month:02d}"
 
 
-def http_get(url: str, sleep: float = 0.8, timeout: int = 20) -> requests.Response:
-    """GET con UA y reintentos básicos."""
-    for i in range(4):
-        try:
-            r = requests.get(url, headers={"User-Agent": UA}, timeout=timeout)
-            if r.status_code == 200:
-                time.sleep(sleep)
-                return r
-            elif r.status_code in (403, 404):
-                time.sleep(sleep)
-                return r
-        except requests.RequestException:
-            time.sleep(1.5 * (i + 1))
-    # última intención
-    r = requests.get(url, headers={"User-Agent": UA}, timeout=timeout)
-    time.sleep(sleep)
-    return r
-
-
-def parse_xml_bytes(data: bytes) -> BeautifulSoup:
-    return BeautifulSoup(data, "xml")
-
-
-def fetch_xml(url: str) -> Optional[BeautifulSoup]:
-    r = http_get(url)
-    if r.status_code != 200:
-        return None
-    content = r.content
-    # algunos sitemaps pueden venir .gz aunque la URL sea .xml
-    if r.headers.get("Content-Type", "").endswith("gzip") or url.endswith(".gz"):
-        try:
-            content = gzip.decompress(content)
-        except OSError:
-            pass
-    return parse_xml_bytes(content)
+def configure_fetcher(concurrency: int = 8, rps: float = 4.0) -> Fetcher:
+    """Crea (o reemplaza) el cliente HTTP compartido."""
+    global FETCHER
+    if FETCHER is not None:
+        FETCHER.close()
+    FETCHER = Fetcher(concurrency=concurrency, rps=rps, headers={"User-Agent": UA})
+    return FETCHER
+
+
+def http_get(url: str, timeout: int = 20, stream: bool = False) -> requests.Response:
+    """GET con UA, rate limit por host y reintentos con backoff (ver http_fetch.Fetcher)."""
+    fetcher = FETCHER or configure_fetcher()
+    return fetcher.get(url, timeout=timeout, stream=stream)
+
+
+class ChunkReader(io.RawIOBase):
+    """Adapta un iterador de bloques de bytes (p.ej. `Response.iter_content`) a un archivo binario."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._buf = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buf:
+            try:
+                self._buf = next(self._chunks)
+            except StopIteration:
+                return 0
+        n = min(len(b), len(self._buf))
+        b[:n] = self._buf[:n]
+        self._buf = self._buf[n:]
+        return n
+
+
+def open_maybe_gzip(raw: BinaryIO) -> BinaryIO:
+    """Envuelve un stream binario descomprimiendo gzip si corresponde (detecta el magic number)."""
+    buf = raw if hasattr(raw, "peek") else io.BufferedReader(raw)
+    if buf.peek(2)[:2] == b"\x1f\x8b":
+        return gzip.GzipFile(fileobj=buf)
+    return buf
+
+
+def iter_sitemap(source: BinaryIO, entry: str = "url") -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+    """Lee un sitemap en streaming (iterparse) y produce (loc, lastmod, publication_date).
+
+    - Memoria constante: cada <url>/<sitemap> se libera apenas se procesa.
+    - Tolera namespaces (sitemap 0.9, news, o sin namespace) y gzip transparente.
+    - `entry="sitemap"` sirve para índices de sitemaps.
+    """
+    f = open_maybe_gzip(source)
+    for _, el in etree.iterparse(f, events=("end",), tag=f"{{*}}{entry}", huge_tree=True):
+        loc = (el.findtext("{*}loc") or "").strip()
+        if loc:
+            lastmod = (el.findtext("{*}lastmod") or "").strip() or None
+            pub = (el.findtext("{*}news/{*}publication_date") or "").strip() or None
+            yield loc, lastmod, pub
+        # liberar el nodo y los hermanos ya procesados
+        el.clear(keep_tail=True)
+        while el.getprevious() is not None:
+            del el.getparent()[0]
+
+
+def iter_sitemap_url(url: str, entry: str = "url") -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+    """Descarga un sitemap en streaming y lo parsea sin materializar el XML completo."""
+    r = http_get(url, stream=True)
+    try:
+        if r.status_code != 200:
+            return
+        # iter_content resuelve Content-Encoding; un .gz "real" lo detecta open_maybe_gzip
+        yield from iter_sitemap(ChunkReader(r.iter_content(chunk_size=1 << 16)), entry=entry)
+    finally:
+        r.close()
 
 
 def month_sitemaps_in_range(start: dt.date, end: dt.date) -> List[str]:
@@ -80,60 +153,31 @@ def month_sitemaps_in_range(start: dt.date, end: dt.date) -> List[str]:
     urls = set()
 
     # índice histórico (mensual/anual)
-    doc_hist = fetch_xml(SITEMAP_INDEX_HIST)
-    if doc_hist:
-        for sm in doc_hist.find_all("sitemap"):
-            loc = sm.loc.get_text(strip=True) if sm.loc else ""
-            # heurística: incluyen "YYYY-MM" o similares
-            if re.search(r"\d{4}-\d{2}", loc):
-                m = re.search(r"(\d{4})-(\d{2})", loc)
-                if m:
-                    y, mo = int(m.group(1)), int(m.group(2))
-                    first = dt.date(y, mo, 1)
-                    last = (first.replace(day=28) + dt.timedelta(days=4)).replace(day=1) - dt.timedelta(days=1)
-                    # intersección con rango pedido
-                    if not (last < start or first > end):
-                        urls.add(loc)
+    for loc, _, _ in iter_sitemap_url(SITEMAP_INDEX_HIST, entry="sitemap"):
+        # heurística: incluyen "YYYY-MM" o similares
+        m = re.search(r"(\d{4})-(\d{2})", loc)
+        if m:
+            y, mo = int(m.group(1)), int(m.group(2))
+            first = dt.date(y, mo, 1)
+            last = (first.replace(day=28) + dt.timedelta(days=4)).replace(day=1) - dt.timedelta(days=1)
+            # intersección con rango pedido
+            if not (last < start or first > end):
+                urls.add(loc)
 
     # índice “reciente”
-    doc_idx = fetch_xml(SITEMAP_INDEX)
-    if doc_idx:
-        for sm in doc_idx.find_all("sitemap"):
-            loc = sm.loc.get_text(strip=True) if sm.loc else ""
-            urls.add(loc)
+    for loc, _, _ in iter_sitemap_url(SITEMAP_INDEX, entry="sitemap"):
+        urls.add(loc)
 
-    # news (muy reciente, por las dudas)
-    doc_news = fetch_xml(SITEMAP_NEWS)
-    if doc_news:
-        urls.add(SITEMAP_NEWS)
+    # news (muy reciente, por las dudas); si no responde, su lectura no produce URLs
+    urls.add(SITEMAP_NEWS)
 
     return sorted(urls)
 
 
-def extract_urls_from_sitemap(sm_url: str) -> List[Tuple[str, Optional[str]]]:
-    """Devuelve [(url, lastmod_iso)] desde un sitemap o sitemap de noticias."""
-    s = fetch_xml(sm_url)
-    results = []
-    if not s:
-        return results
-
+def extract_urls_from_sitemap(sm_url: str) -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+    """Produce (url, lastmod_iso, publication_date_iso) desde un sitemap o sitemap de noticias."""
     # dos formatos comunes: <urlset><url> y <urlset><url><news:news>...
-    for url_tag in s.find_all("url"):
-        loc_tag = url_tag.find("loc")
-        if not loc_tag:
-            continue
-        loc = loc_tag.get_text(strip=True)
-        lastmod = None
-        if url_tag.find("lastmod"):
-            lastmod = url_tag.find("lastmod").get_text(strip=True)
-        # intenta news:publication_date
-        news_tag = url_tag.find(re.compile(r"news:news"))
-        if news_tag:
-            pub = news_tag.find(re.compile(r"news:publication_date"))
-            if pub:
-                lastmod = pub.get_text(strip=True)
-        results.append((loc, lastmod))
-    return results
+    return iter_sitemap_url(sm_url, entry="url")
 
 
 def normalize_date(s: str) -> Optional[dt.datetime]:
@@ -163,12 +207,54 @@ def extract_id_from_url(url: str) -> Optional[str]:
     return m.group(1) if m else None
 
 
+def nid_dates(urls: pd.Series) -> pd.Series:
+    """Decodifica el sufijo -nidDDMMYYYY (fecha de publicación) de toda la columna de URLs.
+
+    NaT donde el nid no es una fecha.
+    """
+    # ejemplo: ...-nid07092025/  ó ...-nid18022025/
+    nid = urls.str.extract(r"-nid(\d+)", expand=False)
+    d = pd.to_datetime(nid.where(nid.str.len() == 8), format="%d%m%Y", errors="coerce")
+    # nids viejos son numéricos y pueden "parecer" fechas: acotamos a años plausibles
+    d = d.where(d.dt.year.between(1995, dt.date.today().year + 1))
+    return d.dt.tz_localize(TZ)
+
+
+def prefilter_by_date(urls: List[str], lastmods: List[Optional[str]], pub_dates: List[Optional[str]],
+                      start_date: dt.date, end_date: dt.date) -> pd.Series:
+    """Decide qué notas vale la pena descargar usando solo datos del sitemap/URL (vectorizado).
+
+    Devuelve una Series int8 alineada con `urls`: 1 -> publicada dentro del rango;
+    0 -> seguro fuera de rango (no descargar); -1 -> ambiguo (hay que descargar y mirar
+    la fecha real de la nota).
+    """
+    urls = pd.Series(urls, dtype="string")
+    start = pd.Timestamp(start_date).tz_localize(TZ)
+    end = pd.Timestamp(end_date).tz_localize(TZ)
+
+    # 1) fecha de publicación explícita: nid o news:publication_date (día en Buenos Aires)
+    pub = nid_dates(urls).fillna(parse_iso(pub_dates).dt.normalize())
+    out = pd.Series(-1, index=urls.index, dtype="int8")
+    known = pub.notna()
+    out[known] = ((pub >= start) & (pub <= end))[known].astype("int8")
+
+    # 2) lastmod: la nota se publicó en o antes de su última modificación
+    lastmod = parse_iso(lastmods).dt.normalize()
+    out[~known & (lastmod < start)] = 0
+    return out
+
+
 def parse_article(url: str, with_text: bool = False) -> dict:
-    r = http_get(url, sleep=0.7)
+    r = http_get(url)
     if r.status_code != 200:
         return {"url": url, "status": r.status_code}
+    with TELEMETRIA.span("parse_article"):
+        return extract_article(url, r.text, with_text=with_text)
 
-    soup = BeautifulSoup(r.text, "lxml")
+
+def extract_article(url: str, html: str, with_text: bool = False) -> dict:
+    """Campos de la nota a partir de su HTML (solo CPU: es el span `parse_article` de la telemetría)."""
+    soup = BeautifulSoup(html, "lxml")
 
     # Título
     title = None
@@ -238,10 +324,63 @@ def parse_article(url: str, with_text: bool = False) -> dict:
     }
 
 
-def run(start: str, end: str, sections: List[str], out: str, with_text: bool):
+def _in_range(art: dict, start_date: dt.date, end_date: dt.date) -> bool:
+    """Filtro final por fecha_publicacion real de la nota."""
+    pub = art.get("fecha_publicacion")
+    if not pub:
+        return False
+    try:
+        dpub = dt.datetime.fromisoformat(pub).date()
+    except Exception:
+        return False
+    return start_date <= dpub <= end_date
+
+
+def run(start: str, end: str, sections: List[str], out: str, with_text: bool,
+        concurrency: int = 8, rps: float = 4.0, resume: bool = False, row_group_size: int = 500,
+        metrics_file: Optional[str] = None, trace: Optional[str] = None, progress_every: float = 10.0):
     start_date = dt.datetime.strptime(start, "%Y-%m-%d").date()
     end_date = dt.datetime.strptime(end, "%Y-%m-%d").date()
 
+    # Checkpoints: row groups en <out>.parts/ + bitácora <out>.journal.jsonl
+    parts_dir = Path(f"{out}.parts")
+    journal = ProgressJournal(Path(f"{out}.journal.jsonl"))
+    header = {"start": start, "end": end, "sections": sorted(sections), "with_text": with_text}
+
+    state = journal.load() if resume else None
+    if state and state["header"] is not None:
+        if state["header"] != header:
+            print(f"[WARN] --resume con parámetros distintos a la corrida original: {state['header']}",
+                  file=sys.stderr)
+        parts = list(state["parts"])
+        # parts sin registrar en la bitácora (crash entre escritura y registro) se descartan
+        for f in parts_dir.glob("part-*.parquet*"):
+            if f.name not in parts:
+                f.unlink()
+        print(f"[INFO] Reanudando: {len(parts)} row groups, {len(state['urls'])} URLs y "
+              f"{len(state['sitemaps'])} sitemaps ya procesados.")
+    else:
+        state = {"parts": [], "urls": set(), "sitemaps": set()}
+        parts = []
+        journal.reset()
+        shutil.rmtree(parts_dir, ignore_errors=True)
+        journal.append({"header": header})
+
+    writer = RowGroupWriter(parts_dir, ARTICLE_SCHEMA, row_group_size=row_group_size, start_index=len(parts))
+    processed: List[str] = []  # URLs procesadas desde el último checkpoint
+
+    def checkpoint():
+        # primero el part (atómico), después la bitácora: lo registrado siempre está en disco
+        part = writer.flush()
+        if part:
+            parts.append(part)
+        if part or processed:
+            journal.append({"part": part, "urls": processed})
+            processed.clear()
+
+    fetcher = configure_fetcher(concurrency=concurrency, rps=rps)
+    tel = configurar("lanacion", metricas=metrics_file, traza=trace, cada=progress_every, unidad="notas")
+
     # Recolectar sitemaps relevantes
     sm_urls = month_sitemaps_in_range(start_date, end_date)
     if not sm_urls:
@@ -252,71 +391,91 @@ def run(start: str, end: str, sections: List[str], out: str, with_text: bool):
     for u in sm_urls:
         print("  -", u)
 
-    rows = []
-    seen = set()
+    seen = set(state["urls"])
+    fetched = skipped = 0
 
-    for sm in sm_urls:
-        print(f"[INFO] Leyendo sitemap: {sm}")
-        try:
-            pairs = extract_urls_from_sitemap(sm)
-        except Exception as e:
-            print(f"[WARN] Error leyendo {sm}: {e}", file=sys.stderr)
-            continue
-
-        for url, lastmod in pairs:
-            if not url.startswith(BASE):
+    try:
+        for sm in sm_urls:
+            # el sitemap de noticias cambia continuamente: nunca se marca como terminado
+            if sm in state["sitemaps"] and sm != SITEMAP_NEWS:
+                print(f"[INFO] Sitemap ya procesado, se saltea: {sm}")
                 continue
-            if not url_matches_sections(url, sections):
+            print(f"[INFO] Leyendo sitemap: {sm}")
+            candidates = []
+            try:
+                for url, lastmod, pub_date in extract_urls_from_sitemap(sm):
+                    if not url.startswith(BASE):
+                        continue
+                    if not url_matches_sections(url, sections):
+                        continue
+                    if url in seen:
+                        continue
+                    seen.add(url)
+                    candidates.append((url, lastmod, pub_date))
+            except Exception as e:
+                print(f"[WARN] Error leyendo {sm}: {e}", file=sys.stderr)
+                tel.error("sitemap", url=sm, error=str(e))
                 continue
 
-            # filtro por fecha: usa lastmod si está, si no después parsea la nota
-            ok_by_lastmod = False
-            if lastmod:
-                dtm = normalize_date(lastmod)
-                if dtm and (start_date <= dtm.date() <= end_date):
-                    ok_by_lastmod = True
-
-            if not ok_by_lastmod:
-                # todavía no sabemos: parsearemos la nota y filtramos por su fecha
-                pass
-
-            if url in seen:
-                continue
-            seen.add(url)
-
-            art = parse_article(url, with_text=with_text)
-            # filtro final por fecha_publicacion real
-            pub = art.get("fecha_publicacion")
-            keep = False
-            if pub:
-                try:
-                    dpub = dt.datetime.fromisoformat(pub).date()
-                    keep = (start_date <= dpub <= end_date)
-                except Exception:
-                    keep = False
-
-            if keep:
-                rows.append(art)
-
-    if not rows:
+            # filtro por fecha antes de descargar (nid / publication_date / lastmod), una pasada por sitemap
+            pending = []
+            if candidates:
+                urls, lastmods, pub_dates = map(list, zip(*candidates))
+                keep = prefilter_by_date(urls, lastmods, pub_dates, start_date, end_date).to_numpy() != 0
+                pending = [u for u, k in zip(urls, keep) if k]
+                skipped += len(urls) - len(pending)
+
+            # descarga concurrente de las notas del sitemap (rate limit por host en el Fetcher)
+            fetched += len(pending)
+            tel.objetivo(len(pending))
+            for url, art in fetcher.map(lambda u: parse_article(u, with_text=with_text), pending):
+                tel.avance()
+                if isinstance(art, Exception):
+                    # no se registra: con --resume se vuelve a intentar
+                    print(f"[WARN] Error en {url}: {art}", file=sys.stderr)
+                    tel.error("articulo", url=url, error=str(art))
+                    continue
+                processed.append(url)
+                if _in_range(art, start_date, end_date):
+                    writer.add(art)
+                if writer.full or len(processed) >= writer.row_group_size:
+                    checkpoint()
+
+            checkpoint()
+            journal.append({"sitemap": sm})
+    except KeyboardInterrupt:
+        print("\n[WARN] Interrumpido: guardando checkpoint (continuar con --resume).", file=sys.stderr)
+        checkpoint()
+        fetcher.close()
+        tel.cerrar()
+        journal.close()
+        sys.exit(130)
+
+    total = fetched + skipped
+    print(f"[INFO] URLs descargadas: {fetched} | descartadas por fecha sin descargar: {skipped}"
+          + (f" ({100 * skipped / total:.1f}%)" if total else ""))
+    fetcher.close()
+    tel.cerrar()
+    journal.close()
+
+    if not parts:
         print("No se encontraron artículos en el rango/condiciones dadas.", file=sys.stderr)
         sys.exit(3)
 
-    df = pd.DataFrame(rows)
-    # columnas mínimas pedidas
-    cols = ["id", "seccion", "fecha_publicacion", "titulo", "url"]
-    extra = [c for c in ["bajada", "texto", "status"] if c in df.columns]
-    df = df[cols + extra]
-
-    # Guardado
-    try:
-        df.to_parquet(out, index=False)
-        print(f"[OK] Guardado Parquet: {out} ({len(df)} filas)")
-    except Exception as e:
-        print(f"[WARN] Parquet falló ({e}). Guardando CSV…")
-        out_csv = re.sub(r"\.parquet$", ".csv", out)
-        df.to_csv(out_csv, index=False)
-        print(f"[OK] Guardado CSV: {out_csv} ({len(df)} filas)")
+    # Guardado final: une los row groups en streaming y limpia los checkpoints
+    if out.lower().endswith(".csv"):
+        n = 0
+        with pacsv.CSVWriter(out, ARTICLE_SCHEMA) as w:
+            for name in parts:
+                table = pq.read_table(parts_dir / name, schema=ARTICLE_SCHEMA)
+                w.write_table(table)
+                n += table.num_rows
+        print(f"[OK] Guardado CSV: {out} ({n} filas)")
+    else:
+        n = writer.merge(out, parts)
+        print(f"[OK] Guardado Parquet: {out} ({n} filas)")
+    writer.cleanup()
+    journal.reset()
 
 
 def main():
@@ -324,10 +483,24 @@ def main():
     ap.add_argument("--start", required=True, help="Fecha inicio (YYYY-MM-DD)")
     ap.add_argument("--end", required=True, help="Fecha fin (YYYY-MM-DD)")
     ap.add_argument("--sections", nargs="+", default=["politica", "economia"], help="Secciones a incluir")
-    ap.add_argument("--out", required=True, help="Ruta de salida .parquet o .csv (si falla parquet)")
+    ap.add_argument("--out", required=True, help="Ruta de salida .parquet (o .csv)")
     ap.add_argument("--with-text", action="store_true", help="Incluir texto completo (más lento)")
+    ap.add_argument("--concurrency", type=int, default=8, help="Descargas simultáneas (default 8)")
+    ap.add_argument("--rps", type=float, default=4.0, help="Máximo de requests/seg por host (default 4)")
+    ap.add_argument("--resume", action="store_true",
+                    help="Continuar una corrida interrumpida (usa <out>.journal.jsonl y <out>.parts/)")
+    ap.add_argument("--row-group-size", type=int, default=500,
+                    help="Filas por row group / checkpoint (default 500)")
+    ap.add_argument("--metrics-file", default=None,
+                    help="Textfile de Prometheus con las métricas de la corrida (se reescribe periódicamente)")
+    ap.add_argument("--trace", default=None, help="Traza JSONL con cada request, reintento, parseo y error")
+    ap.add_argument("--progress-every", type=float, default=10.0,
+                    help="Segundos entre líneas de progreso / exportaciones (0 = solo al final)")
     args = ap.parse_args()
-    run(args.start, args.end, args.sections, args.out, args.with_text)
+    run(args.start, args.end, args.sections, args.out, args.with_text,
+        concurrency=args.concurrency, rps=args.rps, resume=args.resume,
+        row_group_size=args.row_group_size, metrics_file=args.metrics_file, trace=args.trace,
+        progress_every=args.progress_every)
 
 
 if __name__ == "__main__":
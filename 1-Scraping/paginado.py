@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Crawler de secciones paginadas (Clarín, Página/12) con reglas de extracción por sitio.
+
+Reemplaza a `clarin/init.ipynb` y `pagina12/scrapping.ipynb`:
+
+- Reglas por sitio (`SITIOS`): URL del listado, cómo sacar título/link del listado y
+  cómo sacar fecha/título/contenido de la nota.
+- Listados y notas se descargan en paralelo con `http_fetch.Fetcher`
+  (pool keep-alive + rate limit por dominio + reintentos).
+- El rango de páginas para una ventana de fechas se encuentra solo: búsqueda binaria
+  sobre las páginas del listado mirando la fecha de la primera y la última nota de cada
+  página (más nuevas en la página 1). Se puede forzar con `--paginas`.
+- Las notas van directo al dataset particionado por mes `<sitio>/noticias_<sitio>/`
+  (`dataset_store.PartitionedStore`); los CSV por página anteriores (`outputs/*.csv`)
+  se migran la primera vez.
+
+Uso:
+  python paginado.py --sitio clarin --desde 2025-01-01 --hasta 2025-04-30
+  python paginado.py --sitio pagina12 --desde 2025-04-01 --hasta 2025-04-30 --concurrency 8 --rps 2
+  python paginado.py --sitio clarin --desde 2025-01-01 --hasta 2025-04-30 --paginas 76 148
+
+  from paginado import SITIOS, PaginadoCrawler
+"""
+
+import argparse
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+from bs4 import BeautifulSoup
+
+from dataset_store import PartitionedStore
+from fechas import TZ, parse_iso
+from http_fetch import Fetcher
+
+script_dir = Path(__file__).parent
+
+SCHEMA = pa.schema([
+    ("diario", pa.string()),
+    ("fecha", pa.timestamp("us", tz=TZ)),
+    ("titulo", pa.string()),
+    ("contenido", pa.string()),
+    ("url", pa.string()),
+    ("seccion", pa.string()),
+])
+
+
+# --- reglas por sitio ---
+def titulo_texto(anchor) -> Optional[str]:
+    return anchor.get_text(strip=True) or None
+
+
+def titulo_aria(anchor) -> Optional[str]:
+    title = anchor.get("aria-label")
+    prefix = "Ir a la nota "
+    if title and title.startswith(prefix):
+        title = title[len(prefix):]
+    return title
+
+
+@dataclass
+class Sitio:
+    nombre: str
+    diario: str
+    base: str
+    listado: str                      # template con {seccion} y {page}
+    seccion: str = "economia"
+    titulo_listado: Callable = titulo_texto
+    titulo_nota: Tuple[str, Dict] = ("h1", {})
+    cuerpo: Tuple[str, Dict] = ("div", {"class": ["body", "article-body"]})
+    parser: str = "html.parser"
+
+    def url_listado(self, page: int) -> str:
+        return self.listado.format(base=self.base, seccion=self.seccion, page=page)
+
+    @property
+    def dataset_dir(self) -> Path:
+        return script_dir / self.nombre / f"noticias_{self.nombre}"
+
+    @property
+    def csv_anteriores(self) -> List[Path]:
+        return sorted((script_dir / self.nombre / "outputs").glob("*.csv"))
+
+
+SITIOS = {
+    "clarin": Sitio(
+        nombre="clarin", diario="Clarín", base="https://www.clarin.com",
+        listado="{base}/{seccion}/page/{page}",
+        titulo_nota=("h1", {"class": "storyTitle"}),
+    ),
+    "pagina12": Sitio(
+        nombre="pagina12", diario="Pagina 12", base="https://www.pagina12.com.ar",
+        listado="{base}/secciones/{seccion}?page={page}",
+        titulo_listado=titulo_aria,
+    ),
+}
+
+
+def parse_listado(html: bytes, sitio: Sitio) -> List[Dict[str, str]]:
+    """Títulos y links de las notas de una página del listado (en el orden de la página)."""
+    soup = BeautifulSoup(html, sitio.parser)
+    news, vistos = [], set()
+    for noticia in soup.find_all("article"):
+        anchor = noticia.find("a")
+        if not anchor or not anchor.get("href"):
+            continue
+        link = anchor["href"]
+        if not link.startswith("http"):
+            link = sitio.base + link
+        if link in vistos:
+            continue
+        vistos.add(link)
+        news.append({"title": sitio.titulo_listado(anchor), "link": link})
+    return news
+
+
+def parse_nota(html: bytes, sitio: Sitio) -> Dict[str, Optional[str]]:
+    """Fecha (texto crudo), título y contenido de una nota."""
+    soup = BeautifulSoup(html, sitio.parser)
+
+    # fecha: <time class="createDate" datetime="..."> y, si no, el primer <time>
+    fecha = None
+    time_tag = soup.find("time", class_="createDate") or soup.find("time")
+    if time_tag is not None:
+        fecha = time_tag.get("datetime") or time_tag.get_text(strip=True) or None
+
+    tag, attrs = sitio.titulo_nota
+    titulo_tag = soup.find(tag, attrs) or soup.find("h1")
+    titulo = titulo_tag.get_text(strip=True) if titulo_tag else None
+
+    tag, attrs = sitio.cuerpo
+    content = soup.find(tag, attrs) or soup.find("article")
+    contenido = "\n".join(p.get_text(strip=True) for p in content.find_all("p")) if content else None
+    return {"fecha": fecha, "titulo": titulo, "contenido": contenido}
+
+
+# --- crawler ---
+class PaginadoCrawler:
+    """Descarga un rango de páginas de una sección y guarda las notas en un PartitionedStore."""
+
+    def __init__(self, sitio: Sitio, fetcher: Fetcher, store: Optional[PartitionedStore] = None):
+        self.sitio = sitio
+        self.fetcher = fetcher
+        self.store = store or PartitionedStore(sitio.dataset_dir, SCHEMA)
+        self.rangos: Dict[int, Optional[Tuple[pd.Timestamp, pd.Timestamp]]] = {}
+        self.requests = 0
+
+    def _get(self, url: str) -> bytes:
+        self.requests += 1
+        r = self.fetcher.get(url)
+        r.raise_for_status()
+        return r.content
+
+    def listado(self, page: int) -> List[Dict[str, str]]:
+        return parse_listado(self._get(self.sitio.url_listado(page)), self.sitio)
+
+    def nota(self, url: str) -> Dict[str, Optional[str]]:
+        row = parse_nota(self._get(url), self.sitio)
+        row["url"] = url
+        return row
+
+    # --- búsqueda del rango de páginas ---
+    def rango_pagina(self, page: int) -> Optional[Tuple[pd.Timestamp, pd.Timestamp]]:
+        """(más nueva, más vieja) de la página, mirando su primera y última nota. None si está vacía."""
+        if page in self.rangos:
+            return self.rangos[page]
+        news = self.listado(page)
+        rango = None
+        if news:
+            extremos = [news[0]["link"], news[-1]["link"]]
+            notas = [r for _, r in self.fetcher.map(self.nota, extremos) if not isinstance(r, Exception)]
+            fechas = parse_iso([n["fecha"] for n in notas]).dropna()
+            if len(fechas):
+                rango = (fechas.max(), fechas.min())
+        self.rangos[page] = rango
+        print(f"[buscar] página {page}: " + (f"{rango[1]:%Y-%m-%d} .. {rango[0]:%Y-%m-%d}" if rango else "vacía"))
+        return rango
+
+    def _mas_vieja(self, page: int) -> pd.Timestamp:
+        r = self.rango_pagina(page)
+        return r[1] if r else pd.Timestamp.min.tz_localize(TZ)
+
+    def _mas_nueva(self, page: int) -> pd.Timestamp:
+        r = self.rango_pagina(page)
+        return r[0] if r else pd.Timestamp.min.tz_localize(TZ)
+
+    def buscar_paginas(self, desde: pd.Timestamp, hasta: pd.Timestamp, max_page: int = 5000) -> Tuple[int, int]:
+        """Rango [primera, última] de páginas con notas en la ventana, en O(log n) listados.
+
+        Las páginas van de la más nueva (1) a la más vieja, así que "más vieja de la página"
+        y "más nueva de la página" son no crecientes en el número de página.
+        """
+        # cota superior: galope 1, 2, 4, ... hasta pasar `desde` (o quedarse sin páginas)
+        hi = 1
+        while hi < max_page and self._mas_nueva(hi) >= desde:
+            hi *= 2
+        hi = min(hi, max_page)
+
+        # primera página que ya tiene notas del día `hasta` o anteriores
+        fin = hasta + pd.Timedelta(days=1)
+        lo_a, hi_a = 1, hi
+        while lo_a < hi_a:
+            mid = (lo_a + hi_a) // 2
+            if self._mas_vieja(mid) < fin:
+                hi_a = mid
+            else:
+                lo_a = mid + 1
+
+        # última página que todavía tiene notas >= desde
+        lo_b, hi_b = lo_a, hi
+        while lo_b < hi_b:
+            mid = (lo_b + hi_b + 1) // 2
+            if self._mas_nueva(mid) >= desde:
+                lo_b = mid
+            else:
+                hi_b = mid - 1
+        return lo_a, lo_b
+
+    # --- descarga ---
+    def crawl(self, paginas: range, desde: pd.Timestamp, hasta: pd.Timestamp,
+              conocidas: Optional[set] = None, bloque: int = 10) -> int:
+        """Descarga las páginas de a `bloque` (listados en paralelo, luego sus notas en paralelo)."""
+        conocidas = conocidas if conocidas is not None else set()
+        guardadas = 0
+        paginas = list(paginas)
+        for i in range(0, len(paginas), bloque):
+            chunk = paginas[i:i + bloque]
+            links = []
+            for page, news in self.fetcher.map(self.listado, chunk):
+                if isinstance(news, Exception):
+                    print(f"[WARN] Error en el listado de la página {page}: {news}", file=sys.stderr)
+                    continue
+                links += [n["link"] for n in news if n["link"] not in conocidas]
+            links = list(dict.fromkeys(links))
+
+            rows = []
+            for url, row in self.fetcher.map(self.nota, links):
+                if isinstance(row, Exception):
+                    print(f"[WARN] Error en {url}: {row}", file=sys.stderr)
+                    continue
+                rows.append(row)
+            if not rows:
+                continue
+
+            df = pd.DataFrame(rows)
+            df["fecha"] = parse_iso(df["fecha"])
+            df = df[(df["fecha"] >= desde) & (df["fecha"] < hasta + pd.Timedelta(days=1))]
+            df["diario"] = self.sitio.diario
+            df["seccion"] = self.sitio.seccion
+            guardadas += self.store.append(df)
+            conocidas.update(df["url"])
+            print(f"[OK] páginas {chunk[0]}-{chunk[-1]}: {len(rows)} notas, {len(df)} en rango")
+        return guardadas
+
+
+def migrar_csv(sitio: Sitio, store: PartitionedStore) -> int:
+    """Importa los CSV por página del notebook anterior al dataset (solo si está vacío)."""
+    if store.exists() or not sitio.csv_anteriores:
+        return 0
+    n = 0
+    for f in sitio.csv_anteriores:
+        df = pd.read_csv(f, dtype=str).rename(columns={"titulo noticia": "titulo", "link": "url"})
+        df["fecha"] = parse_iso(df["fecha"])
+        df["seccion"] = sitio.seccion
+        n += store.append(df)
+    store.compact()
+    print(f"Migrados {n} registros de {len(sitio.csv_anteriores)} CSV a {sitio.dataset_dir.name}/")
+    return n
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Crawler concurrente de secciones paginadas (Clarín / Página/12).")
+    ap.add_argument("--sitio", required=True, choices=list(SITIOS))
+    ap.add_argument("--seccion", default=None, help="Sección del sitio (default: economia)")
+    ap.add_argument("--desde", required=True, help="YYYY-MM-DD")
+    ap.add_argument("--hasta", required=True, help="YYYY-MM-DD (inclusive)")
+    ap.add_argument("--paginas", nargs=2, type=int, metavar=("PRIMERA", "ULTIMA"),
+                    help="Forzar el rango de páginas (sin búsqueda binaria)")
+    ap.add_argument("--concurrency", type=int, default=8, help="Descargas simultáneas")
+    ap.add_argument("--rps", type=float, default=2.0, help="Requests por segundo por dominio")
+    ap.add_argument("--bloque", type=int, default=10, help="Páginas por bloque de escritura")
+    args = ap.parse_args()
+
+    sitio = SITIOS[args.sitio]
+    if args.seccion:
+        sitio.seccion = args.seccion
+    desde = pd.Timestamp(args.desde).tz_localize(TZ)
+    hasta = pd.Timestamp(args.hasta).tz_localize(TZ)
+
+    t0 = time.perf_counter()
+    with Fetcher(concurrency=args.concurrency, rps=args.rps) as fetcher:
+        crawler = PaginadoCrawler(sitio, fetcher)
+        migrar_csv(sitio, crawler.store)
+        conocidas = set(crawler.store.read(columns=["url"])["url"]) if crawler.store.exists() else set()
+
+        if args.paginas:
+            primera, ultima = sorted(args.paginas)
+        else:
+            primera, ultima = crawler.buscar_paginas(desde, hasta)
+            print(f"[INFO] Páginas {primera}..{ultima} ({crawler.requests} requests de búsqueda)")
+
+        n = crawler.crawl(range(primera, ultima + 1), desde, hasta, conocidas, bloque=args.bloque)
+    crawler.store.compact()
+    print(f"[INFO] {n} notas nuevas en {sitio.dataset_dir} | {crawler.requests} requests | "
+          f"{time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Escritura incremental a Parquet con checkpoints, para scrapers de larga duración.
+
+- `RowGroupWriter`: acumula filas y las baja a disco en row groups de tamaño fijo.
+  Cada row group es un archivo `part-NNNNN.parquet` completo (con footer), así un
+  crash / ban / Ctrl-C no pierde lo ya escrito. Al final, `merge()` los une en un
+  único Parquet en streaming (row group a row group, memoria acotada).
+- `ProgressJournal`: bitácora JSONL (append + fsync) de lo ya procesado
+  (parts escritos, URLs, sitemaps), para poder reanudar con `--resume`.
+"""
+
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+class RowGroupWriter:
+    """Buffer de filas que se escribe en `parts_dir` como un archivo por row group."""
+
+    def __init__(self, parts_dir: Path, schema: pa.Schema, row_group_size: int = 500,
+                 start_index: int = 0, compression: str = "zstd"):
+        self.parts_dir = Path(parts_dir)
+        self.parts_dir.mkdir(parents=True, exist_ok=True)
+        self.schema = schema
+        self.row_group_size = max(1, int(row_group_size))
+        self.compression = compression
+        self.index = start_index
+        self.rows: List[dict] = []
+        self.written = 0
+
+    def add(self, row: dict) -> None:
+        self.rows.append(row)
+
+    @property
+    def full(self) -> bool:
+        return len(self.rows) >= self.row_group_size
+
+    def flush(self) -> Optional[str]:
+        """Escribe el buffer como un nuevo part. Devuelve el nombre del archivo (o None si estaba vacío)."""
+        if not self.rows:
+            return None
+        table = pa.Table.from_pylist(self.rows, schema=self.schema)
+        name = f"part-{self.index:05d}.parquet"
+        tmp = self.parts_dir / (name + ".tmp")
+        pq.write_table(table, tmp, compression=self.compression)
+        os.replace(tmp, self.parts_dir / name)  # atómico: nunca queda un part a medio escribir
+        self.index += 1
+        self.written += len(self.rows)
+        self.rows = []
+        return name
+
+    def merge(self, out: str, parts: Iterable[str]) -> int:
+        """Une los parts (en orden) en `out` sin cargarlos completos en memoria. Devuelve filas escritas."""
+        n = 0
+        tmp = str(out) + ".tmp"
+        with pq.ParquetWriter(tmp, self.schema, compression=self.compression) as w:
+            for name in parts:
+                pf = pq.ParquetFile(self.parts_dir / name)
+                for i in range(pf.num_row_groups):
+                    rg = pf.read_row_group(i).cast(self.schema)
+                    w.write_table(rg)
+                    n += rg.num_rows
+        os.replace(tmp, out)
+        return n
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self.parts_dir, ignore_errors=True)
+
+
+class ProgressJournal:
+    """Bitácora JSONL de progreso. Cada línea es un evento; se escribe con fsync."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._fh = None
+
+    def exists(self) -> bool:
+        return self.path.exists() and self.path.stat().st_size > 0
+
+    def load(self) -> Dict[str, object]:
+        """Lee la bitácora: header, parts escritos, URLs y sitemaps ya procesados.
+
+        Tolera una última línea truncada (crash en medio de una escritura).
+        """
+        state = {"header": None, "parts": [], "urls": set(), "sitemaps": set()}
+        if not self.exists():
+            return state
+        urls: Set[str] = state["urls"]
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    ev = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                if "header" in ev:
+                    state["header"] = ev["header"]
+                if ev.get("part"):
+                    state["parts"].append(ev["part"])
+                urls.update(ev.get("urls", ()))
+                if ev.get("sitemap"):
+                    state["sitemaps"].add(ev["sitemap"])
+        return state
+
+    def append(self, event: dict) -> None:
+        if self._fh is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fh = open(self.path, "a", encoding="utf-8")
+        self._fh.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+
+    def reset(self) -> None:
+        self.close()
+        if self.path.exists():
+            self.path.unlink()
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
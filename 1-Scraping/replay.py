@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Grabación y reproducción offline de las respuestas HTTP de los scrapers.
+
+- `Archivo`: fixture comprimido (zip) con las respuestas grabadas (`index.jsonl` + un cuerpo
+  por contenido distinto), la configuración con la que se grabó y las salidas esperadas de
+  cada fuente (`esperado/<fuente>.jsonl`).
+- `grabando(archivo)`: mientras está activo, toda request de `requests` (`Session.request`:
+  cubre `requests.get`, `http_fetch.Fetcher` y por lo tanto `lanacion_scraper.http_get`,
+  Clarín/Página/12 y los feeds que después parsea `feedparser`) y de `aiohttp`
+  (`ClientSession._request`, la sesión de Ámbito) sale a la red y su respuesta queda en el
+  archivo, con su latencia.
+- `ServidorReplay(archivo)`: servidor local (aiohttp, en un thread propio) que responde
+  `/replay?u=<url original>` con lo grabado (404 si falta). Latencia opcional: fija o la
+  grabada de cada respuesta, para comparar cambios de concurrencia con red "realista".
+- `redirigiendo(base_url)`: reescribe las URLs de `requests` y `aiohttp` hacia el servidor.
+  El rate limit por host de `Fetcher` se sigue calculando sobre la URL original.
+
+Uso (ver `bench_scrapers.py`):
+  with grabando(archivo):
+      ...  # corre el scraper contra los sitios reales
+  archivo.guardar()
+
+  with ServidorReplay(archivo) as srv, redirigiendo(srv.base_url):
+      ...  # mismo código, sin red
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import quote
+
+import aiohttp
+import requests
+from aiohttp import web
+
+# headers que tiene sentido reproducir (el cuerpo se guarda ya decodificado: sin gzip ni chunked)
+HEADERS = ("content-type", "etag", "last-modified", "location", "retry-after")
+
+_red = threading.local()
+
+
+def tiempo_red() -> float:
+    """Segundos acumulados dentro de requests de `requests` en este thread (grabando o redirigiendo)."""
+    return getattr(_red, "segundos", 0.0)
+
+
+def _sumar_red(segundos: float) -> None:
+    _red.segundos = tiempo_red() + segundos
+
+
+def _url_completa(method: str, url: str, params=None) -> str:
+    """URL tal como la manda `requests` (normalizada y con `params`): es la clave del archivo."""
+    return requests.Request(method.upper(), url, params=params).prepare().url
+
+
+class Archivo:
+    """Respuestas HTTP grabadas + salidas esperadas, en un zip (se carga entero en memoria)."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entradas: Dict[str, dict] = {}
+        self.cuerpos: Dict[str, bytes] = {}
+        self.esperado: Dict[str, List[dict]] = {}
+        self.config: Dict[str, dict] = {}
+        self.lock = threading.Lock()
+        if self.path.exists():
+            self._cargar()
+
+    @staticmethod
+    def clave(method: str, url: str) -> str:
+        return f"{method.upper()} {url}"
+
+    def _cargar(self) -> None:
+        with zipfile.ZipFile(self.path) as z:
+            for line in z.read("index.jsonl").decode("utf-8").splitlines():
+                e = json.loads(line)
+                self.entradas[self.clave(e["method"], e["url"])] = e
+            for name in z.namelist():
+                if name.startswith("cuerpos/"):
+                    self.cuerpos[name.split("/", 1)[1]] = z.read(name)
+                elif name.startswith("esperado/"):
+                    fuente = Path(name).stem
+                    self.esperado[fuente] = [json.loads(l) for l in z.read(name).decode("utf-8").splitlines() if l]
+            if "config.json" in z.namelist():
+                self.config = json.loads(z.read("config.json"))
+
+    def agregar(self, method: str, url: str, status: int, headers, cuerpo: bytes, segundos: float) -> None:
+        h = hashlib.blake2b(cuerpo, digest_size=16).hexdigest()
+        headers = {k.lower(): v for k, v in headers.items() if k.lower() in HEADERS}
+        with self.lock:
+            self.cuerpos[h] = cuerpo
+            self.entradas[self.clave(method, url)] = {
+                "method": method.upper(), "url": url, "status": status, "headers": headers,
+                "cuerpo": h, "segundos": round(segundos, 4)}
+
+    def buscar(self, method: str, url: str) -> Optional[Tuple[dict, bytes]]:
+        e = self.entradas.get(self.clave(method, url))
+        return (e, self.cuerpos[e["cuerpo"]]) if e is not None else None
+
+    def guardar(self) -> None:
+        """Reescribe el zip completo (deflate)."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        usados = {e["cuerpo"] for e in self.entradas.values()}
+        with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=9) as z:
+            z.writestr("index.jsonl", "".join(json.dumps(e, ensure_ascii=False) + "\n"
+                                              for e in self.entradas.values()))
+            for h in sorted(usados):
+                z.writestr(f"cuerpos/{h}", self.cuerpos[h])
+            for fuente, filas in self.esperado.items():
+                z.writestr(f"esperado/{fuente}.jsonl", "".join(
+                    json.dumps(f, ensure_ascii=False, default=str) + "\n" for f in filas))
+            z.writestr("config.json", json.dumps(self.config, ensure_ascii=False, indent=2))
+        tmp.replace(self.path)
+
+    def resumen(self) -> str:
+        crudo = sum(len(c) for c in self.cuerpos.values())
+        comprimido = self.path.stat().st_size if self.path.exists() else 0
+        return (f"{len(self.entradas)} respuestas, {len(self.cuerpos)} cuerpos distintos, "
+                f"{crudo / 1e6:.1f} MB -> {comprimido / 1e6:.1f} MB comprimido")
+
+
+@contextmanager
+def grabando(archivo: Archivo):
+    """Graba en `archivo` las respuestas de `requests` y `aiohttp` (sin cambiar su comportamiento)."""
+    orig_request = requests.Session.request
+    orig_aiohttp = aiohttp.ClientSession._request
+
+    def request(self, method, url, *args, **kwargs):
+        t0 = time.perf_counter()
+        r = orig_request(self, method, url, *args, **kwargs)
+        # r.content consume un stream=True, pero iter_content después reusa el cuerpo ya leído
+        cuerpo = r.content
+        segundos = time.perf_counter() - t0
+        _sumar_red(segundos)
+        archivo.agregar(method, _url_completa(method, url, kwargs.get("params")), r.status_code, r.headers,
+                        cuerpo, segundos)
+        return r
+
+    async def _request(self, method, str_or_url, **kwargs):
+        t0 = time.perf_counter()
+        resp = await orig_aiohttp(self, method, str_or_url, **kwargs)
+        cuerpo = await resp.read()  # queda cacheado en la respuesta: resp.text() sigue funcionando
+        archivo.agregar(method, str(str_or_url), resp.status, resp.headers, cuerpo, time.perf_counter() - t0)
+        return resp
+
+    requests.Session.request = request
+    aiohttp.ClientSession._request = _request
+    try:
+        yield archivo
+    finally:
+        requests.Session.request = orig_request
+        aiohttp.ClientSession._request = orig_aiohttp
+
+
+def _local(base_url: str, url: str) -> str:
+    return f"{base_url}/replay?u={quote(url, safe='')}"
+
+
+@contextmanager
+def redirigiendo(base_url: str):
+    """Manda las requests de `requests` y `aiohttp` al servidor de replay en `base_url`."""
+    orig_request = requests.Session.request
+    orig_aiohttp = aiohttp.ClientSession._request
+
+    def request(self, method, url, *args, **kwargs):
+        destino = _local(base_url, _url_completa(method, url, kwargs.pop("params", None)))
+        t0 = time.perf_counter()
+        try:
+            return orig_request(self, method, destino, *args, **kwargs)
+        finally:
+            _sumar_red(time.perf_counter() - t0)
+
+    async def _request(self, method, str_or_url, **kwargs):
+        return await orig_aiohttp(self, method, _local(base_url, str(str_or_url)), **kwargs)
+
+    requests.Session.request = request
+    aiohttp.ClientSession._request = _request
+    try:
+        yield base_url
+    finally:
+        requests.Session.request = orig_request
+        aiohttp.ClientSession._request = orig_aiohttp
+
+
+class ServidorReplay:
+    """Sirve un `Archivo` en 127.0.0.1 desde un thread con su propio event loop.
+
+    `latencia`: 0 (sin espera), segundos fijos por respuesta o "grabada" (la de cada respuesta).
+    """
+
+    def __init__(self, archivo: Archivo, latencia: Union[float, str] = 0.0, port: int = 0):
+        self.archivo = archivo
+        self.latencia = latencia
+        self.port = port
+        self.base_url: Optional[str] = None
+        self.stats = {"hits": 0, "misses": 0, "bytes": 0}
+        self.faltantes: List[str] = []
+        self._listo = threading.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    async def _handler(self, request: web.Request) -> web.Response:
+        url = request.query.get("u", "")
+        encontrado = self.archivo.buscar(request.method, url)
+        if encontrado is None:
+            self.stats["misses"] += 1
+            self.faltantes.append(url)
+            return web.Response(status=404, text=f"Sin grabar: {request.method} {url}")
+        entrada, cuerpo = encontrado
+        espera = entrada["segundos"] if self.latencia == "grabada" else float(self.latencia)
+        if espera > 0:
+            await asyncio.sleep(espera)
+        self.stats["hits"] += 1
+        self.stats["bytes"] += len(cuerpo)
+        return web.Response(status=entrada["status"], body=cuerpo, headers=entrada["headers"])
+
+    def _correr(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        app = web.Application()
+        app.router.add_route("*", "/replay", self._handler)
+        runner = web.AppRunner(app, access_log=None)
+        self._loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, "127.0.0.1", self.port)
+        self._loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self._listo.set()
+        self._loop.run_forever()
+        self._loop.run_until_complete(runner.cleanup())
+        self._loop.close()
+
+    def __enter__(self) -> "ServidorReplay":
+        self._thread = threading.Thread(target=self._correr, name="replay", daemon=True)
+        self._thread.start()
+        self._listo.wait()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
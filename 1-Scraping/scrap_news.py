@@ -1,17 +1,38 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+"""
+Top N de noticias por diario vía RSS.
+
+Uso:
+  python scrap_news.py --out noticias_top10.csv
+  # modo continuo: cada 5 minutos, solo agrega al log (rss_log/mes=YYYY-MM) las noticias nuevas
+  python scrap_news.py --watch 5m --out top10_actual.parquet --log-dir rss_log
+  # métricas (textfile de Prometheus, acumuladas entre ciclos) y traza JSONL (ver telemetria.py)
+  python scrap_news.py --watch 5m --metrics-file rss.prom --trace rss.trace.jsonl
+"""
 
 import argparse
-from datetime import datetime
-from dateutil import parser as dateparser
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import unicodedata
 from collections import OrderedDict
-import pytz
+from urllib.parse import urlsplit
 import feedparser
 import pandas as pd
+import pyarrow as pa
 import sys
-import time
 
-LOCAL_TZ = pytz.timezone("America/Argentina/Buenos_Aires")
+from dataset_store import PartitionedStore
+from fechas import TZ, parse_rfc822
+from http_fetch import Fetcher
+from telemetria import TELEMETRIA, configurar
+
+UA = "Mozilla/5.0 (compatible; TopNewsRSS/1.0)"
+CACHE_PATH = ".rss_cache.json"
+SEEN_DB = ".rss_seen.sqlite"
 
 # --- Configura aquí tus diarios y sus RSS principales ---
 # Puedes agregar o quitar feeds. Se toman hasta 10 por diario (combinando sus feeds).
@@ -41,58 +62,89 @@ DIARIOS_RSS = OrderedDict({
     ],
 })
 
-def normalize_dt(dt_str):
-    """Parsea fechas RSS a timezone local (Buenos Aires) y devuelve naive ISO date (YYYY-MM-DD) + datetime completo."""
-    if not dt_str:
-        # si no hay fecha, usamos ahora
-        dt = datetime.now(tz=LOCAL_TZ)
-    else:
-        try:
-            dt = dateparser.parse(dt_str)
-            # si no tiene tz, asumimos UTC (muchos RSS publican en GMT)
-            if dt.tzinfo is None:
-                dt = pytz.utc.localize(dt)
-            dt = dt.astimezone(LOCAL_TZ)
-        except Exception:
-            dt = datetime.now(tz=LOCAL_TZ)
-    day_str = dt.strftime("%Y-%m-%d")
-    return day_str, dt
-
-def get_top10_for_source(source_name, rss_list, per_source_limit=10, request_pause=0.6):
-    """Lee múltiples feeds de un diario, mezcla y ordena por fecha desc, de-duplica títulos y retorna top N."""
+def normalize_dts(values):
+    """Fechas RSS -> (YYYY-MM-DD, ISO con offset) en Buenos Aires, vectorizado (fechas.parse_rfc822).
+
+    Si no hay fecha (o no se puede parsear), se usa ahora.
+    """
+    dts = parse_rfc822(values).fillna(pd.Timestamp.now(tz=TZ))
+    days = dts.dt.strftime("%Y-%m-%d")
+    isos = dts.dt.strftime("%Y-%m-%dT%H:%M:%S%z").str.replace(r"(\d{2})(\d{2})$", r"\1:\2", regex=True)
+    return days.tolist(), isos.tolist()
+
+
+def parse_feed_entries(content, rss_url):
+    """Parsea el XML de un feed y devuelve filas {date, published_at_local, title, link}."""
+    d = feedparser.parse(content, response_headers={"content-location": rss_url})
+    # published/parsing robusto (todas las fechas del feed de una vez)
+    days, isos = normalize_dts([e.get("published") or e.get("updated") for e in d.entries])
     rows = []
-    seen_titles = set()
+    for entry, day_str, iso_local in zip(d.entries, days, isos):
+        rows.append({
+            "date": day_str,                           # YYYY-MM-DD en Buenos Aires
+            "published_at_local": iso_local,           # Fecha-hora local
+            "title": (entry.get("title") or "").strip(),
+            "link": (entry.get("link") or "").strip(),
+        })
+    return rows
+
+
+def fetch_feed(fetcher, rss_url, cache):
+    """GET condicional (ETag / Last-Modified) de un feed.
+
+    Si el servidor responde 304 no se parsea nada: se reutilizan las filas guardadas en `cache`.
+    """
+    prev = cache.get(rss_url, {})
+    headers = {}
+    if prev.get("etag"):
+        headers["If-None-Match"] = prev["etag"]
+    if prev.get("modified"):
+        headers["If-Modified-Since"] = prev["modified"]
+
+    r = fetcher.get(rss_url, headers=headers)
+    if r.status_code == 304 and "rows" in prev:
+        return prev["rows"], True
+    r.raise_for_status()
+
+    with TELEMETRIA.span("parse_feed", url=rss_url):
+        rows = parse_feed_entries(r.content, rss_url)
+    cache[rss_url] = {
+        "etag": r.headers.get("ETag"),
+        "modified": r.headers.get("Last-Modified"),
+        "rows": rows,
+    }
+    return rows, False
 
-    for rss_url in rss_list:
-        try:
-            d = feedparser.parse(rss_url)
-        except Exception as e:
-            print(f"[WARN] No se pudo leer {rss_url}: {e}", file=sys.stderr)
-            continue
-
-        for entry in d.entries:
-            title = (entry.title or "").strip()
-            link = getattr(entry, "link", "").strip()
-            # published/parsing robusto
-            published = getattr(entry, "published", None) or getattr(entry, "updated", None)
-            day_str, dt_local = normalize_dt(published)
 
+def load_cache(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_cache(path, cache):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def get_top10_for_source(source_name, feed_rows, per_source_limit=10):
+    """Mezcla las filas de los feeds de un diario, ordena por fecha desc, de-duplica títulos y retorna top N."""
+    rows = []
+    seen_titles = set()
+
+    for entries in feed_rows:
+        for entry in entries:
+            title = entry["title"]
             # De-duplicación simple por título (puedes cambiar a hash(title+domain) si hiciera falta)
             key = title.lower()
             if not title or key in seen_titles:
                 continue
             seen_titles.add(key)
-
-            rows.append({
-                "date": day_str,                           # YYYY-MM-DD en Buenos Aires
-                "published_at_local": dt_local.isoformat(),# Fecha-hora local
-                "source": source_name,
-                "title": title,
-                "link": link
-            })
-
-        # evitar ser agresivos con los servidores (aunque RSS es liviano)
-        time.sleep(request_pause)
+            rows.append({**entry, "source": source_name})
 
     # Ordena por fecha-hora local (desc) y corta top N
     rows.sort(key=lambda r: r["published_at_local"], reverse=True)
@@ -104,13 +156,182 @@ def get_top10_for_source(source_name, rss_list, per_source_limit=10, request_pau
 
     return rows
 
+
+def fetch_all_feeds(selected, pause=0.6, cache=None):
+    """Descarga en paralelo todos los feeds de `selected`.
+
+    Devuelve ({diario: [filas por feed]}, [(diario, filas) de los feeds que cambiaron]).
+    La pausa se aplica por host (token bucket), no global: feeds de distintos diarios no se esperan.
+    """
+    cache = {} if cache is None else cache
+    jobs = [(source, url) for source, feeds in selected.items() for url in feeds]
+    by_feed = {}
+    fresh = []
+    unchanged = 0
+    TELEMETRIA.fase(len(jobs), "feeds")
+    with Fetcher(concurrency=len(jobs) or 1, rps=1.0 / pause if pause > 0 else 0,
+                 timeout=15, retries=2, headers={"User-Agent": UA}) as fetcher:
+        for (source, url), res in fetcher.map(lambda job: fetch_feed(fetcher, job[1], cache), jobs):
+            TELEMETRIA.avance()
+            if isinstance(res, Exception):
+                print(f"[WARN] No se pudo leer {url}: {res}", file=sys.stderr)
+                TELEMETRIA.error("feed", url=url, error=str(res))
+                continue
+            rows, not_modified = res
+            unchanged += not_modified
+            by_feed[url] = rows
+            if not not_modified:
+                fresh.append((source, rows))
+
+    print(f"[INFO] {len(by_feed)}/{len(jobs)} feeds leídos ({unchanged} sin cambios, 304)")
+
+    # respeta el orden de la configuración (define qué duplicado se conserva)
+    feeds_by_source = OrderedDict(
+        (source, [by_feed[u] for u in feeds if u in by_feed]) for source, feeds in selected.items()
+    )
+    return feeds_by_source, fresh
+
+
+# --- Modo continuo: de-duplicación persistente + log particionado ---
+def item_key(title, link):
+    """Hash estable de título + link normalizados (minúsculas, espacios, sin query/fragment)."""
+    t = " ".join(unicodedata.normalize("NFKC", title or "").lower().split())
+    u = urlsplit((link or "").strip())
+    link_norm = f"{u.netloc.lower()}{u.path.rstrip('/')}"
+    return hashlib.sha1(f"{t}\n{link_norm}".encode("utf-8")).hexdigest()
+
+
+class SeenStore:
+    """Set persistente (SQLite) de noticias ya emitidas, por hash de título+link."""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY, first_seen TEXT)")
+        self.conn.commit()
+
+    def filter_new(self, items, chunk=500):
+        """Los items que no se habían visto (sin registrarlos: ver `mark`). O(#items), no O(historia)."""
+        keys = list(dict.fromkeys(it["key"] for it in items))
+        seen = set()
+        for i in range(0, len(keys), chunk):
+            part = keys[i:i + chunk]
+            q = f"SELECT key FROM seen WHERE key IN ({','.join('?' * len(part))})"
+            seen.update(k for (k,) in self.conn.execute(q, part))
+        new = []
+        for it in items:
+            if it["key"] not in seen:
+                seen.add(it["key"])  # duplicados dentro del mismo lote
+                new.append(it)
+        return new
+
+    def mark(self, items):
+        """Registra los items como emitidos (una transacción)."""
+        now = pd.Timestamp.now(tz=TZ).isoformat()
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO seen VALUES (?, ?)", [(it["key"], now) for it in items])
+
+    def close(self):
+        self.conn.close()
+
+
+LOG_SCHEMA = pa.schema([
+    ("published_at_local", pa.timestamp("us", tz=TZ)),
+    ("date", pa.string()),
+    ("source", pa.string()),
+    ("title", pa.string()),
+    ("link", pa.string()),
+    ("key", pa.string()),
+    ("seen_at", pa.string()),
+])
+
+
+def log_new_items(fresh, seen, log_store):
+    """Agrega al log solo las noticias nuevas de los feeds que cambiaron.
+
+    Primero el log y después las claves: si el append falla (o el proceso muere en el medio) las
+    noticias siguen sin marcar y se emiten en el próximo ciclo. Lo peor es un duplicado en el log
+    (misma `key`), nunca una noticia perdida.
+    """
+    items = [
+        {**r, "source": source, "key": item_key(r["title"], r["link"])}
+        for source, rows in fresh for r in rows if r["title"]
+    ]
+    new = seen.filter_new(items)
+    if new and log_store is not None:
+        now = pd.Timestamp.now(tz=TZ).isoformat()
+        log_store.append([{**it, "seen_at": now} for it in new])
+    seen.mark(new)
+    return new
+
+
+def parse_interval(s):
+    """'300', '45s', '5m', '1h' -> segundos."""
+    s = str(s).strip().lower()
+    mult = {"s": 1, "m": 60, "h": 3600}.get(s[-1:], None)
+    return float(s[:-1]) * mult if mult else float(s)
+
+
+def write_snapshot(all_rows, out_path, verbose=True):
+    df = pd.DataFrame(all_rows, columns=[
+        "date", "published_at_local", "source", "rank_in_source", "title", "link"
+    ])
+
+    # Guardado
+    if out_path.lower().endswith(".parquet"):
+        df.to_parquet(out_path, index=False)
+    else:
+        df.to_csv(out_path, index=False, encoding="utf-8")
+
+    print(f"[OK] Guardado: {out_path}")
+    if verbose:
+        # Muestra una vista rápida
+        with pd.option_context("display.max_colwidth", 100):
+            print(df.head(20).to_string(index=False))
+
+
+def run_cycle(selected, args, cache, seen, log_store, verbose=True):
+    feeds_by_source, fresh = fetch_all_feeds(selected, pause=args.pause, cache=cache)
+    if args.cache:
+        save_cache(args.cache, cache)
+
+    if seen is not None:
+        new = log_new_items(fresh, seen, log_store)
+        print(f"[INFO] {len(new)} noticias nuevas")
+
+    all_rows = []
+    for source, feed_rows in feeds_by_source.items():
+        if verbose:
+            print(f"[INFO] Procesando {source}...")
+        all_rows.extend(get_top10_for_source(source, feed_rows, per_source_limit=args.limit))
+
+    if not all_rows:
+        print("[WARN] No se obtuvieron noticias. ¿Feeds caídos o filtros muy restrictivos?", file=sys.stderr)
+
+    write_snapshot(all_rows, args.out, verbose=verbose)
+    TELEMETRIA.exportar()
+
+
 def main():
     parser = argparse.ArgumentParser(description="Scraping (vía RSS) del top 10 de noticias por diario.")
     parser.add_argument("--out", default="noticias_top10.csv", help="Ruta de salida (CSV o .parquet)")
     parser.add_argument("--sources", nargs="*", default=[],
                         help="Filtrar por nombre de diario (tal cual figura en la config). Ej: --sources 'La Nación' Clarín")
     parser.add_argument("--limit", type=int, default=10, help="Top N por diario (default 10)")
-    parser.add_argument("--pause", type=float, default=0.6, help="Pausa (seg) entre requests a feeds")
+    parser.add_argument("--pause", type=float, default=0.6, help="Pausa (seg) entre requests al mismo host")
+    parser.add_argument("--cache", default=CACHE_PATH,
+                        help="JSON con ETag/Last-Modified y últimas entradas por feed ('' para desactivar)")
+    parser.add_argument("--watch", default=None, metavar="INTERVAL",
+                        help="Modo continuo: repetir cada INTERVAL (ej. 300, 5m, 1h)")
+    parser.add_argument("--seen-db", default=SEEN_DB, help="SQLite con las noticias ya vistas (modo --watch)")
+    parser.add_argument("--log-dir", default=None,
+                        help="Dataset Parquet (particionado por mes) donde se agregan las noticias nuevas "
+                             "(default en --watch: rss_log)")
+    parser.add_argument("--compact-every", type=int, default=24, help="Compactar el log cada N ciclos")
+    parser.add_argument("--metrics-file", default=None,
+                        help="Textfile de Prometheus con las métricas (se reescribe en cada ciclo)")
+    parser.add_argument("--trace", default=None, help="Traza JSONL con cada request, reintento, parseo y error")
+    parser.add_argument("--progress-every", type=float, default=10.0,
+                        help="Segundos entre líneas de progreso (0 = solo al final)")
     args = parser.parse_args()
 
     selected = DIARIOS_RSS
@@ -120,30 +341,43 @@ def main():
             print("[ERROR] No se encontraron diarios con esos nombres. Revisa --sources.", file=sys.stderr)
             sys.exit(1)
 
-    all_rows = []
-    for source, feeds in selected.items():
-        print(f"[INFO] Procesando {source}...")
-        rows = get_top10_for_source(source, feeds, per_source_limit=args.limit, request_pause=args.pause)
-        all_rows.extend(rows)
+    cache = load_cache(args.cache) if args.cache else {}
+    log_dir = args.log_dir or ("rss_log" if args.watch else None)
+    seen = SeenStore(args.seen_db) if (args.watch or log_dir) else None
+    log_store = PartitionedStore(log_dir, LOG_SCHEMA, date_col="published_at_local") if log_dir else None
+    tel = configurar("rss", metricas=args.metrics_file, traza=args.trace, cada=args.progress_every,
+                     unidad="feeds")
 
-    if not all_rows:
-        print("[WARN] No se obtuvieron noticias. ¿Feeds caídos o filtros muy restrictivos?", file=sys.stderr)
-
-    df = pd.DataFrame(all_rows, columns=[
-        "date", "published_at_local", "source", "rank_in_source", "title", "link"
-    ])
-
-    # Guardado
-    out_path = args.out
-    if out_path.lower().endswith(".parquet"):
-        df.to_parquet(out_path, index=False)
-    else:
-        df.to_csv(out_path, index=False, encoding="utf-8")
+    if not args.watch:
+        try:
+            run_cycle(selected, args, cache, seen, log_store)
+        finally:
+            tel.cerrar()
+            if seen is not None:
+                seen.close()
+        return
 
-    print(f"[OK] Guardado: {out_path}")
-    # Muestra una vista rápida
-    with pd.option_context("display.max_colwidth", 100):
-        print(df.head(20).to_string(index=False))
+    interval = parse_interval(args.watch)
+    cycle = 0
+    try:
+        while True:
+            t0 = time.monotonic()
+            cycle += 1
+            print(f"[INFO] Ciclo {cycle} ({pd.Timestamp.now(tz=TZ):%Y-%m-%d %H:%M:%S})")
+            try:
+                run_cycle(selected, args, cache, seen, log_store, verbose=False)
+            except Exception as e:
+                print(f"[WARN] Ciclo {cycle} falló: {e}", file=sys.stderr)
+            if log_store is not None and cycle % args.compact_every == 0:
+                log_store.compact()
+            time.sleep(max(0.0, interval - (time.monotonic() - t0)))
+    except KeyboardInterrupt:
+        print("\n[INFO] Fin del modo --watch.")
+    finally:
+        if log_store is not None:
+            log_store.compact()
+        seen.close()
+        tel.cerrar()
 
 if __name__ == "__main__":
     main()
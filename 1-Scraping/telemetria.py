@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Telemetría de los scrapers: métricas por request y por parseo, exportables y con progreso en vivo.
+
+Una sola instancia por proceso (`TELEMETRIA`), que usan `http_fetch.Fetcher` (y por lo tanto
+`lanacion_scraper.http_get` y `scrap_news.fetch_feed`), la descarga de Ámbito (`descargar`,
+`Parser.run`) y el parseo de La Nación y de los feeds. Registra:
+- latencia por request (histograma por host; con `stream=True` es el tiempo hasta los headers),
+- bytes recibidos, requests por código HTTP o tipo de error de red (`dns`, `timeout`, `ssl`,
+  `conexion`), reintentos por motivo y segundos de espera en rate limit / backoff,
+- spans de parseo (histograma por etapa: `extraer_noticia`, `parse_article`, `parse_feed`, ...),
+- avance (items hechos / objetivo).
+
+Salidas (todas opcionales, ver `configurar`):
+- textfile de Prometheus (formato de exposición; se reescribe atómicamente cada `cada` segundos,
+  apto para el textfile collector de node_exporter),
+- traza JSONL (un evento por request / span / reintento / error),
+- línea de progreso periódica en stderr: items, throughput, ETA, MB/s, latencia p50/p95,
+  parseo medio, reintentos y códigos no-200 (lo que permite ver si una corrida lenta es DNS,
+  403, reintentos o BeautifulSoup).
+
+Sin `configurar` solo acumula en memoria (costo: un lock y un par de dicts por request).
+
+Uso:
+  from telemetria import TELEMETRIA, configurar
+  tel = configurar("lanacion", metricas="lanacion.prom", traza="lanacion.trace.jsonl", cada=10)
+  tel.objetivo(len(urls))
+  with tel.span("parse_article"):
+      ...
+  tel.avance()
+  tel.cerrar()
+"""
+
+import json
+import os
+import re
+import socket
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+# límites superiores de los buckets (segundos)
+BUCKETS_RED = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BUCKETS_PARSEO = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# nombre -> (tipo, ayuda)
+METRICAS = {
+    "scraper_request_seconds": ("histogram", "Latencia de las requests HTTP (hasta los headers si es streaming)"),
+    "scraper_requests_total": ("counter", "Requests por host y código HTTP o tipo de error de red"),
+    "scraper_response_bytes_total": ("counter", "Bytes de cuerpo recibidos"),
+    "scraper_retries_total": ("counter", "Reintentos por host y motivo"),
+    "scraper_wait_seconds_total": ("counter", "Segundos de espera propia (rate limit, backoff)"),
+    "scraper_parse_seconds": ("histogram", "Duración de los spans de parseo"),
+    "scraper_errors_total": ("counter", "Errores registrados por tipo"),
+    "scraper_items_total": ("counter", "Items procesados"),
+    "scraper_items_target": ("gauge", "Items a procesar conocidos hasta ahora"),
+    "scraper_start_time_seconds": ("gauge", "Inicio de la corrida (epoch)"),
+}
+
+
+class Histograma:
+    """Histograma acumulativo estilo Prometheus (conteo por bucket + suma)."""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.conteos = [0] * (len(buckets) + 1)  # el último es +Inf
+        self.suma = 0.0
+        self.n = 0
+
+    def observar(self, v: float) -> None:
+        self.conteos[bisect_left(self.buckets, v)] += 1
+        self.suma += v
+        self.n += 1
+
+    def cuantil(self, q: float) -> float:
+        """Cota superior del bucket que contiene el cuantil `q` (inf si cae en +Inf)."""
+        objetivo, acum = q * self.n, 0
+        for limite, c in zip(self.buckets + (float("inf"),), self.conteos):
+            acum += c
+            if acum >= objetivo:
+                return limite
+        return float("inf")
+
+
+def host_de(url: str) -> str:
+    return urlparse(url).netloc.lower() or "?"
+
+
+def tipo_error(e: BaseException) -> str:
+    """Clasifica un error de red: dns, timeout, ssl o conexion (requests y aiohttp)."""
+    vistos = set()
+    while e is not None and id(e) not in vistos:
+        vistos.add(id(e))
+        if isinstance(e, socket.gaierror) or isinstance(getattr(e, "os_error", None), socket.gaierror):
+            return "dns"
+        if isinstance(e, TimeoutError) or "Timeout" in type(e).__name__:
+            return "timeout"
+        texto = f"{type(e).__name__} {e}"
+        if re.search(r"NameResolution|Name or service not known|getaddrinfo|nodename nor servname|DNS", texto):
+            return "dns"
+        if "SSL" in texto:
+            return "ssl"
+        e = e.__cause__ or e.__context__ or (e.args[0] if e.args and isinstance(e.args[0], BaseException) else None)
+    return "conexion"
+
+
+def _escapar(v) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquetas(fuente: str, labels: Tuple[Tuple[str, str], ...]) -> str:
+    return ",".join(f'{k}="{_escapar(v)}"' for k, v in (("fuente", fuente),) + labels)
+
+
+def _duracion(s: float) -> str:
+    s = int(s)
+    return f"{s // 3600}h{s % 3600 // 60:02d}m" if s >= 3600 else f"{s // 60}m{s % 60:02d}s"
+
+
+class Telemetria:
+    """Métricas, traza y progreso de una corrida; thread-safe (también se usa desde asyncio)."""
+
+    def __init__(self, fuente: str = "scraper"):
+        self.lock = threading.Lock()
+        self._hilo: Optional[threading.Thread] = None
+        self._parar = threading.Event()
+        self._traza = None
+        self.reset(fuente)
+
+    def reset(self, fuente: str, metricas=None, traza=None, cada: float = 10.0, unidad: str = "items") -> None:
+        with self.lock:
+            self.fuente = fuente
+            self.metricas = Path(metricas) if metricas else None
+            self.traza_path = Path(traza) if traza else None
+            self.cada = cada
+            self.unidad = unidad
+            self.inicio = time.time()
+            self.contadores: Dict[Tuple[str, tuple], float] = {}
+            self.histos: Dict[Tuple[str, tuple], Histograma] = {}
+            self.hechos = 0
+            self.total = 0
+            self._fase = (time.monotonic(), 0)  # (inicio, hechos al inicio) de la fase de progreso actual
+
+    # --- registro ---
+    def _sumar(self, nombre: str, labels: tuple, v: float = 1.0) -> None:
+        k = (nombre, labels)
+        self.contadores[k] = self.contadores.get(k, 0.0) + v
+
+    def _observar(self, nombre: str, labels: tuple, v: float, buckets: Tuple[float, ...]) -> None:
+        h = self.histos.get((nombre, labels))
+        if h is None:
+            h = self.histos[(nombre, labels)] = Histograma(buckets)
+        h.observar(v)
+
+    def _evento(self, tipo: str, **campos) -> None:
+        if self._traza is not None:
+            self._traza.write(json.dumps({"ts": round(time.time(), 4), "fuente": self.fuente, "tipo": tipo,
+                                         **campos}, ensure_ascii=False, default=str) + "\n")
+
+    def request(self, url: str, status: Optional[int], segundos: float, nbytes: Optional[int] = None,
+                intento: int = 0, error: Optional[BaseException] = None) -> None:
+        """Una request terminada: con `status` si hubo respuesta, o con el `error` de red."""
+        host = host_de(url)
+        codigo = str(status) if error is None else tipo_error(error)
+        with self.lock:
+            self._observar("scraper_request_seconds", (("host", host),), segundos, BUCKETS_RED)
+            self._sumar("scraper_requests_total", (("host", host), ("codigo", codigo)))
+            if nbytes:
+                self._sumar("scraper_response_bytes_total", (("host", host),), nbytes)
+            self._evento("request", url=url, host=host, codigo=codigo, segundos=round(segundos, 4),
+                         bytes=nbytes, intento=intento, **({"error": str(error)} if error is not None else {}))
+
+    def reintento(self, url: str, motivo: str, espera: float) -> None:
+        host = host_de(url)
+        with self.lock:
+            self._sumar("scraper_retries_total", (("host", host), ("motivo", motivo)))
+            self._sumar("scraper_wait_seconds_total", (("host", host), ("causa", "backoff")), espera)
+            self._evento("reintento", url=url, host=host, motivo=motivo, espera=round(espera, 3))
+
+    def espera(self, url: str, segundos: float, causa: str = "rate_limit") -> None:
+        """Tiempo bloqueado por decisión propia (token bucket): no es latencia del sitio."""
+        if segundos > 0:
+            with self.lock:
+                self._sumar("scraper_wait_seconds_total", (("host", host_de(url)), ("causa", causa)), segundos)
+
+    def observar_span(self, etapa: str, segundos: float, **attrs) -> None:
+        with self.lock:
+            self._observar("scraper_parse_seconds", (("etapa", etapa),), segundos, BUCKETS_PARSEO)
+            self._evento("span", etapa=etapa, segundos=round(segundos, 5), **attrs)
+
+    @contextmanager
+    def span(self, etapa: str, **attrs):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar_span(etapa, time.perf_counter() - t0, **attrs)
+
+    def error(self, tipo: str, **campos) -> None:
+        with self.lock:
+            self._sumar("scraper_errors_total", (("tipo", tipo),))
+            self._evento("error", error_tipo=tipo, **campos)
+
+    # --- progreso ---
+    def objetivo(self, n: int) -> None:
+        """Suma `n` items al objetivo (puede crecer durante la corrida, p. ej. sitemap a sitemap)."""
+        with self.lock:
+            self.total += n
+
+    def avance(self, n: int = 1) -> None:
+        with self.lock:
+            self.hechos += n
+
+    def fase(self, total: int, unidad: Optional[str] = None) -> None:
+        """Reinicia el progreso (no las métricas): p. ej. un ciclo nuevo en `scrap_news --watch`."""
+        with self.lock:
+            self.hechos, self.total = 0, total
+            self.unidad = unidad or self.unidad
+            self._fase = (time.monotonic(), 0)
+
+    def _percentiles(self) -> Tuple[float, float, float]:
+        red = Histograma(BUCKETS_RED)
+        parseo_s = parseo_n = 0.0
+        for (nombre, _), h in self.histos.items():
+            if nombre == "scraper_request_seconds":
+                red.conteos = [a + b for a, b in zip(red.conteos, h.conteos)]
+                red.n += h.n
+            elif nombre == "scraper_parse_seconds":
+                parseo_s += h.suma
+                parseo_n += h.n
+        return red.cuantil(0.5), red.cuantil(0.95), 1000 * parseo_s / parseo_n if parseo_n else 0.0
+
+    def resumen(self) -> str:
+        """Línea de progreso: avance, throughput, ETA, red, parseo, reintentos y códigos no-200."""
+        with self.lock:
+            t0, h0 = self._fase
+            dt = max(1e-9, time.monotonic() - t0)
+            ritmo = (self.hechos - h0) / dt
+            linea = f"[Progreso {self.fuente}] {self.hechos}"
+            if self.total:
+                linea += f"/{self.total} {self.unidad} ({100 * self.hechos / self.total:.0f}%)"
+                faltan = max(0, self.total - self.hechos)
+                linea += f" | {ritmo:.1f} {self.unidad}/s | ETA {_duracion(faltan / ritmo) if ritmo else '?'}"
+            else:
+                linea += f" {self.unidad} | {ritmo:.1f} {self.unidad}/s"
+            mb = sum(v for (n, _), v in self.contadores.items() if n == "scraper_response_bytes_total") / 1e6
+            p50, p95, parseo = self._percentiles()
+            reintentos = sum(v for (n, _), v in self.contadores.items() if n == "scraper_retries_total")
+            codigos: Dict[str, float] = {}
+            for (n, labels), v in self.contadores.items():
+                if n == "scraper_requests_total" and dict(labels)["codigo"] not in ("200", "304"):
+                    codigos[dict(labels)["codigo"]] = codigos.get(dict(labels)["codigo"], 0) + v
+        linea += (f" | {mb / (time.time() - self.inicio):.2f} MB/s | red p50 {p50:g}s p95 {p95:g}s"
+                  f" | parseo {parseo:.0f} ms | {reintentos:.0f} reintentos")
+        if codigos:
+            linea += " | " + ", ".join(f"{c}×{v:.0f}" for c, v in sorted(codigos.items()))
+        return linea
+
+    # --- exportación ---
+    def prometheus(self) -> str:
+        """Estado actual en el formato de texto de Prometheus."""
+        with self.lock:
+            series = {nombre: [] for nombre in METRICAS}
+            for (nombre, labels), v in sorted(self.contadores.items()):
+                series[nombre].append(f"{nombre}{{{_etiquetas(self.fuente, labels)}}} {v:g}")
+            for (nombre, labels), h in sorted(self.histos.items(), key=lambda kv: kv[0]):
+                acum = 0
+                for limite, c in zip(h.buckets + (float("inf"),), h.conteos):
+                    acum += c
+                    le = "+Inf" if limite == float("inf") else f"{limite:g}"
+                    series[nombre].append(
+                        f"{nombre}_bucket{{{_etiquetas(self.fuente, labels + (('le', le),))}}} {acum}")
+                series[nombre].append(f"{nombre}_sum{{{_etiquetas(self.fuente, labels)}}} {h.suma:g}")
+                series[nombre].append(f"{nombre}_count{{{_etiquetas(self.fuente, labels)}}} {h.n}")
+            base = _etiquetas(self.fuente, ())
+            series["scraper_items_total"].append(f"scraper_items_total{{{base}}} {self.hechos}")
+            series["scraper_items_target"].append(f"scraper_items_target{{{base}}} {self.total}")
+            series["scraper_start_time_seconds"].append(f"scraper_start_time_seconds{{{base}}} {self.inicio:.0f}")
+        lineas = []
+        for nombre, filas in series.items():
+            if filas:
+                tipo, ayuda = METRICAS[nombre]
+                lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} {tipo}", *filas]
+        return "\n".join(lineas) + "\n"
+
+    def exportar(self) -> None:
+        """Reescribe el textfile (tmp + rename: el collector nunca lee un archivo a medias) y vacía la traza."""
+        if self.metricas is not None:
+            tmp = self.metricas.with_name(self.metricas.name + ".tmp")
+            tmp.write_text(self.prometheus(), encoding="utf-8")
+            os.replace(tmp, self.metricas)
+        with self.lock:
+            if self._traza is not None:
+                self._traza.flush()
+
+    # --- ciclo de vida ---
+    def _loop(self) -> None:
+        anterior = None
+        while not self._parar.wait(self.cada):
+            with self.lock:
+                estado = (self.hechos, self.total, sum(h.n for h in self.histos.values()))
+                pendiente = self.hechos < self.total
+            # sin trabajo pendiente ni novedades (p. ej. entre ciclos de --watch) no se repite la línea
+            if pendiente or estado != anterior:
+                print(self.resumen(), file=sys.stderr, flush=True)
+            anterior = estado
+            self.exportar()
+
+    def iniciar(self) -> "Telemetria":
+        if self.traza_path is not None:
+            self.traza_path.parent.mkdir(parents=True, exist_ok=True)
+            self._traza = open(self.traza_path, "a", encoding="utf-8")
+        if self.metricas is not None:
+            self.metricas.parent.mkdir(parents=True, exist_ok=True)
+        if self.cada > 0:
+            self._parar.clear()
+            self._hilo = threading.Thread(target=self._loop, name="telemetria", daemon=True)
+            self._hilo.start()
+        return self
+
+    def cerrar(self) -> None:
+        """Detiene el hilo de progreso, imprime el resumen final y exporta."""
+        if self._hilo is not None:
+            self._parar.set()
+            self._hilo.join()
+            self._hilo = None
+        if self.cada > 0:
+            print(self.resumen(), file=sys.stderr, flush=True)
+        self.exportar()
+        with self.lock:
+            if self._traza is not None:
+                self._traza.close()
+                self._traza = None
+
+
+TELEMETRIA = Telemetria()
+
+
+def configurar(fuente: str, metricas=None, traza=None, cada: float = 10.0, unidad: str = "items") -> Telemetria:
+    """Reinicia la instancia compartida para una corrida y arranca el progreso/exportación periódicos.
+
+    `cada=0` desactiva la línea de progreso y la exportación periódica (solo se exporta en `cerrar`).
+    """
+    if TELEMETRIA._hilo is not None or TELEMETRIA._traza is not None:
+        TELEMETRIA.cerrar()
+    TELEMETRIA.reset(fuente, metricas=metricas, traza=traza, cada=cada, unidad=unidad)
+    return TELEMETRIA.iniciar()
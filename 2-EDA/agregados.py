@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Agregación vectorizada e incremental de embeddings por día / sección / diario.
+
+- `group_sums()` / `group_means()`: promedios por cualquier clave en una sola pasada, con una
+  matriz indicadora dispersa (grupos x filas) multiplicada por la matriz de embeddings.
+  Reemplaza los loops sobre `df.groupby(...).indices` del notebook.
+- `AgregadosEmbeddings` mantiene sumas y conteos por hoja (`fecha_dia`, `diario`, `seccion`)
+  en `<root>/hojas.parquet`. `update()` suma solo las notas no vistas (sus ids van en la
+  metadata del mismo Parquet: sumas e ids se reemplazan juntos), así los días nuevos se agregan
+  sin recalcular el corpus. Cualquier agregación más gruesa
+  (día, día+sección, diario, ...) sale de las hojas con la misma multiplicación dispersa.
+- `rolling()`: promedios en ventanas móviles de días calendario (sumas acumuladas: O(días)).
+- `similitud_consecutiva()`: coseno entre días consecutivos sin la matriz densa días x días.
+
+Uso:
+  python agregados.py --emb news_embeddings --root agregados_emb
+  python agregados.py --emb news_embeddings --root agregados_emb --por fecha_dia seccion --ventana 7
+"""
+
+import argparse
+import hashlib
+import os
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from scipy import sparse
+
+from embedding_store import from_fixed_size_list, to_fixed_size_list
+
+HOJA = ["fecha_dia", "diario", "seccion"]
+VISTOS = b"vistos"  # clave de la metadata de hojas.parquet con los ids (int64) ya agregados
+
+
+def indicadora(codes: np.ndarray, n_grupos: int) -> sparse.csr_matrix:
+    """Matriz dispersa (n_grupos x n_filas) con un 1 en (grupo de la fila, fila)."""
+    n = len(codes)
+    return sparse.csr_matrix((np.ones(n, dtype=np.float64), (codes, np.arange(n))), shape=(n_grupos, n))
+
+
+def group_sums(X: np.ndarray, keys: pd.DataFrame, pesos: Optional[np.ndarray] = None
+               ) -> Tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+    """(grupos ordenados, sumas (g x d) float64, conteos) de las filas de `X` por las columnas de `keys`.
+
+    `pesos` multiplica cada fila (p.ej. conteos cuando `X` ya son sumas de hojas).
+    """
+    codes, grupos = pd.MultiIndex.from_frame(keys).factorize(sort=True)
+    grupos = grupos.set_names(list(keys.columns))
+    w = np.ones(len(codes)) if pesos is None else np.asarray(pesos, dtype=np.float64)
+    ind = indicadora(codes, len(grupos))
+    sums = np.asarray(ind @ np.asarray(X, dtype=np.float64))
+    counts = np.bincount(codes, weights=w, minlength=len(grupos))
+    return grupos.to_frame(index=False), sums, counts
+
+
+def group_means(X: np.ndarray, keys: pd.DataFrame) -> Tuple[pd.DataFrame, np.ndarray]:
+    """(grupos, promedios float32) de las filas de `X` por las columnas de `keys`."""
+    grupos, sums, counts = group_sums(X, keys)
+    grupos["count"] = counts.astype(np.int64)
+    return grupos, (sums / counts[:, None]).astype(np.float32)
+
+
+def normalizar(M: np.ndarray) -> np.ndarray:
+    return M / np.maximum(np.linalg.norm(M, axis=1, keepdims=True), 1e-12)
+
+
+def similitud_consecutiva(means: np.ndarray) -> np.ndarray:
+    """Coseno entre cada fila y la anterior (primer valor NaN)."""
+    U = normalizar(means)
+    out = np.full(len(U), np.nan)
+    out[1:] = np.einsum("ij,ij->i", U[1:], U[:-1])
+    return out
+
+
+def _ids_64(ids: Sequence[str]) -> np.ndarray:
+    """Hash de 8 bytes de cada id (para el conjunto de notas ya agregadas)."""
+    return np.array([int.from_bytes(hashlib.blake2b(str(i).encode("utf-8"), digest_size=8).digest(), "little",
+                                    signed=True) for i in ids], dtype=np.int64)
+
+
+def _hojas_de(meta: pd.DataFrame) -> pd.DataFrame:
+    keys = pd.DataFrame(index=meta.index)
+    fecha = meta["fecha_dia"] if "fecha_dia" in meta.columns else meta["fecha"]
+    keys["fecha_dia"] = pd.to_datetime(fecha).dt.normalize().dt.tz_localize(None)
+    for c in HOJA[1:]:
+        keys[c] = meta[c].fillna("").astype(str) if c in meta.columns else ""
+    return keys.reset_index(drop=True)
+
+
+class AgregadosEmbeddings:
+    """Sumas y conteos por (fecha_dia, diario, seccion), actualizables con notas nuevas."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.hojas = pd.DataFrame({c: pd.Series(dtype="datetime64[ns]" if c == "fecha_dia" else object)
+                                   for c in HOJA})
+        self.hojas["count"] = pd.Series(dtype=np.int64)
+        self.sums = np.zeros((0, 0))
+        self.vistos = np.empty(0, dtype=np.int64)
+        kv = {}
+        if (self.root / "hojas.parquet").exists():
+            with pq.ParquetFile(self.root / "hojas.parquet") as pf:
+                t = pf.read()
+                kv = pf.metadata.metadata or {}
+            self.sums = from_fixed_size_list(t.column("sum")).astype(np.float64)
+            self.hojas = t.drop(["sum"]).to_pandas()
+            if VISTOS in kv:
+                self.vistos = np.frombuffer(kv[VISTOS], dtype=np.int64)
+        if VISTOS not in kv and (self.root / "vistos.npy").exists():  # formato anterior
+            self.vistos = np.load(self.root / "vistos.npy")
+
+    @property
+    def dim(self) -> int:
+        return self.sums.shape[1]
+
+    def update(self, meta: pd.DataFrame, X: np.ndarray, ids: Optional[Sequence[str]] = None) -> int:
+        """Suma las filas de `X` (alineadas con `meta`) cuyo id no se haya agregado antes.
+
+        `ids` default: `meta['url']`. Devuelve la cantidad de notas nuevas agregadas.
+        """
+        if ids is None:
+            ids = meta["url"].tolist()
+        h = _ids_64(ids)
+        _, primero = np.unique(h, return_index=True)
+        nuevo = np.zeros(len(h), dtype=bool)
+        nuevo[primero] = True
+        nuevo &= ~np.isin(h, self.vistos)
+        if not nuevo.any():
+            return 0
+
+        keys = _hojas_de(meta.reset_index(drop=True)[nuevo])
+        grupos, sums, counts = group_sums(np.asarray(X)[nuevo], keys)
+        grupos["count"] = counts.astype(np.int64)
+        if len(self.hojas):
+            # unir con las hojas existentes: re-sumar hojas viejas + nuevas (pesos = conteos)
+            todas = pd.concat([self.hojas[HOJA], grupos[HOJA]], ignore_index=True)
+            X_all = np.vstack([self.sums, sums])
+            w = np.concatenate([self.hojas["count"].to_numpy(), grupos["count"].to_numpy()])
+            grupos, sums, counts = group_sums(X_all, todas, pesos=w)
+            grupos["count"] = counts.astype(np.int64)
+        self.hojas, self.sums = grupos, sums
+        self.vistos = np.concatenate([self.vistos, h[nuevo]])
+        return int(nuevo.sum())
+
+    def agregar(self, por: List[str]) -> Tuple[pd.DataFrame, np.ndarray]:
+        """(grupos con `count`, promedios float32) para cualquier subconjunto de las claves hoja."""
+        grupos, sums, counts = group_sums(self.sums, self.hojas[por], pesos=self.hojas["count"].to_numpy())
+        grupos["count"] = counts.astype(np.int64)
+        return grupos, (sums / counts[:, None]).astype(np.float32)
+
+    def rolling(self, ventana: int, por: Optional[List[str]] = None) -> Tuple[pd.DataFrame, np.ndarray]:
+        """Promedio de los últimos `ventana` días calendario (inclusive) para cada día y grupo de `por`.
+
+        Días sin notas quedan con count 0 y promedio NaN.
+        """
+        por = por or []
+        claves = ["fecha_dia"] + por
+        grupos, sums, counts = group_sums(self.sums, self.hojas[claves], pesos=self.hojas["count"].to_numpy())
+        dias = pd.date_range(grupos["fecha_dia"].min(), grupos["fecha_dia"].max(), freq="D")
+        t = ((grupos["fecha_dia"] - dias[0]).dt.days).to_numpy()
+        if por:
+            g, gkeys = pd.MultiIndex.from_frame(grupos[por]).factorize(sort=True)
+            gkeys = gkeys.set_names(por)
+        else:
+            g, gkeys = np.zeros(len(grupos), dtype=np.int64), None
+        n_g = int(g.max()) + 1
+
+        S = np.zeros((n_g, len(dias) + 1, self.dim))
+        C = np.zeros((n_g, len(dias) + 1))
+        S[g, t + 1] = sums
+        C[g, t + 1] = counts
+        S, C = S.cumsum(axis=1), C.cumsum(axis=1)
+        lo = np.maximum(np.arange(1, len(dias) + 1) - ventana, 0)
+        S_w = S[:, 1:] - S[:, lo]
+        C_w = C[:, 1:] - C[:, lo]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = S_w / C_w[..., None]
+
+        out = pd.DataFrame({"fecha_dia": np.tile(dias, n_g)})
+        if por:
+            rep = gkeys.to_frame(index=False).loc[np.repeat(np.arange(n_g), len(dias))].reset_index(drop=True)
+            out = pd.concat([out, rep], axis=1)
+        out["count"] = C_w.reshape(-1).astype(np.int64)
+        return out, means.reshape(-1, self.dim).astype(np.float32)
+
+    def save(self) -> None:
+        # las sumas se guardan en float64: se acumulan corrida tras corrida
+        t = pa.Table.from_pandas(self.hojas, preserve_index=False)
+        sums = np.ascontiguousarray(self.sums, dtype=np.float64)
+        t = t.append_column("sum", pa.FixedSizeListArray.from_arrays(pa.array(sums.reshape(-1)), self.dim))
+        # los ids vistos van en la metadata del mismo archivo: un solo os.replace confirma sumas e
+        # ids juntos (con dos archivos, un corte entre ambos duplicaba o perdía notas)
+        tmp = self.root / "hojas.parquet.tmp"
+        with pq.ParquetWriter(tmp, t.schema, compression="zstd") as w:
+            w.write_table(t)
+            w.add_key_value_metadata({VISTOS: np.ascontiguousarray(self.vistos, dtype=np.int64).tobytes()})
+        os.replace(tmp, self.root / "hojas.parquet")
+        (self.root / "vistos.npy").unlink(missing_ok=True)
+
+
+def exportar(grupos: pd.DataFrame, means: np.ndarray, path: Path) -> None:
+    """Parquet con las claves, `count` y `embedding` como fixed_size_list<float32>."""
+    t = pa.Table.from_pandas(grupos, preserve_index=False)
+    t = t.append_column("embedding", to_fixed_size_list(means))
+    pq.write_table(t, path, compression="zstd")
+
+
+def actualizar(agg: AgregadosEmbeddings, emb, batch_rows: int = 65_536) -> int:
+    """Suma a `agg` las notas nuevas de la salida de `embed_corpus.py` (lotes de filas, sin cargarla entera)."""
+    dataset = ds.dataset(emb, format="parquet")
+    cols = [c for c in ["url", "fecha", "fecha_dia", "fecha_publicacion", "diario", "seccion", "embedding"]
+            if c in dataset.schema.names]
+    nuevas = 0
+    for batch in dataset.to_batches(columns=cols, batch_size=batch_rows):
+        meta = batch.drop_columns(["embedding"]).to_pandas()
+        if "fecha" not in meta.columns and "fecha_dia" not in meta.columns:
+            meta["fecha"] = meta["fecha_publicacion"]
+        nuevas += agg.update(meta, from_fixed_size_list(batch.column("embedding")))
+    return nuevas
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Agregados de embeddings por día / sección / diario.")
+    ap.add_argument("--emb", default="news_embeddings", help="Salida de embed_corpus.py (Parquet o directorio)")
+    ap.add_argument("--root", default="agregados_emb", help="Estado incremental (hojas + ids vistos)")
+    ap.add_argument("--por", nargs="+", default=["fecha_dia"], choices=HOJA, help="Claves de agregación")
+    ap.add_argument("--ventana", type=int, default=0, help="Ventana móvil en días (0 = sin ventana)")
+    ap.add_argument("--out", default="daily_news_embeddings.parquet")
+    ap.add_argument("--batch-rows", type=int, default=65_536)
+    args = ap.parse_args()
+
+    agg = AgregadosEmbeddings(args.root)
+    nuevas = actualizar(agg, args.emb, args.batch_rows)
+    agg.save()
+    print(f"[INFO] {nuevas} notas nuevas agregadas; {len(agg.hojas)} hojas, {len(agg.vistos)} notas en total")
+
+    if args.ventana:
+        por = [c for c in args.por if c != "fecha_dia"]
+        grupos, means = agg.rolling(args.ventana, por)
+    else:
+        grupos, means = agg.agregar(args.por)
+    exportar(grupos, means, Path(args.out))
+    print(f"[OK] {args.out}: {len(grupos)} filas, dim={means.shape[1]}")
+
+
+if __name__ == "__main__":
+    main()
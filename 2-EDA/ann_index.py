@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Índice aproximado de vecinos (IVF) sobre los embeddings normalizados del corpus.
+
+- Cuantizador grueso: k-means esférico (coseno) entrenado sobre una muestra; cada nota
+  queda en la lista de su centroide más cercano. Una consulta solo compara contra las
+  notas de las `nprobe` listas más cercanas, no contra todo el corpus.
+- Almacenamiento local en `<root>/`: `centroides.npy`, shards `vectors-NNNNN.npy` (float32,
+  leídos con memmap) y `filas-NNNNN.parquet` (url, fecha, diario, seccion, titulo, lista).
+  Dentro de cada shard las filas están ordenadas por lista: cada lista es un slice contiguo.
+- `add()` inserta notas nuevas (dedup por url) como un shard más; `compact()` une los
+  shards y `retrain()` re-entrena los centroides si el corpus cambió mucho.
+- `search()` acepta filtros de rango de fechas y diario (sin distinguir mayúsculas ni acentos:
+  `clarin` encuentra "Clarín"); el filtro se aplica sobre los candidatos antes del producto punto.
+
+Uso:
+  python ann_index.py build  --emb news_embeddings --root ann_index
+  python ann_index.py add    --emb news_embeddings --root ann_index        # solo lo nuevo
+  python ann_index.py query  --root ann_index --texto "suba del dólar blue" -k 10 --desde 2025-03-01 --diario clarin
+  python ann_index.py query  --root ann_index --url https://www.lanacion.com.ar/... -k 5
+"""
+
+import argparse
+import json
+import os
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from embedding_store import from_fixed_size_list
+
+META_COLS = ["url", "fecha", "diario", "seccion", "titulo"]
+
+
+def normalizar(M: np.ndarray) -> np.ndarray:
+    M = np.asarray(M, dtype=np.float32)
+    return M / np.maximum(np.linalg.norm(M, axis=1, keepdims=True), 1e-12)
+
+
+def asignar(X: np.ndarray, centroides: np.ndarray, chunk: int = 65_536) -> np.ndarray:
+    """Lista (centroide de mayor coseno) de cada fila de `X`, en chunks."""
+    out = np.empty(len(X), dtype=np.int32)
+    for i in range(0, len(X), chunk):
+        out[i:i + chunk] = (X[i:i + chunk] @ centroides.T).argmax(axis=1)
+    return out
+
+
+def kmeans_esferico(X: np.ndarray, k: int, iters: int = 15, seed: int = 0) -> np.ndarray:
+    """Centroides normalizados por k-means con similitud coseno (Lloyd, vectorizado)."""
+    rng = np.random.default_rng(seed)
+    C = X[rng.choice(len(X), size=k, replace=False)].copy()
+    for _ in range(iters):
+        a = asignar(X, C)
+        sums = np.zeros_like(C)
+        np.add.at(sums, a, X)
+        vacias = np.bincount(a, minlength=k) == 0
+        sums[vacias] = X[rng.choice(len(X), size=int(vacias.sum()), replace=False)]  # re-sembrar
+        C = normalizar(sums)
+    return C
+
+
+def _clave_diario(nombre: str) -> str:
+    """Nombre de diario para comparar: minúsculas, sin acentos ni espacios de más."""
+    t = unicodedata.normalize("NFKD", str(nombre))
+    return " ".join("".join(c for c in t if not unicodedata.combining(c)).lower().split())
+
+
+class _Shard:
+    def __init__(self, vectors: np.ndarray, filas: pd.DataFrame, nlist: int):
+        self.vectors = vectors
+        self.filas = filas
+        self.fecha = filas["fecha"].to_numpy(dtype="datetime64[D]")
+        claves = {d: _clave_diario(d) for d in filas["diario"].unique()}
+        self.diario = filas["diario"].map(claves).to_numpy(dtype=object)
+        lista = filas["lista"].to_numpy()
+        self.offsets = np.searchsorted(lista, np.arange(nlist + 1))  # filas ordenadas por lista
+
+
+class ANNIndex:
+    """Índice IVF persistente con inserciones incrementales y filtros por fecha/diario."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        with open(self.root / "meta.json", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.centroides = np.load(self.root / "centroides.npy")
+        self.shards: List[_Shard] = [self._cargar_shard(s) for s in self.meta["shards"]]
+        self._urls: Optional[Dict[str, tuple]] = None
+
+    # --- creación / persistencia ---
+    @classmethod
+    def build(cls, root, X: np.ndarray, filas: pd.DataFrame, nlist: Optional[int] = None,
+              muestra: int = 100_000, model: Optional[str] = None, backend: str = "fp32") -> "ANNIndex":
+        """Entrena los centroides sobre una muestra de `X` y crea el índice con todas las filas."""
+        root = Path(root)
+        root.mkdir(parents=True, exist_ok=True)
+        X = normalizar(X)
+        nlist = nlist or max(1, int(4 * np.sqrt(len(X))))
+        rng = np.random.default_rng(0)
+        sample = X[rng.choice(len(X), size=min(muestra, len(X)), replace=False)]
+        np.save(root / "centroides.npy", kmeans_esferico(sample, min(nlist, len(sample))))
+        meta = {"dim": int(X.shape[1]), "nlist": int(min(nlist, len(sample))), "model": model,
+                "backend": backend, "shards": []}
+        with open(root / "meta.json", "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=1)
+        for p in list(root.glob("vectors-*.npy")) + list(root.glob("filas-*.parquet")):
+            p.unlink()
+        index = cls(root)
+        index.add(X, filas)
+        return index
+
+    def _save_meta(self) -> None:
+        tmp = self.root / "meta.json.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, indent=1)
+        os.replace(tmp, self.root / "meta.json")
+
+    def _cargar_shard(self, sid: int) -> _Shard:
+        vectors = np.load(self.root / f"vectors-{sid:05d}.npy", mmap_mode="r")
+        filas = pq.read_table(self.root / f"filas-{sid:05d}.parquet").to_pandas()
+        return _Shard(vectors, filas, self.meta["nlist"])
+
+    def _escribir_shard(self, sid: int, X: np.ndarray, filas: pd.DataFrame) -> None:
+        tmp = self.root / f".vectors-{sid:05d}.npy.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, np.ascontiguousarray(X, dtype=np.float32))
+        os.replace(tmp, self.root / f"vectors-{sid:05d}.npy")
+        tmp = self.root / f"filas-{sid:05d}.parquet.tmp"
+        pq.write_table(pa.Table.from_pandas(filas, preserve_index=False), tmp, compression="zstd")
+        os.replace(tmp, self.root / f"filas-{sid:05d}.parquet")
+
+    # --- escritura ---
+    @property
+    def urls(self) -> Dict[str, tuple]:
+        """url -> (shard, fila)."""
+        if self._urls is None:
+            self._urls = {u: (si, i) for si, sh in enumerate(self.shards)
+                          for i, u in enumerate(sh.filas["url"].tolist())}
+        return self._urls
+
+    def __len__(self) -> int:
+        return sum(len(sh.filas) for sh in self.shards)
+
+    def add(self, X: np.ndarray, filas: pd.DataFrame) -> int:
+        """Inserta las filas cuya url no esté en el índice. Devuelve cuántas se agregaron."""
+        filas = filas.reset_index(drop=True)
+        nuevo = ~filas["url"].duplicated().to_numpy() & ~filas["url"].isin(self.urls.keys()).to_numpy()
+        if not nuevo.any():
+            return 0
+        X = normalizar(np.asarray(X)[nuevo])
+        filas = pd.DataFrame({c: filas[c] if c in filas.columns else None for c in META_COLS})[nuevo]
+        filas["fecha"] = pd.to_datetime(filas["fecha"]).dt.tz_localize(None).dt.normalize()
+        filas["diario"] = filas["diario"].fillna("").astype(str)
+        filas["lista"] = asignar(X, self.centroides)
+        orden = np.argsort(filas["lista"].to_numpy(), kind="stable")
+        X, filas = X[orden], filas.iloc[orden].reset_index(drop=True)
+
+        sid = max(self.meta["shards"], default=-1) + 1
+        self._escribir_shard(sid, X, filas)
+        self.meta["shards"].append(sid)
+        self._save_meta()
+        self.shards.append(self._cargar_shard(sid))
+        self._urls = None
+        return int(nuevo.sum())
+
+    def compact(self) -> None:
+        """Une todos los shards en uno, ordenado por lista."""
+        if len(self.shards) < 2:
+            return
+        X = np.vstack([np.asarray(sh.vectors) for sh in self.shards])
+        filas = pd.concat([sh.filas for sh in self.shards], ignore_index=True)
+        self._reescribir(X, filas)
+
+    def retrain(self, muestra: int = 100_000) -> None:
+        """Re-entrena los centroides con el contenido actual y reasigna todas las filas."""
+        X = np.vstack([np.asarray(sh.vectors) for sh in self.shards])
+        filas = pd.concat([sh.filas for sh in self.shards], ignore_index=True)
+        nlist = max(1, int(4 * np.sqrt(len(X))))
+        rng = np.random.default_rng(0)
+        sample = X[rng.choice(len(X), size=min(muestra, len(X)), replace=False)]
+        self.centroides = kmeans_esferico(sample, min(nlist, len(sample)))
+        np.save(self.root / "centroides.npy", self.centroides)
+        self.meta["nlist"] = len(self.centroides)
+        filas["lista"] = asignar(X, self.centroides)
+        self._reescribir(X, filas)
+
+    def _reescribir(self, X: np.ndarray, filas: pd.DataFrame) -> None:
+        orden = np.argsort(filas["lista"].to_numpy(), kind="stable")
+        viejos = list(self.meta["shards"])
+        sid = max(viejos) + 1
+        self.shards = []  # soltar los memmaps antes de borrar
+        self._escribir_shard(sid, X[orden], filas.iloc[orden].reset_index(drop=True))
+        self.meta["shards"] = [sid]
+        self._save_meta()
+        for s in viejos:
+            (self.root / f"vectors-{s:05d}.npy").unlink(missing_ok=True)
+            (self.root / f"filas-{s:05d}.parquet").unlink(missing_ok=True)
+        self.shards = [self._cargar_shard(sid)]
+        self._urls = None
+
+    # --- consulta ---
+    def vector(self, url: str) -> np.ndarray:
+        si, i = self.urls[url]
+        return np.asarray(self.shards[si].vectors[i])
+
+    def search(self, q: np.ndarray, k: int = 10, nprobe: int = 16, desde: Optional[str] = None,
+               hasta: Optional[str] = None, diarios: Optional[Sequence[str]] = None,
+               excluir: Sequence[str] = ()) -> pd.DataFrame:
+        """Top-k filas por coseno con `q`, buscando en las `nprobe` listas más cercanas."""
+        q = normalizar(np.asarray(q).reshape(1, -1))[0]
+        probes = np.argsort(-(self.centroides @ q))[:nprobe]
+        d0 = np.datetime64(desde, "D") if desde else None
+        d1 = np.datetime64(hasta, "D") if hasta else None
+        scores, refs = [], []
+        for si, sh in enumerate(self.shards):
+            idx = np.concatenate([np.arange(sh.offsets[p], sh.offsets[p + 1]) for p in probes])
+            if d0 is not None:
+                idx = idx[sh.fecha[idx] >= d0]
+            if d1 is not None:
+                idx = idx[sh.fecha[idx] <= d1]
+            if diarios:
+                idx = idx[np.isin(sh.diario[idx], [_clave_diario(d) for d in diarios])]
+            if not len(idx):
+                continue
+            scores.append(sh.vectors[idx] @ q)
+            refs.append(np.stack([np.full(len(idx), si), idx], axis=1))
+        if not scores:
+            return pd.DataFrame(columns=META_COLS + ["score"])
+        s = np.concatenate(scores)
+        r = np.concatenate(refs)
+        m = min(k + len(excluir), len(s))
+        top = np.argpartition(-s, m - 1)[:m]
+        top = top[np.argsort(-s[top])]
+        partes = []
+        for si in np.unique(r[top, 0]):
+            sel = top[r[top, 0] == si]
+            parte = self.shards[si].filas.iloc[r[sel, 1]][META_COLS].copy()
+            parte["score"] = s[sel]
+            partes.append(parte)
+        out = pd.concat(partes).sort_values("score", ascending=False)
+        if excluir:
+            out = out[~out["url"].isin(list(excluir))]
+        return out.head(k).reset_index(drop=True)
+
+
+def leer_embeddings(path: str):
+    """(vectores float32, filas) de la salida de `embed_corpus.py`."""
+    dataset = ds.dataset(path, format="parquet")
+    cols = [c for c in META_COLS + ["embedding"] if c in dataset.schema.names]
+    t = dataset.to_table(columns=cols)
+    return from_fixed_size_list(t.column("embedding")), t.drop(["embedding"]).to_pandas()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Índice IVF de búsqueda semántica sobre las noticias.")
+    ap.add_argument("comando", choices=["build", "add", "compact", "retrain", "query"])
+    ap.add_argument("--root", default="ann_index")
+    ap.add_argument("--emb", default="news_embeddings", help="Salida de embed_corpus.py")
+    ap.add_argument("--nlist", type=int, default=None, help="Listas IVF (default: 4*sqrt(n))")
+    ap.add_argument("--model", default=None, help="Modelo para consultas por texto (default: el del build)")
+    ap.add_argument("--backend", default="fp32")
+    ap.add_argument("--texto", help="Consulta libre")
+    ap.add_argument("--url", help="Consulta: notas parecidas a esta url")
+    ap.add_argument("-k", type=int, default=10)
+    ap.add_argument("--nprobe", type=int, default=16)
+    ap.add_argument("--desde")
+    ap.add_argument("--hasta")
+    ap.add_argument("--diario", nargs="+", help='Filtro por diario ("clarin", "la nacion", "pagina 12", ...)')
+    args = ap.parse_args()
+
+    if args.comando == "build":
+        from embed_corpus import MODEL_NAME
+        X, filas = leer_embeddings(args.emb)
+        idx = ANNIndex.build(args.root, X, filas, nlist=args.nlist, model=args.model or MODEL_NAME,
+                             backend=args.backend)
+        print(f"[OK] {len(idx)} notas, {idx.meta['nlist']} listas")
+        return
+
+    idx = ANNIndex(args.root)
+    if args.comando == "add":
+        X, filas = leer_embeddings(args.emb)
+        print(f"[OK] {idx.add(X, filas)} notas nuevas; {len(idx)} en total")
+    elif args.comando == "compact":
+        idx.compact()
+        print(f"[OK] {len(idx)} notas en 1 shard")
+    elif args.comando == "retrain":
+        idx.retrain()
+        print(f"[OK] {len(idx)} notas, {idx.meta['nlist']} listas")
+    else:
+        if args.url:
+            q, excluir = idx.vector(args.url), [args.url]
+        elif args.texto:
+            from embed_backends import cargar_modelo
+            model = cargar_modelo(args.model or idx.meta["model"], idx.meta.get("backend", "fp32"))
+            q = model.encode([args.texto], convert_to_numpy=True, normalize_embeddings=True)[0]
+            excluir = []
+        else:
+            ap.error("query necesita --texto o --url")
+        res = idx.search(q, k=args.k, nprobe=args.nprobe, desde=args.desde, hasta=args.hasta,
+                         diarios=args.diario, excluir=excluir)
+        with pd.option_context("display.max_colwidth", 80, "display.width", 160):
+            print(res[["score", "fecha", "diario", "seccion", "titulo", "url"]].to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
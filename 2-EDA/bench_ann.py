@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark del índice IVF (`ann_index.py`) contra la búsqueda exacta por fuerza bruta.
+
+Usa los embeddings reales (`--emb`, salida de `embed_corpus.py`) o, si no se pasan, un
+corpus sintético de vectores normalizados agrupados en tópicos. Las consultas son notas
+del corpus (excluyendo a la propia nota). Para cada `nprobe` informa recall@k respecto
+del top-k exacto y latencia p50 / p95 por consulta; también el costo de construir el índice
+y de insertar un lote nuevo.
+
+Uso:
+  python bench_ann.py --n 200000
+  python bench_ann.py --emb news_embeddings --nprobe 4 8 16 32
+"""
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from ann_index import ANNIndex, leer_embeddings, normalizar
+
+
+def corpus(n: int, dim: int = 384, topicos: int = 500, ruido: float = 1.5, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centros = normalizar(rng.normal(size=(topicos, dim)))
+    X = centros[rng.integers(topicos, size=n)] + ruido * rng.normal(size=(n, dim)) / np.sqrt(dim)
+    filas = pd.DataFrame({"url": [f"https://example.com/nota/{i}" for i in range(n)],
+                          "fecha": pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 120, n), "D"),
+                          "diario": rng.choice(["clarin", "lanacion", "pagina12", "ambito"], n)})
+    return normalizar(X), filas
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Recall / latencia del índice IVF vs fuerza bruta.")
+    ap.add_argument("--emb", help="Embeddings reales (default: corpus sintético)")
+    ap.add_argument("--n", type=int, default=100_000, help="Notas del corpus sintético")
+    ap.add_argument("--consultas", type=int, default=200)
+    ap.add_argument("-k", type=int, default=10)
+    ap.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32, 64])
+    args = ap.parse_args()
+
+    X, filas = leer_embeddings(args.emb) if args.emb else corpus(args.n)
+    X = normalizar(X)
+    n_insert = max(1, len(X) // 20)  # el último 5% se inserta después del build
+    rng = np.random.default_rng(1)
+    qs = rng.choice(len(X), size=min(args.consultas, len(X)), replace=False)
+
+    with tempfile.TemporaryDirectory() as d:
+        t0 = time.perf_counter()
+        idx = ANNIndex.build(d, X[:-n_insert], filas.iloc[:-n_insert])
+        t_build = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        idx.add(X[-n_insert:], filas.iloc[-n_insert:])
+        t_add = time.perf_counter() - t0
+
+        # exacto: producto contra toda la matriz
+        lat_bf, exactos = [], []
+        for q in qs:
+            t0 = time.perf_counter()
+            s = X @ X[q]
+            s[q] = -np.inf
+            top = np.argpartition(-s, args.k)[:args.k]
+            lat_bf.append(time.perf_counter() - t0)
+            exactos.append(set(filas["url"].iloc[top]))
+
+        print(f"Corpus: {len(X)} notas, dim={X.shape[1]}, {idx.meta['nlist']} listas | k={args.k}")
+        print(f"Build: {t_build:.1f}s | insertar {n_insert} notas: {t_add:.2f}s")
+        print(f"Fuerza bruta: p50 {np.percentile(lat_bf, 50) * 1e3:.2f} ms")
+        print(f"{'nprobe':>6} {'recall@k':>9} {'p50 ms':>7} {'p95 ms':>7}")
+        for nprobe in args.nprobe:
+            lat, rec = [], []
+            for q, ex in zip(qs, exactos):
+                url = filas["url"].iloc[q]
+                t0 = time.perf_counter()
+                res = idx.search(X[q], k=args.k, nprobe=nprobe, excluir=[url])
+                lat.append(time.perf_counter() - t0)
+                rec.append(len(ex & set(res["url"])) / args.k)
+            print(f"{nprobe:>6} {np.mean(rec):>9.3f} {np.percentile(lat, 50) * 1e3:>7.2f} "
+                  f"{np.percentile(lat, 95) * 1e3:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
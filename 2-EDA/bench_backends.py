@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de backends de embeddings en CPU (`embed_backends.py`): fp32 vs int8 vs ONNX.
+
+Para una muestra del corpus, cada backend corre en un proceso propio (así el pico de RSS
+es solo suyo) y se mide:
+- carga del modelo (s), throughput con `--batch-size` (textos/s),
+- latencia de una consulta suelta (p50 / p95 en ms, textos de a uno),
+- pico de memoria residente (MB),
+- acuerdo con fp32: coseno entre el vector fp32 y el del backend (media, p1, mínimo) y
+  fracción de textos cuyo vecino más cercano en la muestra es el mismo.
+
+Uso:
+  python bench_backends.py --input ../1-Scraping/dataset_consolidado/df.parquet
+  python bench_backends.py --backends fp32 int8 --n 2000 --threads 4
+"""
+
+import argparse
+import multiprocessing as mp
+import resource
+import time
+from typing import List
+
+import numpy as np
+import pyarrow.parquet as pq
+
+from embed_backends import BACKENDS, cargar_modelo
+from embed_corpus import MODEL_NAME, textos_del_lote
+
+
+def muestra(path: str, columnas: List[str], n: int, max_chars: int, seed: int = 0) -> List[str]:
+    table = pq.read_table(path, columns=columnas)
+    rng = np.random.default_rng(seed)
+    idx = np.sort(rng.choice(table.num_rows, size=min(n, table.num_rows), replace=False))
+    batch = table.take(idx).combine_chunks().to_batches()[0]
+    return [t for t in textos_del_lote(batch, columnas, max_chars) if t]
+
+
+def correr(backend: str, model_name: str, texts: List[str], batch_size: int, threads: int,
+           n_latencia: int) -> dict:
+    """Se ejecuta en un proceso aparte por backend."""
+    t0 = time.perf_counter()
+    model = cargar_modelo(model_name, backend, threads=threads)
+    t_carga = time.perf_counter() - t0
+
+    kw = dict(convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False)
+    model.encode(texts[:batch_size], batch_size=batch_size, **kw)  # warm-up
+    t0 = time.perf_counter()
+    vecs = model.encode(texts, batch_size=batch_size, **kw).astype(np.float32)
+    t_total = time.perf_counter() - t0
+
+    lat = []
+    for t in texts[:n_latencia]:
+        t0 = time.perf_counter()
+        model.encode([t], **kw)
+        lat.append(time.perf_counter() - t0)
+
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB en Linux
+    return {"backend": backend, "carga_s": t_carga, "textos_s": len(texts) / t_total,
+            "p50_ms": float(np.percentile(lat, 50)) * 1e3, "p95_ms": float(np.percentile(lat, 95)) * 1e3,
+            "rss_mb": rss_mb, "vecs": vecs}
+
+
+def acuerdo(ref: np.ndarray, vecs: np.ndarray) -> dict:
+    """Coseno fila a fila contra fp32 y coincidencia del vecino más cercano dentro de la muestra."""
+    cos = np.einsum("ij,ij->i", ref, vecs) / (
+        np.linalg.norm(ref, axis=1) * np.linalg.norm(vecs, axis=1) + 1e-12)
+    nn = []
+    for m in (ref, vecs):
+        sim = m @ m.T
+        np.fill_diagonal(sim, -np.inf)
+        nn.append(sim.argmax(axis=1))
+    return {"cos_media": float(cos.mean()), "cos_p1": float(np.percentile(cos, 1)),
+            "cos_min": float(cos.min()), "vecino_igual": float((nn[0] == nn[1]).mean())}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark de backends de embeddings en CPU.")
+    ap.add_argument("--input", default="../1-Scraping/dataset_consolidado/df.parquet")
+    ap.add_argument("--columnas", nargs="+", default=["titulo", "contenido"])
+    ap.add_argument("--model", default=MODEL_NAME)
+    ap.add_argument("--backends", nargs="+", choices=BACKENDS, default=["fp32", "int8"])
+    ap.add_argument("--n", type=int, default=1000, help="Textos de la muestra")
+    ap.add_argument("--max-chars", type=int, default=2000)
+    ap.add_argument("--batch-size", type=int, default=64)
+    ap.add_argument("--threads", type=int, default=None, help="Threads de torch (default: todos)")
+    ap.add_argument("--n-latencia", type=int, default=50, help="Consultas sueltas para medir latencia")
+    args = ap.parse_args()
+
+    texts = muestra(args.input, args.columnas, args.n, args.max_chars)
+    backends = ["fp32"] + [b for b in args.backends if b != "fp32"]  # fp32 es la referencia
+    print(f"Muestra: {len(texts)} textos | modelo {args.model} | batch_size={args.batch_size}")
+
+    ctx = mp.get_context("spawn")
+    res = []
+    for b in backends:
+        with ctx.Pool(1) as pool:
+            res.append(pool.apply(correr, (b, args.model, texts, args.batch_size, args.threads,
+                                           args.n_latencia)))
+
+    ref = res[0]["vecs"]
+    print(f"{'backend':<10} {'carga s':>8} {'textos/s':>9} {'p50 ms':>7} {'p95 ms':>7} {'RSS MB':>7} "
+          f"{'cos media':>9} {'cos p1':>7} {'cos min':>7} {'vecino=':>7}")
+    for r in res:
+        a = acuerdo(ref, r["vecs"])
+        print(f"{r['backend']:<10} {r['carga_s']:>8.1f} {r['textos_s']:>9.1f} {r['p50_ms']:>7.1f} "
+              f"{r['p95_ms']:>7.1f} {r['rss_mb']:>7.0f} {a['cos_media']:>9.4f} {a['cos_p1']:>7.4f} "
+              f"{a['cos_min']:>7.4f} {a['vecino_igual']:>7.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Backends de inferencia en CPU para el modelo de embeddings.
+
+- `fp32`: PyTorch tal cual (el camino del notebook).
+- `int8`: cuantización dinámica de PyTorch (`quantize_dynamic` sobre las capas `Linear`):
+  pesos int8, activaciones cuantizadas al vuelo. No requiere dependencias extra.
+- `onnx` / `onnx-int8`: grafo ONNX optimizado vía `SentenceTransformer(..., backend="onnx")`
+  (requiere `optimum[onnxruntime]`); la variante int8 exporta y cuantiza el grafo (AVX2)
+  la primera vez y lo reutiliza de `--onnx-dir`.
+
+Cada backend produce vectores distintos (aunque muy parecidos), así que en el cache se guardan
+bajo otro nombre de modelo: `cache_name()` agrega el sufijo `@<backend>` salvo para fp32.
+
+Uso:
+  from embed_backends import cargar_modelo, cache_name
+  model = cargar_modelo(MODEL_NAME, "int8")
+  store = EmbeddingStore("emb_cache", cache_name(MODEL_NAME, "int8"))
+"""
+
+from pathlib import Path
+from typing import Optional
+
+BACKENDS = ("fp32", "int8", "onnx", "onnx-int8")
+ONNX_INT8_FILE = "model_qint8_avx2.onnx"
+
+
+def cache_name(model_name: str, backend: str) -> str:
+    """Nombre del modelo en el `EmbeddingStore` (fp32 conserva el nombre original)."""
+    return model_name if backend == "fp32" else f"{model_name}@{backend}"
+
+
+def cargar_modelo(model_name: str, backend: str = "fp32", threads: Optional[int] = None,
+                  onnx_dir: str = "onnx_models"):
+    """`SentenceTransformer` en CPU con el backend pedido."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend desconocido: {backend} (opciones: {', '.join(BACKENDS)})")
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    if threads:
+        torch.set_num_threads(threads)
+
+    if backend == "fp32":
+        return SentenceTransformer(model_name, device="cpu")
+
+    if backend == "int8":
+        model = SentenceTransformer(model_name, device="cpu")
+        model.eval()
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    if backend == "onnx":
+        return SentenceTransformer(model_name, device="cpu", backend="onnx")
+
+    # onnx-int8: exporta + cuantiza una vez, después carga el archivo local
+    from sentence_transformers import export_dynamic_quantized_onnx_model
+
+    local = Path(onnx_dir) / model_name.replace("/", "__")
+    if not (local / "onnx" / ONNX_INT8_FILE).exists():
+        model = SentenceTransformer(model_name, device="cpu", backend="onnx")
+        model.save(str(local))
+        export_dynamic_quantized_onnx_model(model, "avx2", str(local))
+    return SentenceTransformer(str(local), device="cpu", backend="onnx",
+                               model_kwargs={"file_name": f"onnx/{ONNX_INT8_FILE}"})
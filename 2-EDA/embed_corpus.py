@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Job de embeddings en streaming y multi-proceso para hosts sin GPU.
+
+- Lee el corpus en lotes de filas (`pyarrow.dataset`), nunca el Parquet completo.
+- Cada lote se cruza con el cache (`embedding_store.py`): solo se codifican los textos nuevos.
+- Los textos nuevos se ordenan por largo y se cortan en chunks, así cada batch del modelo
+  tiene textos de largo parecido (menos padding). Los chunks se reparten entre un pool de
+  procesos (uno por grupo de `--threads` cores), cada uno con su copia del modelo.
+- Cada lote de entrada produce un `part-<archivo>-NNNNN.parquet` (ids + hash + embedding float32
+  de tamaño fijo), escrito de forma atómica. `_progreso.json` registra los lotes terminados de
+  cada archivo del input junto con su tamaño y mtime: al relanzar el job se retoma desde el primer
+  lote pendiente, los archivos nuevos se agregan y los que cambiaron (o ya no están) se rehacen
+  (o se sacan). Que se agreguen archivos al input no corre los lotes de los demás.
+- Al final (y cada `--log-every` lotes) informa textos/s codificados y filas/s totales.
+
+Uso:
+  python embed_corpus.py --input ../1-Scraping/dataset_consolidado/df.parquet --out news_embeddings
+  python embed_corpus.py --input noticias_LN_2025Q1.parquet --columnas texto --workers 4 --threads 2
+  python embed_corpus.py --backend int8          # ver embed_backends.py / bench_backends.py
+  pd.read_parquet("news_embeddings")      # columna `embedding`: fixed_size_list<float32>
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from embed_backends import BACKENDS, cache_name, cargar_modelo
+from embedding_store import EmbeddingStore, content_hash, to_fixed_size_list
+
+MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+PROGRESO = "_progreso.json"
+ID_COLS = ["url", "id", "fecha", "fecha_publicacion", "diario", "seccion", "titulo"]
+
+# estado por proceso del pool
+_model = None
+_batch_size = 64
+_normalize = True
+
+
+def _init_worker(model_name: str, backend: str, threads: int, batch_size: int, normalize: bool) -> None:
+    """Carga el modelo una vez por proceso, limitando los threads de torch a su porción de cores."""
+    global _model, _batch_size, _normalize
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    _model = cargar_modelo(model_name, backend, threads=threads)
+    _batch_size = batch_size
+    _normalize = normalize
+
+
+def _encode_chunk(texts: List[str]) -> np.ndarray:
+    return _model.encode(texts, batch_size=_batch_size, convert_to_numpy=True,
+                         normalize_embeddings=_normalize, show_progress_bar=False).astype(np.float32)
+
+
+def textos_del_lote(batch: pa.RecordBatch, columnas: List[str], max_chars: int) -> List[str]:
+    """Une las columnas de texto del lote (separadas por '. ') y recorta a `max_chars`."""
+    partes = [pc.fill_null(batch.column(c).cast(pa.string()), "") for c in columnas]
+    texto = partes[0] if len(partes) == 1 else pc.binary_join_element_wise(*partes, ". ")
+    texto = pc.utf8_trim(texto, characters=". \n\t")
+    if max_chars:
+        texto = pc.utf8_slice_codeunits(texto, 0, max_chars)
+    return texto.to_pylist()
+
+
+def chunks_por_largo(texts: List[str], chunk_size: int) -> List[List[int]]:
+    """Índices de `texts` ordenados por largo y cortados en chunks de `chunk_size`."""
+    orden = np.argsort([len(t) for t in texts], kind="stable")
+    return [orden[i:i + chunk_size].tolist() for i in range(0, len(orden), chunk_size)]
+
+
+class EmbedJob:
+    """Recorre el corpus por lotes y escribe un part por lote, reanudable."""
+
+    def __init__(self, input_path: str, out_dir: str, store: EmbeddingStore, columnas: List[str],
+                 batch_rows: int = 4096, chunk_size: int = 256, max_chars: int = 2000,
+                 id_cols: Optional[List[str]] = None):
+        self.dataset = ds.dataset(input_path, format="parquet")
+        self.fragmentos = sorted(self.dataset.get_fragments(), key=lambda f: f.path)
+        self.out = Path(out_dir)
+        self.out.mkdir(parents=True, exist_ok=True)
+        self.store = store
+        self.columnas = columnas
+        self.batch_rows = batch_rows
+        self.chunk_size = chunk_size
+        self.max_chars = max_chars
+        names = self.dataset.schema.names
+        faltan = [c for c in columnas if c not in names]
+        if faltan:
+            raise ValueError(f"Faltan columnas de texto en {input_path}: {faltan}")
+        self.id_cols = [c for c in (id_cols or ID_COLS) if c in names and c not in columnas]
+        self.config = {"input": str(input_path), "model": store.model_name, "columnas": columnas,
+                       "batch_rows": batch_rows, "max_chars": max_chars, "id_cols": self.id_cols,
+                       "progreso": "por_archivo"}
+        self.progreso = self._cargar_progreso()
+        self._conciliar()
+
+    def _cargar_progreso(self) -> dict:
+        path = self.out / PROGRESO
+        if path.exists():
+            with open(path, encoding="utf-8") as f:
+                prog = json.load(f)
+            if prog.get("config") == self.config:
+                return prog
+            print("[INFO] Cambió la configuración: se regeneran los parts (el cache evita re-codificar).")
+            for p in self.out.glob("part-*.parquet"):
+                p.unlink()
+        return {"config": self.config, "archivos": {}}
+
+    @staticmethod
+    def _firma(path: str) -> List[int]:
+        st = os.stat(path)
+        return [st.st_size, st.st_mtime_ns]
+
+    @staticmethod
+    def _fid(archivo: str) -> str:
+        return hashlib.blake2b(archivo.encode("utf-8"), digest_size=4).hexdigest()
+
+    def _conciliar(self) -> None:
+        """Descarta el progreso (y los parts) de los archivos que cambiaron o ya no están en el input."""
+        actuales = {f.path: self._firma(f.path) for f in self.fragmentos}
+        for archivo, estado in list(self.progreso["archivos"].items()):
+            if actuales.get(archivo) != estado["firma"]:
+                print(f"[INFO] {archivo} cambió o ya no está en el input: se descartan sus parts")
+                for p in self.out.glob(f"part-{self._fid(archivo)}-*.parquet"):
+                    p.unlink()
+                del self.progreso["archivos"][archivo]
+        self._guardar_progreso()
+
+    def _guardar_progreso(self) -> None:
+        tmp = self.out / (PROGRESO + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.progreso, f, indent=1)
+        os.replace(tmp, self.out / PROGRESO)
+
+    def _escribir_part(self, name: str, batch: pa.RecordBatch, keys: List[bytes]) -> None:
+        vecs, found = self.store.get(keys)
+        if not found.all():  # no puede pasar salvo que el cache se haya tocado a mano (o esté corrupto)
+            faltan = [k.hex() for k, f in zip(keys, found) if not f]
+            raise RuntimeError(f"{len(faltan)} textos del lote sin vector en {self.store.dir}: "
+                               f"{', '.join(faltan[:5])}{' ...' if len(faltan) > 5 else ''}")
+        cols = {c: batch.column(c) for c in self.id_cols + self.columnas}
+        cols["hash"] = pa.array(keys, type=pa.binary(16))
+        cols["embedding"] = to_fixed_size_list(vecs)
+        tmp = self.out / (name + ".tmp")
+        pq.write_table(pa.table(cols), tmp, compression="zstd")
+        os.replace(tmp, self.out / name)
+
+    def run(self, pool, log_every: int = 10) -> dict:
+        archivos = self.progreso["archivos"]
+        hechas = sum(e["filas"] for e in archivos.values())
+        if hechas:
+            print(f"[INFO] Retomando: {hechas} filas hechas en {len(archivos)} archivos del input")
+        t0 = time.perf_counter()
+        t_encode = 0.0
+        filas = codificados = lotes = 0
+        for frag in self.fragmentos:
+            estado = archivos.setdefault(frag.path, {"firma": self._firma(frag.path), "lotes": 0, "filas": 0,
+                                                     "completo": False})
+            if estado["completo"]:
+                continue
+            idx = -1
+            for batch in frag.to_batches(schema=self.dataset.schema, columns=self.columnas + self.id_cols,
+                                         batch_size=self.batch_rows):
+                if not batch.num_rows:
+                    continue
+                idx += 1
+                if idx < estado["lotes"]:
+                    continue
+                texts = textos_del_lote(batch, self.columnas, self.max_chars)
+                keys = [content_hash(t) for t in texts]
+                nuevos = {}
+                for k, t in zip(keys, texts):
+                    if k not in self.store.index and k not in nuevos:
+                        nuevos[k] = t
+                if nuevos:
+                    nk, nt = list(nuevos), list(nuevos.values())
+                    chunks = chunks_por_largo(nt, self.chunk_size)
+                    te = time.perf_counter()
+                    partes = pool.map(_encode_chunk, [[nt[i] for i in c] for c in chunks])
+                    vecs = np.empty((len(nt), partes[0].shape[1]), dtype=np.float32)
+                    for ids, v in zip(chunks, partes):
+                        vecs[ids] = v
+                    t_encode += time.perf_counter() - te
+                    self.store.add(nk, vecs)
+                    codificados += len(nt)
+
+                self._escribir_part(f"part-{self._fid(frag.path)}-{idx:05d}.parquet", batch, keys)
+                filas += batch.num_rows
+                lotes += 1
+                estado["lotes"] = idx + 1
+                estado["filas"] += batch.num_rows
+                self._guardar_progreso()
+                if log_every and lotes % log_every == 0:
+                    dt = time.perf_counter() - t0
+                    print(f"Lote {lotes}: {filas} filas ({filas / dt:.1f}/s), "
+                          f"{codificados} codificados ({codificados / max(t_encode, 1e-9):.1f} textos/s)")
+            estado["completo"] = True
+            self._guardar_progreso()
+
+        dt = time.perf_counter() - t0
+        stats = {"filas": filas, "codificados": codificados, "segundos": round(dt, 2),
+                 "filas_s": round(filas / dt, 1) if dt else 0.0,
+                 "textos_s": round(codificados / t_encode, 1) if t_encode else 0.0}
+        print(f"[OK] {filas} filas en {dt:.1f}s ({stats['filas_s']}/s); "
+              f"{codificados} textos codificados a {stats['textos_s']} textos/s")
+        return stats
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Embeddings del corpus en streaming con un pool de procesos.")
+    ap.add_argument("--input", default="../1-Scraping/dataset_consolidado/df.parquet",
+                    help="Parquet o directorio de Parquets")
+    ap.add_argument("--out", default="news_embeddings", help="Directorio de salida (parts)")
+    ap.add_argument("--cache", default="emb_cache", help="Root del EmbeddingStore")
+    ap.add_argument("--model", default=MODEL_NAME)
+    ap.add_argument("--backend", choices=BACKENDS, default="fp32",
+                    help="Inferencia en CPU: fp32, int8 (cuantización dinámica) u ONNX")
+    ap.add_argument("--columnas", nargs="+", default=["titulo", "contenido"],
+                    help="Columnas de texto a concatenar")
+    ap.add_argument("--max-chars", type=int, default=2000,
+                    help="Recorte de cada texto (el modelo trunca a 128 tokens; 0 = sin recorte)")
+    ap.add_argument("--batch-rows", type=int, default=4096, help="Filas por lote leído / part escrito")
+    ap.add_argument("--chunk-size", type=int, default=256, help="Textos por tarea enviada a un worker")
+    ap.add_argument("--batch-size", type=int, default=64, help="batch_size de model.encode")
+    ap.add_argument("--threads", type=int, default=1, help="Threads de torch por worker")
+    ap.add_argument("--workers", type=int, default=None, help="Procesos (default: cores / threads)")
+    ap.add_argument("--no-normalize", action="store_true")
+    ap.add_argument("--log-every", type=int, default=10)
+    args = ap.parse_args()
+
+    normalize = not args.no_normalize
+    workers = args.workers or max(1, (os.cpu_count() or 1) // args.threads)
+    store = EmbeddingStore(args.cache, cache_name(args.model, args.backend), normalize=normalize)
+    job = EmbedJob(args.input, args.out, store, args.columnas, batch_rows=args.batch_rows,
+                   chunk_size=args.chunk_size, max_chars=args.max_chars)
+    print(f"[INFO] {workers} workers x {args.threads} threads, cache con {len(store)} vectores")
+    initargs = (args.model, args.backend, args.threads, args.batch_size, normalize)
+    with mp.get_context("spawn").Pool(workers, initializer=_init_worker, initargs=initargs) as pool:
+        job.run(pool, log_every=args.log_every)
+
+
+if __name__ == "__main__":
+    main()
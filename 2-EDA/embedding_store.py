@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache de embeddings por (modelo, hash del contenido) con almacenamiento float32 contiguo.
+
+- Cada texto se identifica por el hash de su contenido (blake2b-128 del texto normalizado),
+  así una nota repetida o re-scrapeada no se vuelve a codificar.
+- `encode()` solo codifica los textos que no están en el cache y devuelve la matriz
+  completa alineada con la entrada.
+- Los vectores se guardan en shards `.npy` float32 (uno por llamada con textos nuevos) con
+  su índice de claves al lado (`keys-NNNNN.npy`). Se leen con memmap (sin copiar ni parsear).
+- `compact()` une los shards en un único `vectors.npy` contiguo: `matrix()` devuelve un
+  memmap de todo el cache (1M x 384 float32 = 1.5 GB, abierto en milisegundos).
+
+Estructura:
+  <root>/<modelo>/meta.json
+  <root>/<modelo>/vectors-00000.npy  keys-00000.npy  ...
+
+Uso:
+  from embedding_store import EmbeddingStore
+  store = EmbeddingStore("emb_cache", MODEL_NAME)
+  embeddings = store.encode(texts, model, batch_size=64)      # solo codifica lo nuevo
+
+  python embedding_store.py info     --root emb_cache
+  python embedding_store.py compact  --root emb_cache --model sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+
+# blake2b de 16 bytes como bytes crudos: "S16" recortaría los NUL finales (~1 de cada 256 hashes)
+KEY_DTYPE = np.dtype(("V", 16))
+
+
+def content_hash(text: Optional[str]) -> bytes:
+    """Hash del contenido normalizado (NFKC + espacios colapsados)."""
+    t = unicodedata.normalize("NFKC", text or "")
+    t = re.sub(r"\s+", " ", t).strip()
+    return hashlib.blake2b(t.encode("utf-8"), digest_size=16).digest()
+
+
+def model_slug(model_name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "__", model_name)
+
+
+class EmbeddingStore:
+    """Cache persistente de embeddings de un modelo."""
+
+    def __init__(self, root, model_name: str, normalize: bool = True):
+        self.model_name = model_name
+        self.normalize = normalize
+        self.dir = Path(root) / model_slug(model_name)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.meta = self._load_meta()
+        self._index: Optional[Dict[bytes, Tuple[int, int]]] = None
+        self._shards: Dict[int, np.ndarray] = {}
+
+    # --- metadatos / shards ---
+    def _load_meta(self) -> dict:
+        path = self.dir / "meta.json"
+        if path.exists():
+            with open(path, encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("normalize") != self.normalize:
+                raise ValueError(f"{self.dir} se creó con normalize={meta.get('normalize')}")
+            return meta
+        return {"model": self.model_name, "normalize": self.normalize, "dim": None, "shards": []}
+
+    def _save_meta(self) -> None:
+        tmp = self.dir / "meta.json.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, indent=1)
+        os.replace(tmp, self.dir / "meta.json")
+
+    def _keys(self, sid: int) -> np.ndarray:
+        # `view`: los shards viejos se guardaron como "S16"; los 16 bytes en disco están completos
+        return np.load(self.dir / f"keys-{sid:05d}.npy").view(KEY_DTYPE)
+
+    def _shard(self, sid: int) -> np.ndarray:
+        if sid not in self._shards:
+            self._shards[sid] = np.load(self.dir / f"vectors-{sid:05d}.npy", mmap_mode="r")
+        return self._shards[sid]
+
+    @property
+    def index(self) -> Dict[bytes, Tuple[int, int]]:
+        """hash -> (shard, fila). Se arma leyendo solo los archivos de claves."""
+        if self._index is None:
+            self._index = {}
+            for sid in self.meta["shards"]:
+                self._index.update((k, (sid, i)) for i, k in enumerate(self._keys(sid).tolist()))
+        return self._index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def has(self, key: bytes) -> bool:
+        return key in self.index
+
+    __contains__ = has
+
+    @property
+    def dim(self) -> Optional[int]:
+        return self.meta["dim"]
+
+    # --- escritura ---
+    def add(self, keys: List[bytes], vectors: np.ndarray) -> None:
+        """Agrega vectores nuevos como un shard (atómico: vectores y claves antes que el meta)."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if len(keys) != len(vectors):
+            raise ValueError("keys y vectors tienen distinto largo")
+        if not len(keys):
+            return
+        if self.meta["dim"] is None:
+            self.meta["dim"] = int(vectors.shape[1])
+        elif vectors.shape[1] != self.meta["dim"]:
+            raise ValueError(f"dim {vectors.shape[1]} != {self.meta['dim']} del cache")
+
+        sid = max(self.meta["shards"], default=-1) + 1
+        for name, arr in ((f"vectors-{sid:05d}.npy", vectors),
+                          (f"keys-{sid:05d}.npy", np.array(keys, dtype=KEY_DTYPE))):
+            tmp = self.dir / f".{name}.tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, arr)
+            os.replace(tmp, self.dir / name)
+        self.meta["shards"].append(sid)
+        self._save_meta()
+        if self._index is not None:
+            self._index.update((k, (sid, i)) for i, k in enumerate(keys))
+
+    # --- lectura ---
+    def get(self, keys: Iterable[bytes]) -> Tuple[np.ndarray, np.ndarray]:
+        """(matriz float32 alineada con `keys`, máscara de encontrados). Faltantes quedan en 0."""
+        keys = list(keys)
+        out = np.zeros((len(keys), self.dim or 0), dtype=np.float32)
+        found = np.zeros(len(keys), dtype=bool)
+        por_shard: Dict[int, Tuple[List[int], List[int]]] = {}
+        for i, k in enumerate(keys):
+            loc = self.index.get(k)
+            if loc is not None:
+                dst, src = por_shard.setdefault(loc[0], ([], []))
+                dst.append(i)
+                src.append(loc[1])
+        for sid, (dst, src) in por_shard.items():
+            out[dst] = self._shard(sid)[src]  # gather vectorizado por shard
+            found[dst] = True
+        return out, found
+
+    def encode(self, texts: List[str], model, batch_size: int = 64, show_progress_bar: bool = False) -> np.ndarray:
+        """Embeddings de `texts` (en orden), codificando solo los que no están en el cache.
+
+        `model` es cualquier objeto con `encode(list[str], ...)` (p.ej. SentenceTransformer).
+        """
+        keys = [content_hash(t) for t in texts]
+        nuevos: Dict[bytes, str] = {}
+        for k, t in zip(keys, texts):
+            if k not in self.index and k not in nuevos:
+                nuevos[k] = t or ""
+        if nuevos:
+            vecs = model.encode(list(nuevos.values()), batch_size=batch_size, convert_to_numpy=True,
+                                normalize_embeddings=self.normalize, show_progress_bar=show_progress_bar)
+            self.add(list(nuevos), vecs)
+        out, _ = self.get(keys)
+        return out
+
+    def matrix(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(claves, vectores) de todo el cache. Con un solo shard (tras `compact()`) es un memmap."""
+        sids = self.meta["shards"]
+        if not sids:
+            return np.empty(0, dtype=KEY_DTYPE), np.empty((0, self.dim or 0), dtype=np.float32)
+        keys = np.concatenate([self._keys(s) for s in sids])
+        if len(sids) == 1:
+            return keys, self._shard(sids[0])
+        return keys, np.concatenate([self._shard(s) for s in sids])
+
+    # --- mantenimiento ---
+    def compact(self) -> int:
+        """Une todos los shards en uno solo (escritura en streaming vía memmap). Devuelve filas."""
+        sids = list(self.meta["shards"])
+        if len(sids) < 2:
+            return len(self)
+        n = sum(self._shard(s).shape[0] for s in sids)
+        sid = max(sids) + 1
+        tmp_v = self.dir / f".vectors-{sid:05d}.npy.tmp"
+        out = np.lib.format.open_memmap(tmp_v, mode="w+", dtype=np.float32, shape=(n, self.dim))
+        keys, i = [], 0
+        for s in sids:
+            v = self._shard(s)
+            out[i:i + len(v)] = v
+            i += len(v)
+            keys.append(self._keys(s))
+        out.flush()
+        del out
+        os.replace(tmp_v, self.dir / f"vectors-{sid:05d}.npy")
+        np.save(self.dir / f"keys-{sid:05d}.npy", np.concatenate(keys))
+
+        self.meta["shards"] = [sid]
+        self._save_meta()
+        self._shards.clear()
+        self._index = None
+        for s in sids:
+            (self.dir / f"vectors-{s:05d}.npy").unlink(missing_ok=True)
+            (self.dir / f"keys-{s:05d}.npy").unlink(missing_ok=True)
+        return n
+
+
+# --- columnas Arrow de tamaño fijo (para Parquet) ---
+def to_fixed_size_list(vectors: np.ndarray) -> pa.FixedSizeListArray:
+    """Matriz float32 (n, d) -> columna Arrow `fixed_size_list<float32>[d]` sin copiar."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    return pa.FixedSizeListArray.from_arrays(pa.array(vectors.reshape(-1)), vectors.shape[1])
+
+
+def from_fixed_size_list(col) -> np.ndarray:
+    """Columna `fixed_size_list<float32>` (Array o ChunkedArray) -> matriz (n, d)."""
+    if isinstance(col, pa.ChunkedArray):
+        col = col.combine_chunks()
+    d = col.type.list_size
+    return col.flatten().to_numpy(zero_copy_only=False).reshape(-1, d)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Mantenimiento del cache de embeddings.")
+    ap.add_argument("comando", choices=["info", "compact"])
+    ap.add_argument("--root", default="emb_cache")
+    ap.add_argument("--model", help="Modelo (default: todos los del root)")
+    args = ap.parse_args()
+
+    if args.model:
+        dirs = [Path(args.root) / model_slug(args.model)]
+    else:
+        dirs = sorted(p.parent for p in Path(args.root).glob("*/meta.json"))
+    for d in dirs:
+        with open(d / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        store = EmbeddingStore(args.root, meta["model"], normalize=meta["normalize"])
+        if args.comando == "compact":
+            store.compact()
+        mb = sum(p.stat().st_size for p in d.glob("*.npy")) / 1e6
+        print(f"{meta['model']}: {len(store)} vectores, dim={store.dim}, "
+              f"{len(store.meta['shards'])} shards, {mb:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Feature store diario para el forecasting (EMAE, inflación): una tabla por (fecha_dia, diario, seccion).
+
+Junta tres fuentes; cada una guarda sumas y conteos por hoja con `agregados.AgregadosEmbeddings`
+(las notas ya sumadas se reconocen por URL), así cada corrida solo lee y suma lo nuevo. Una nota
+que llega tarde para un día ya cargado se suma a ese día: upsert por clave, sin recalcular nada.
+- conteos: notas por hoja del dataset consolidado (`1-Scraping/dataset_consolidado/df.parquet`);
+- embeddings: promedio por hoja (el mismo estado que mantiene `agregados.py`; `--emb` lo actualiza);
+- NewFeatures: promedio de los puntajes (`optimismos__*`, `mercado__*`, calidad, confianza) y
+  proporción de notas con cada flag `tematicas__*`, de la salida de `5-LLMs/openai/extraccion.py`
+  (o el CSV aplanado de prompt-eng). Los nulos no cuentan: cada columna lleva su propio conteo.
+  La hoja de cada nota sale del dataset consolidado (join por `url`), no de lo que devolvió el LLM.
+
+`construir()` arma la grilla densa grupos x días calendario (días sin notas: `notas` 0 y promedios
+NaN) y calcula con sumas acumuladas, vectorizado sobre toda la historia:
+- `<f>__lag{k}`: valor del día t-k;
+- `<f>__media{w}d`: promedio de los últimos w días (t inclusive) ponderado por notas;
+- `notas__lag{k}`, `notas__media{w}d` (notas por día) y `emb__sim_prev` (coseno con el día anterior).
+Se escribe como Arrow IPC sin comprimir: `leer()` la abre con memory map (zero-copy, milisegundos)
+y `matriz()` devuelve el bloque float32 listo para entrenar.
+
+Estructura:
+  <root>/conteos/  <root>/llm/ (+ columnas.json)  <root>/features.arrow
+  embeddings: --emb-root (default agregados_emb, compartido con agregados.py)
+
+Uso:
+  python feature_store.py --notas ../1-Scraping/dataset_consolidado/df.parquet \\
+    --llm ../5-LLMs/openai/df_features.parquet --emb news_embeddings
+  python feature_store.py --por fecha_dia diario --lags 1 7 28 --ventanas 7 30
+
+  from feature_store import leer, matriz
+  tabla = leer("feature_store/features.arrow")
+  X, columnas = matriz(tabla)
+"""
+
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from agregados import HOJA, AgregadosEmbeddings, actualizar, group_sums, normalizar
+from embedding_store import from_fixed_size_list, to_fixed_size_list
+
+PREFIJOS_LLM = ("optimismos__", "mercado__", "tematicas__")
+EXTRA_LLM = ("calidad_fuente__calidad_fuente_score", "confianza")
+META = ["url", "fecha", "diario", "seccion"]
+
+
+def _formato(path) -> str:
+    return "csv" if str(path).lower().endswith(".csv") else "parquet"
+
+
+def columnas_llm(schema: pa.Schema) -> List[str]:
+    """Columnas de `NewFeatures` que se promedian: puntajes numéricos y flags booleanos."""
+    return [f.name for f in schema
+            if (f.name.startswith(PREFIJOS_LLM) or f.name in EXTRA_LLM)
+            and (pa.types.is_floating(f.type) or pa.types.is_integer(f.type) or pa.types.is_boolean(f.type))]
+
+
+def _denso(grupos: pd.DataFrame, valores: np.ndarray, g: np.ndarray, dia0: pd.Timestamp, n_g: int, n_d: int,
+           relleno: float = 0.0) -> np.ndarray:
+    """(n_g, n_d, k) con las filas de `valores` en (grupo, día); el resto queda en `relleno`."""
+    t = (grupos["fecha_dia"] - dia0).dt.days.to_numpy()
+    out = np.full((n_g, n_d, valores.shape[1]), relleno, dtype=valores.dtype)
+    out[g, t] = valores
+    return out
+
+
+def _ventana(A: np.ndarray, w: int) -> np.ndarray:
+    """Suma de los últimos `w` días (t inclusive) sobre el eje 1, con sumas acumuladas."""
+    C = np.concatenate([np.zeros_like(A[:, :1]), A.cumsum(axis=1)], axis=1)
+    lo = np.maximum(np.arange(1, A.shape[1] + 1) - w, 0)
+    return C[:, 1:] - C[:, lo]
+
+
+def _lag(A: np.ndarray, k: int) -> np.ndarray:
+    out = np.full_like(A, np.nan)
+    out[:, k:] = A[:, :-k]
+    return out
+
+
+class FeatureStore:
+    """Estado incremental de las tres fuentes + construcción de la tabla de features."""
+
+    def __init__(self, root, emb_root="agregados_emb"):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.conteos = AgregadosEmbeddings(self.root / "conteos")
+        self.llm = AgregadosEmbeddings(self.root / "llm")
+        self.emb = AgregadosEmbeddings(emb_root)
+        path = self.root / "llm" / "columnas.json"
+        self.cols_llm: List[str] = json.loads(path.read_text(encoding="utf-8")) if path.exists() else []
+
+    # --- actualización ---
+    def actualizar_notas(self, path, batch_rows: int = 65_536) -> int:
+        """Cuenta las notas nuevas del dataset consolidado (solo lee las columnas de la clave)."""
+        dataset = ds.dataset(path, format=_formato(path))
+        nuevas = 0
+        for batch in dataset.to_batches(columns=META, batch_size=batch_rows):
+            meta = batch.to_pandas()
+            nuevas += self.conteos.update(meta, np.ones((len(meta), 1)))
+        return nuevas
+
+    def actualizar_llm(self, path, notas, batch_rows: int = 65_536) -> int:
+        """Suma los puntajes de las notas nuevas: columnas [valores (nulos -> 0), indicadores de no-nulo].
+
+        fecha/diario/seccion salen del dataset consolidado `notas` por `url` (los campos que devuelve
+        el LLM pueden venir vacíos o escritos distinto y caerían en otras hojas que los conteos).
+        Las notas que todavía no están en `notas` se saltean: se suman en una corrida posterior.
+        """
+        dataset = ds.dataset(path, format=_formato(path))
+        if not self.cols_llm:
+            self.cols_llm = columnas_llm(dataset.schema)
+            (self.root / "llm" / "columnas.json").write_text(json.dumps(self.cols_llm, indent=1), encoding="utf-8")
+        presentes = [c for c in self.cols_llm if c in dataset.schema.names]
+        urls = dataset.to_table(columns=["url"]).column("url").unique().drop_null()
+        claves = (ds.dataset(notas, format=_formato(notas))
+                  .to_table(columns=META, filter=ds.field("url").isin(urls)).to_pandas()
+                  .drop_duplicates("url").set_index("url"))
+        nuevas = sin_nota = 0
+        for batch in dataset.to_batches(columns=["url"] + presentes, batch_size=batch_rows):
+            df = batch.to_pandas()
+            hay = df["url"].isin(claves.index).to_numpy()
+            sin_nota += int((~hay).sum())
+            df = df[hay]
+            meta = claves.loc[df["url"]].reset_index()
+            V = df.reindex(columns=self.cols_llm).apply(pd.to_numeric, errors="coerce").to_numpy(np.float64)
+            ok = ~np.isnan(V)
+            nuevas += self.llm.update(meta[META], np.hstack([np.where(ok, V, 0.0), ok]))
+        if sin_nota:
+            print(f"[WARN] {sin_nota} filas de {path} sin nota en {notas} (por url): quedan para otra corrida")
+        return nuevas
+
+    def actualizar_embeddings(self, path, batch_rows: int = 65_536) -> int:
+        return actualizar(self.emb, path, batch_rows)
+
+    def save(self) -> None:
+        self.conteos.save()
+        self.llm.save()
+        if len(self.emb.hojas):
+            self.emb.save()
+
+    # --- tabla ---
+    def construir(self, por: Sequence[str] = HOJA, lags: Sequence[int] = (1, 7),
+                  ventanas: Sequence[int] = (7, 30)) -> pa.Table:
+        """Tabla densa (grupo x día) con conteos, promedios, lags, ventanas móviles y embedding medio."""
+        por = ["fecha_dia"] + [c for c in por if c != "fecha_dia"]
+        fuentes = {n: a.agregar(por) for n, a in
+                   (("conteos", self.conteos), ("llm", self.llm), ("emb", self.emb)) if len(a.hojas)}
+        if not fuentes:
+            raise ValueError("El feature store está vacío: correr primero con --notas / --llm / --emb")
+
+        # grupos y días: la unión de las tres fuentes
+        todos = pd.concat([grupos[por] for grupos, _ in fuentes.values()], ignore_index=True)
+        dias = pd.date_range(todos["fecha_dia"].min(), todos["fecha_dia"].max(), freq="D")
+        n_d = len(dias)
+        claves = por[1:]
+        if claves:
+            gidx = pd.MultiIndex.from_frame(todos[claves].drop_duplicates().sort_values(claves))
+            idx = {n: gidx.get_indexer(pd.MultiIndex.from_frame(grupos[claves])) for n, (grupos, _) in fuentes.items()}
+        else:
+            gidx = None
+            idx = {n: np.zeros(len(grupos), dtype=np.int64) for n, (grupos, _) in fuentes.items()}
+        n_g = len(gidx) if claves else 1
+
+        def densa(nombre, valores, relleno=0.0):
+            grupos, _ = fuentes[nombre]
+            return _denso(grupos, valores, idx[nombre], dias[0], n_g, n_d, relleno)
+
+        cols = {"fecha_dia": np.tile(dias.to_numpy(), n_g)}
+        if claves:
+            rep = gidx.to_frame(index=False).loc[np.repeat(np.arange(n_g), n_d)].reset_index(drop=True)
+            cols.update({c: rep[c].to_numpy() for c in claves})
+        plano = lambda A: A.reshape(n_g * n_d, -1)  # noqa: E731  (grupo mayor, día menor)
+        num = {}
+
+        for nombre, col in (("conteos", "notas"), ("llm", "notas_llm"), ("emb", "notas_emb")):
+            if nombre in fuentes:
+                N = densa(nombre, fuentes[nombre][0][["count"]].to_numpy(np.float64))
+                cols[col] = plano(N)[:, 0].astype(np.int64)
+                if nombre == "conteos":
+                    for k in lags:
+                        num[f"notas__lag{k}"] = _lag(N, k)
+                    for w in ventanas:
+                        num[f"notas__media{w}d"] = _ventana(N, w) / w
+
+        if "llm" in fuentes:
+            F = len(self.cols_llm)
+            # sumas float64 directo de las hojas (mismos grupos y orden que agregar()): los promedios
+            # float32 de `fuentes` multiplicados por el conteo arrastran error de redondeo
+            _, sums, _ = group_sums(self.llm.sums, self.llm.hojas[por], pesos=self.llm.hojas["count"].to_numpy())
+            S, C = densa("llm", sums[:, :F]), densa("llm", sums[:, F:])
+            with np.errstate(invalid="ignore", divide="ignore"):
+                M = S / C
+                Mw = {w: _ventana(S, w) / _ventana(C, w) for w in ventanas}
+            for j, c in enumerate(self.cols_llm):
+                num[c] = M[:, :, j:j + 1]
+                for k in lags:
+                    num[f"{c}__lag{k}"] = _lag(M[:, :, j:j + 1], k)
+                for w in ventanas:
+                    num[f"{c}__media{w}d"] = Mw[w][:, :, j:j + 1]
+
+        if "emb" in fuentes:
+            E = densa("emb", fuentes["emb"][1], relleno=np.nan)
+            U = normalizar(E.reshape(-1, E.shape[2])).reshape(E.shape)
+            sim = np.full((n_g, n_d, 1), np.nan)
+            sim[:, 1:, 0] = np.einsum("gtd,gtd->gt", U[:, 1:], U[:, :-1])
+            num["emb__sim_prev"] = sim
+
+        t = pa.table({**cols, **{c: plano(A)[:, 0].astype(np.float32) for c, A in num.items()}})
+        if "emb" in fuentes:
+            t = t.append_column("embedding", to_fixed_size_list(plano(E).astype(np.float32)))
+        return t
+
+    def escribir(self, tabla: pa.Table, path: Optional[Path] = None) -> Path:
+        """Arrow IPC sin comprimir (memory-mappable), escritura atómica."""
+        path = Path(path) if path else self.root / "features.arrow"
+        tmp = path.with_name(path.name + ".tmp")
+        with pa.OSFile(str(tmp), "wb") as sink, pa.ipc.new_file(sink, tabla.schema) as w:
+            w.write_table(tabla, max_chunksize=1 << 20)
+        os.replace(tmp, path)
+        return path
+
+
+def leer(path) -> pa.Table:
+    """Abre la tabla con memory map: no copia ni parsea nada (las columnas apuntan al archivo)."""
+    return pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+
+
+def matriz(tabla: pa.Table, columnas: Optional[List[str]] = None, embedding: bool = False
+           ) -> Tuple[np.ndarray, List[str]]:
+    """(X float32 filas x features, nombres): por defecto todas las columnas numéricas (sin las claves)."""
+    if columnas is None:
+        columnas = [f.name for f in tabla.schema
+                    if (pa.types.is_floating(f.type) or pa.types.is_integer(f.type)) and f.name not in HOJA]
+    X = np.column_stack([tabla.column(c).to_numpy() for c in columnas]).astype(np.float32, copy=False)
+    if embedding and "embedding" in tabla.column_names:
+        E = from_fixed_size_list(tabla.column("embedding"))
+        X = np.hstack([X, E])
+        columnas = columnas + [f"emb_{i}" for i in range(E.shape[1])]
+    return X, columnas
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Feature store diario (conteos + embeddings + NewFeatures).")
+    ap.add_argument("--root", default="feature_store", help="Estado incremental y tabla de salida")
+    ap.add_argument("--notas", default="../1-Scraping/dataset_consolidado/df.parquet",
+                    help="Dataset consolidado (conteos de notas y claves de las filas de --llm)")
+    ap.add_argument("--llm", default=None, help="Salida de extraccion.py (Parquet) o CSV aplanado de NewFeatures")
+    ap.add_argument("--emb", default=None, help="Salida de embed_corpus.py (actualiza --emb-root)")
+    ap.add_argument("--emb-root", default="agregados_emb", help="Estado de agregados.py (sumas por hoja)")
+    ap.add_argument("--por", nargs="+", default=HOJA, choices=HOJA, help="Claves de la tabla (siempre fecha_dia)")
+    ap.add_argument("--lags", nargs="*", type=int, default=[1, 7], help="Lags en días")
+    ap.add_argument("--ventanas", nargs="*", type=int, default=[7, 30], help="Ventanas móviles en días")
+    ap.add_argument("--out", default=None, help="Tabla Arrow IPC (default <root>/features.arrow)")
+    ap.add_argument("--batch-rows", type=int, default=65_536)
+    args = ap.parse_args()
+
+    fs = FeatureStore(args.root, args.emb_root)
+    actualizar_llm = lambda path, batch_rows: fs.actualizar_llm(path, args.notas, batch_rows)  # noqa: E731
+    for nombre, path, fn in (("notas", args.notas, fs.actualizar_notas), ("llm", args.llm, actualizar_llm),
+                             ("embeddings", args.emb, fs.actualizar_embeddings)):
+        if path is None:
+            continue
+        if not Path(path).exists() or (nombre == "llm" and not Path(args.notas).exists()):
+            print(f"[WARN] No existe {path if Path(path).exists() else args.notas}: se usa el estado guardado de {nombre}")
+            continue
+        print(f"[INFO] {nombre}: {fn(path, args.batch_rows)} notas nuevas ({path})")
+    fs.save()
+
+    t0 = time.perf_counter()
+    tabla = fs.construir(args.por, args.lags, args.ventanas)
+    t_construir = time.perf_counter() - t0
+    out = fs.escribir(tabla, args.out)
+    t0 = time.perf_counter()
+    X, cols = matriz(leer(out))
+    t_leer = time.perf_counter() - t0
+    print(f"[OK] {out}: {tabla.num_rows} filas x {len(tabla.column_names)} columnas "
+          f"({out.stat().st_size / 1e6:.1f} MB) | construir {t_construir * 1000:.0f} ms | "
+          f"leer + matriz {X.shape} {t_leer * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""Tests de `embedding_store.py` (pytest, desde 2-EDA/: `python -m pytest -q`)."""
+
+import numpy as np
+
+from embedding_store import EmbeddingStore, content_hash
+
+
+class ModeloFalso:
+    """Encoder determinístico: cuenta cuántos textos codificó."""
+
+    def __init__(self, dim=4):
+        self.dim = dim
+        self.codificados = 0
+
+    def encode(self, textos, **kwargs):
+        self.codificados += len(textos)
+        return np.array([[len(t) + i for i in range(self.dim)] for t in textos], dtype=np.float32)
+
+
+def _texto_con_nul_final():
+    """Un texto cuyo hash termina en \\x00 (~1 de cada 256)."""
+    for i in range(100_000):
+        t = f"nota {i}"
+        if content_hash(t).endswith(b"\x00"):
+            return t
+    raise AssertionError("no se encontró un hash terminado en NUL")
+
+
+def test_clave_con_nul_final_sobrevive_reabrir(tmp_path):
+    t = _texto_con_nul_final()
+    k = content_hash(t)
+    store = EmbeddingStore(tmp_path, "modelo", normalize=False)
+    store.add([k], np.ones((1, 4), dtype=np.float32))
+
+    reabierto = EmbeddingStore(tmp_path, "modelo", normalize=False)
+    assert reabierto.has(k)
+    vecs, found = reabierto.get([k])
+    assert found.all() and np.array_equal(vecs, np.ones((1, 4), dtype=np.float32))
+
+
+def test_reabrir_no_recodifica(tmp_path):
+    textos = [f"nota {i}" for i in range(2_000)]
+    assert any(content_hash(t).endswith(b"\x00") for t in textos)
+    modelo = ModeloFalso()
+    EmbeddingStore(tmp_path, "modelo").encode(textos, modelo)
+    assert modelo.codificados == len(textos)
+
+    store = EmbeddingStore(tmp_path, "modelo")
+    store.encode(textos, modelo)
+    assert modelo.codificados == len(textos)
+    assert len(store.meta["shards"]) == 1
+
+
+def test_compact_conserva_claves(tmp_path):
+    modelo = ModeloFalso()
+    store = EmbeddingStore(tmp_path, "modelo")
+    a = store.encode([f"a {i}" for i in range(600)], modelo)
+    b = store.encode([f"b {i}" for i in range(600)], modelo)
+    store.compact()
+
+    reabierto = EmbeddingStore(tmp_path, "modelo")
+    keys, _ = reabierto.matrix()
+    assert all(len(k) == 16 for k in keys.tolist())
+    assert np.array_equal(reabierto.encode([f"a {i}" for i in range(600)], modelo), a)
+    assert np.array_equal(reabierto.encode([f"b {i}" for i in range(600)], modelo), b)
+    assert modelo.codificados == 1_200
+
+
+def test_shard_viejo_s16_se_lee_completo(tmp_path):
+    """Shards guardados con el dtype anterior ("S16") siguen encontrando sus claves."""
+    t = _texto_con_nul_final()
+    k = content_hash(t)
+    store = EmbeddingStore(tmp_path, "modelo", normalize=False)
+    store.add([k], np.ones((1, 4), dtype=np.float32))
+    np.save(store.dir / "keys-00000.npy", np.array([k], dtype="S16"))
+    assert EmbeddingStore(tmp_path, "modelo", normalize=False).has(k)
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Backend local de extracción: un modelo instruct chico (~0.5–3B) con `transformers` en CPU.
+
+- Generación por lotes: las requests concurrentes del runner se juntan en lotes de hasta
+  `batch_size` prompts (o lo que haya llegado en `max_espera` s) y se generan juntas
+  (padding a izquierda, greedy) en un thread aparte, sin bloquear el event loop.
+- Decodificación restringida al esquema: `Esqueleto` arma, a partir de `NewFeatures`, el JSON
+  con las claves fijas y "huecos" tipados (valores de un Literal, bool, número de [0..1] o
+  [-1..1] con hasta 2 decimales, entero o null, string sin escapes, lista de strings). En cada
+  paso `RestriccionEsquema` deja pasar solo el token más probable que mantiene el texto como
+  prefijo válido del esqueleto; las claves y la puntuación se fuerzan sin mirar el modelo. La
+  salida siempre parsea y valida contra `NewFeatures`.
+- Los metadatos (diario/fecha/seccion/url) se emiten como null: los completa
+  `completar_metadatos` desde la fila, igual que en la nube.
+
+Requiere `torch` y `transformers` (se importan recién al crear el backend).
+
+Uso (desde el runner):
+  python extraccion.py --backend local --local-model Qwen/Qwen2.5-3B-Instruct --local-batch 8
+"""
+
+import asyncio
+import json
+import typing
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Literal, Optional, Sequence, Set, Tuple, Union
+
+from pydantic import BaseModel
+
+from backends import Backend, BackendError
+from features import NewFeatures, mensajes
+
+LOCAL_MODEL = "Qwen/Qwen2.5-3B-Instruct"
+METADATOS = ("diario", "fecha", "seccion", "url")
+MAX_CHARS_STR = 80
+MAX_CHARS = {"citas_evidencia": 200, "notas": 400}  # largo máximo por campo (el resto: MAX_CHARS_STR)
+MAX_ITEMS = {"citas_evidencia": 3}
+MAX_ITEMS_LISTA = 6
+MAX_HORIZONTE = 3650
+INSTRUCCION = "\n\nResponde solo con el objeto JSON del esquema."
+
+PARCIAL = -1  # el texto termina dentro del hueco (todavía puede completarse)
+INVALIDO = -2
+
+
+class Opciones:
+    """Hueco con un conjunto finito de valores (Literal, bool, números discretos)."""
+
+    def __init__(self, valores: Sequence[str]):
+        self.valores: Set[str] = set(valores)
+        self.prefijos: Set[str] = {v[:i] for v in self.valores for i in range(len(v))}
+        self.max_chars = max(map(len, self.valores))
+
+    def consumir(self, texto: str, pos: int) -> int:
+        """Posición donde termina el valor, `PARCIAL` o `INVALIDO`."""
+        if len(texto) - pos < self.max_chars and texto[pos:] in self.prefijos:
+            return PARCIAL  # incluye "0.3" al final del texto: todavía puede ser "0.35"
+        for n in range(min(self.max_chars, len(texto) - pos), 0, -1):
+            if texto[pos:pos + n] in self.valores:
+                return pos + n
+        return INVALIDO
+
+
+def numeros(lo: int, hi: int) -> Opciones:
+    """Números de [lo..hi] con hasta 2 decimales ("1", "0.5", "0.55", "-0.30", ...)."""
+    valores = set()
+    for k in range(lo * 100, hi * 100 + 1):
+        s = f"{k / 100:.2f}"
+        valores.add(s)
+        if s.endswith("0"):
+            valores.add(s[:-1])
+        if k % 100 == 0:
+            valores.add(str(k // 100))
+    return Opciones(sorted(valores))
+
+
+class Cadena:
+    """Hueco string JSON sin escapes ni caracteres de control, de hasta `max_chars` caracteres."""
+
+    def __init__(self, max_chars: int):
+        self.largo = max_chars
+        self.max_chars = max_chars + 2
+
+    def consumir(self, texto: str, pos: int) -> int:
+        if pos >= len(texto):
+            return PARCIAL
+        if texto[pos] != '"':
+            return INVALIDO
+        fin = texto.find('"', pos + 1)
+        contenido = texto[pos + 1:fin if fin >= 0 else len(texto)]
+        if len(contenido) > self.largo or "\\" in contenido or any(ord(c) < 32 for c in contenido):
+            return INVALIDO
+        return PARCIAL if fin < 0 else fin + 1
+
+
+class Lista:
+    """Hueco lista JSON de hasta `max_items` strings (`[]`, `["a", "b"]`)."""
+
+    def __init__(self, max_items: int, max_chars: int):
+        self.max_items = max_items
+        self.item = Cadena(max_chars)
+        self.max_chars = 2 + max_items * (self.item.max_chars + 2)
+
+    def consumir(self, texto: str, pos: int) -> int:
+        n = len(texto)
+        if pos >= n:
+            return PARCIAL
+        if texto[pos] != "[":
+            return INVALIDO
+        pos += 1
+        items = 0
+        while True:
+            if pos >= n:
+                return PARCIAL
+            if texto[pos] == "]":
+                return pos + 1
+            if items == self.max_items:
+                return INVALIDO
+            if items:
+                sep = texto[pos:pos + 2]
+                if not ", ".startswith(sep):
+                    return INVALIDO
+                if len(sep) < 2:
+                    return PARCIAL
+                pos += 2
+            r = self.item.consumir(texto, pos)
+            if r < 0:
+                return r
+            pos = r
+            items += 1
+
+
+Hueco = Union[Opciones, Cadena, Lista]
+
+
+class Esqueleto:
+    """JSON de un modelo pydantic como secuencia de literales (str) y huecos tipados."""
+
+    def __init__(self, model: type = NewFeatures):
+        self.segmentos: List[Union[str, Hueco]] = []
+        self._objeto(model)
+        self.max_chars = sum(len(s) if isinstance(s, str) else s.max_chars for s in self.segmentos)
+
+    def _literal(self, s: str) -> None:
+        if self.segmentos and isinstance(self.segmentos[-1], str):
+            self.segmentos[-1] += s
+        else:
+            self.segmentos.append(s)
+
+    def _objeto(self, model: type) -> None:
+        self._literal("{")
+        for i, (name, info) in enumerate(model.model_fields.items()):
+            self._literal((", " if i else "") + json.dumps(name, ensure_ascii=False) + ": ")
+            self._valor(name, info.annotation, info.description or "")
+        self._literal("}")
+
+    def _valor(self, name: str, tp: Any, desc: str) -> None:
+        if name in METADATOS:
+            self._literal("null")
+            return
+        origin = typing.get_origin(tp)
+        args = [a for a in typing.get_args(tp) if a is not type(None)]
+        nullable = origin is Union and len(args) < len(typing.get_args(tp))
+        if origin is Union:
+            tp, origin = args[0], typing.get_origin(args[0])
+        if isinstance(tp, type) and issubclass(tp, BaseModel):
+            self._objeto(tp)
+        elif origin is Literal:
+            self.segmentos.append(Opciones([json.dumps(a, ensure_ascii=False) for a in typing.get_args(tp)]))
+        elif origin in (list, List):
+            self.segmentos.append(Lista(MAX_ITEMS.get(name, MAX_ITEMS_LISTA), MAX_CHARS.get(name, MAX_CHARS_STR)))
+        elif tp is bool:
+            self.segmentos.append(Opciones(["true", "false"]))
+        elif tp is float:
+            self.segmentos.append(numeros(-1 if "-1" in desc else 0, 1))
+        elif tp is int:
+            self.segmentos.append(Opciones(["null"] * nullable + [str(i) for i in range(MAX_HORIZONTE + 1)]))
+        elif tp is str:
+            self.segmentos.append(Cadena(MAX_CHARS.get(name, MAX_CHARS_STR)))
+        else:
+            raise TypeError(f"Tipo no soportado en el esqueleto: {name}: {tp}")
+
+    def avanzar(self, texto: str) -> Tuple[bool, bool, Optional[str]]:
+        """(prefijo válido, completo, resto del literal que sigue) para el texto generado."""
+        pos = 0
+        for seg in self.segmentos:
+            if isinstance(seg, str):
+                resto = texto[pos:pos + len(seg)]
+                if not seg.startswith(resto):
+                    return False, False, None
+                if len(resto) < len(seg):
+                    return True, False, seg[len(resto):]
+                pos += len(seg)
+            else:
+                r = seg.consumir(texto, pos)
+                if r == INVALIDO:
+                    return False, False, None
+                if r == PARCIAL:
+                    return True, False, None
+                pos = r
+        return pos == len(texto), pos == len(texto), None
+
+
+class RestriccionEsquema:
+    """Logits processor: en cada paso deja un único token permitido por fila del lote."""
+
+    def __init__(self, esqueleto: Esqueleto, tokenizer, textos_token: List[str], prohibidos: Set[int],
+                 top_k: int = 32):
+        self.esqueleto = esqueleto
+        self.tokenizer = tokenizer
+        self.textos = textos_token
+        self.prohibidos = prohibidos
+        self.top_k = top_k
+        self.eos = tokenizer.eos_token_id
+        self.forzados: Dict[str, Optional[int]] = {}
+        self.generado: Optional[List[str]] = None
+        self.n_tokens: List[int] = []
+        self.terminado: List[bool] = []
+
+    def _valido(self, texto: str, t: int) -> bool:
+        if t >= len(self.textos) or t in self.prohibidos:
+            return False
+        s = self.textos[t]
+        return bool(s) and "�" not in s and self.esqueleto.avanzar(texto + s)[0]
+
+    def _forzado(self, literal: str) -> Optional[int]:
+        if literal not in self.forzados:
+            ids = self.tokenizer.encode(literal, add_special_tokens=False)
+            ok = ids and ids[0] < len(self.textos) and literal.startswith(self.textos[ids[0]])
+            self.forzados[literal] = ids[0] if ok else None
+        return self.forzados[literal]
+
+    def _elegir(self, i: int, scores) -> int:
+        texto = self.generado[i]
+        _, completo, literal = self.esqueleto.avanzar(texto)
+        if completo:
+            self.terminado[i] = True
+            return self.eos
+        if literal is not None:
+            t = self._forzado(literal)
+            if t is not None:
+                return t
+        candidatos = scores.topk(self.top_k).indices.tolist()
+        for t in candidatos:
+            if self._valido(texto, t):
+                return t
+        vistos = set(candidatos)
+        for t in scores.argsort(descending=True).tolist():
+            if t not in vistos and self._valido(texto, t):
+                return t
+        raise RuntimeError(f"Ningún token continúa el esqueleto después de: {texto[-80:]!r}")
+
+    def __call__(self, input_ids, scores):
+        if self.generado is None:
+            n = input_ids.shape[0]
+            self.generado, self.n_tokens, self.terminado = [""] * n, [0] * n, [False] * n
+        else:
+            for i, t in enumerate(input_ids[:, -1].tolist()):
+                if not self.terminado[i]:
+                    self.generado[i] += self.textos[t]
+                    self.n_tokens[i] += 1
+        out = scores.new_full(scores.shape, float("-inf"))
+        for i in range(scores.shape[0]):
+            out[i, self.eos if self.terminado[i] else self._elegir(i, scores[i])] = 0.0
+        return out
+
+
+@dataclass
+class Uso:
+    input_tokens: int
+    output_tokens: int
+    input_tokens_details: Any = None
+
+
+@dataclass
+class Respuesta:
+    output_parsed: BaseModel
+    usage: Uso
+
+
+class TransformersBackend(Backend):
+    """Modelo causal de Hugging Face en CPU con generación por lotes restringida a `NewFeatures`."""
+
+    empaqueta = False  # el lote de generación ya cumple el papel de juntar notas
+
+    def __init__(self, model_name: str = LOCAL_MODEL, batch_size: int = 8, max_espera: float = 0.05,
+                 threads: Optional[int] = None, dtype: str = "float32"):
+        import torch
+        from transformers import AutoModelForCausalLM, AutoTokenizer, LogitsProcessorList
+
+        if threads:
+            torch.set_num_threads(threads)
+        self.torch = torch
+        self.LogitsProcessorList = LogitsProcessorList
+        self.nombre = f"local:{model_name}"
+        self.batch_size = batch_size
+        self.max_espera = max_espera
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name, padding_side="left")
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.model = AutoModelForCausalLM.from_pretrained(model_name, torch_dtype=getattr(torch, dtype)).eval()
+        self.esqueleto = Esqueleto(NewFeatures)
+        self.textos_token = self.tokenizer.batch_decode([[i] for i in range(len(self.tokenizer))])
+        self.prohibidos = set(self.tokenizer.all_special_ids)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.cola: Optional[asyncio.Queue] = None
+        self.tarea: Optional[asyncio.Task] = None
+        self.lotes: List[int] = []  # tamaño de cada lote generado
+
+    def memoria_mb(self) -> float:
+        """MB de los pesos del modelo."""
+        return sum(p.numel() * p.element_size() for p in self.model.parameters()) / 1024 ** 2
+
+    async def parse(self, prompt: str, formato):
+        if formato is not NewFeatures:
+            raise ValueError("El backend local genera una nota por prompt (usar --max-por-request 1)")
+        if self.tarea is None:
+            self.cola = asyncio.Queue()
+            self.tarea = asyncio.create_task(self._lotes())
+        fut = asyncio.get_running_loop().create_future()
+        await self.cola.put((prompt, fut))
+        return await fut
+
+    async def _lotes(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            pendientes = [await self.cola.get()]
+            hasta = loop.time() + self.max_espera
+            while len(pendientes) < self.batch_size:
+                try:
+                    pendientes.append(await asyncio.wait_for(self.cola.get(), max(0.0, hasta - loop.time())))
+                except asyncio.TimeoutError:
+                    break
+            pendientes = [(p, f) for p, f in pendientes if not f.done()]
+            if not pendientes:
+                continue
+            try:
+                res = await loop.run_in_executor(self.executor, self.generar, [p for p, _ in pendientes])
+            except Exception as e:  # falla el lote entero: cada nota lo registra como error
+                err = BackendError(f"{type(e).__name__}: {e}")
+                err.__cause__ = e
+                res = [err] * len(pendientes)
+            for (_, fut), r in zip(pendientes, res):
+                if fut.done():
+                    continue
+                if isinstance(r, Exception):
+                    fut.set_exception(r)
+                else:
+                    fut.set_result(r)
+
+    def generar(self, prompts: List[str]) -> List[Union[Respuesta, Exception]]:
+        """Genera un lote de prompts (bloqueante)."""
+        self.lotes.append(len(prompts))
+        tok = self.tokenizer
+        textos = [tok.apply_chat_template(mensajes(p + INSTRUCCION), tokenize=False, add_generation_prompt=True)
+                  for p in prompts]
+        enc = tok(textos, return_tensors="pt", padding=True, add_special_tokens=False)
+        restriccion = RestriccionEsquema(self.esqueleto, tok, self.textos_token, self.prohibidos)
+        with self.torch.inference_mode():
+            # cada token aporta al menos un caracter: max_chars + 1 alcanza para cerrar el JSON
+            self.model.generate(**enc, max_new_tokens=self.esqueleto.max_chars + 1, do_sample=False,
+                                logits_processor=self.LogitsProcessorList([restriccion]),
+                                pad_token_id=tok.pad_token_id, eos_token_id=tok.eos_token_id)
+        out: List[Union[Respuesta, Exception]] = []
+        for texto, n_in, n_out in zip(restriccion.generado, enc["attention_mask"].sum(dim=1).tolist(),
+                                      restriccion.n_tokens):
+            try:
+                out.append(Respuesta(NewFeatures.model_validate_json(texto), Uso(int(n_in), n_out)))
+            except ValueError as e:  # ValidationError incluida
+                out.append(e)
+        return out
+
+    async def close(self) -> None:
+        if self.tarea is not None:
+            self.tarea.cancel()
+        self.executor.shutdown(wait=False)
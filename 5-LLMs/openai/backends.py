@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Backends de la extracción de `NewFeatures`: la misma interfaz para la nube y para un modelo local.
+
+`extraccion.Extractor` solo llama a `backend.parse(prompt, formato)` y usa de la respuesta
+`output_parsed` (instancia de `formato`) y `usage` (`input_tokens`, `output_tokens`). Todo lo
+demás (presupuesto de tokens, cache, reintentos, Parquet de salida, métricas) es común.
+
+- `OpenAIBackend`: `AsyncOpenAI.responses.parse` (también sirve para el stub local).
+- `backend_local.TransformersBackend`: modelo instruct chico con `transformers` en CPU,
+  generación por lotes y decodificación restringida al esquema.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Optional, Tuple
+
+from openai import AsyncOpenAI
+
+from features import mensajes
+
+
+class BackendError(RuntimeError):
+    """Falla del backend para una request (generación, restricción de esquema, torch, ...).
+
+    El runner la registra como error de esas notas y sigue con el resto.
+    """
+
+
+class Backend(ABC):
+    """Interfaz mínima de un backend de extracción (las subclases implementan `parse`)."""
+
+    nombre: str = ""  # va en la clave del cache y en la tabla de métricas
+    precios: Tuple[float, float, float] = (0.0, 0.0, 0.0)  # US$ por 1M tokens (in, cacheados, out)
+    empaqueta: bool = True  # acepta `NewFeaturesLote` (varias notas por request)
+
+    @abstractmethod
+    async def parse(self, prompt: str, formato):
+        """Respuesta con `output_parsed` (instancia de `formato`) y `usage`.
+
+        Los errores propios del backend se levantan como `BackendError` (o `ValueError` si la
+        salida no valida); los de la API, como `openai.OpenAIError`.
+        """
+
+    async def close(self) -> None:
+        pass
+
+
+class OpenAIBackend(Backend):
+    """Structured outputs de OpenAI (o de un endpoint compatible, como `stub_server.py`)."""
+
+    def __init__(self, client: AsyncOpenAI, model: str, precios: Tuple[float, float, float],
+                 nombre: Optional[str] = None):
+        self.client = client
+        self.model = model
+        self.nombre = nombre or model  # otro endpoint (stub, --base-url): otro nombre, otras claves de cache
+        self.precios = precios
+
+    async def parse(self, prompt: str, formato):
+        return await self.client.responses.parse(model=self.model, input=mensajes(prompt), text_format=formato)
+
+    async def close(self) -> None:
+        await self.client.close()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark del backend local (`backend_local.py`) contra las salidas de la nube.
+
+Toma las notas de `df_sample.csv` (features extraídas con OpenAI en `prompt-eng.ipynb`),
+busca su texto en el dataset consolidado por URL, las procesa con el modelo local usando el
+mismo runner (`extraccion.Extractor`) y reporta:
+- carga del modelo (s), notas/s, tamaño medio de lote, tokens in/out por nota,
+- memoria: MB de pesos y pico de RSS del proceso,
+- acuerdo campo a campo con la nube: acierto exacto (bool, categorías, horizonte), error
+  absoluto medio y acuerdo de signo (puntajes), Jaccard (listas de empresas/tickers/sectores).
+  Los campos de texto libre (citas, resumen, nombre del actor) no se comparan.
+
+Uso:
+  python bench_local.py --input ../../1-Scraping/dataset_consolidado/df.parquet
+  python bench_local.py --local-model Qwen/Qwen2.5-1.5B-Instruct --local-batch 4 --threads 8
+  python bench_local.py --local df_local.parquet          # solo comparar una salida ya generada
+"""
+
+import argparse
+import ast
+import asyncio
+import resource
+import shutil
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from backend_local import LOCAL_MODEL
+from extraccion import Extractor, RowGroupWriter
+from features import arrow_schema
+
+LIBRES = ("entidades__nombre_actor_principal", "evidencia__citas_evidencia", "evidencia__notas")
+METADATOS = ("diario", "fecha", "seccion", "url")
+
+
+def _lista(v) -> List[str]:
+    if isinstance(v, str):
+        v = ast.literal_eval(v) if v.startswith("[") else [v]
+    if v is None or (isinstance(v, float) and v != v):
+        return []
+    return [str(x).strip().lower() for x in v]
+
+
+def _jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a | b else 1.0  # dos listas vacías coinciden
+
+
+def acuerdo(nube: pd.DataFrame, local: pd.DataFrame) -> pd.DataFrame:
+    """Una fila por campo: métrica de acuerdo entre las dos salidas (emparejadas por URL)."""
+    m = nube.merge(local, on="url", suffixes=("_nube", "_local"))
+    filas = []
+    for f in arrow_schema():
+        if f.name in METADATOS or f.name in LIBRES:
+            continue
+        a, b = m[f.name + "_nube"], m[f.name + "_local"]
+        if pa.types.is_list(f.type):
+            jac = [_jaccard(set(_lista(x)), set(_lista(y))) for x, y in zip(a, b)]
+            filas.append({"campo": f.name, "metrica": "jaccard", "valor": float(np.mean(jac))})
+        elif pa.types.is_floating(f.type):
+            a, b = a.astype(float), b.astype(float)
+            filas.append({"campo": f.name, "metrica": "mae", "valor": float((a - b).abs().mean())})
+            if f.name.endswith("__direccion"):
+                filas.append({"campo": f.name, "metrica": "signo", "valor": float((np.sign(a) == np.sign(b)).mean())})
+        elif pa.types.is_integer(f.type):
+            a, b = pd.to_numeric(a, errors="coerce"), pd.to_numeric(b, errors="coerce")
+            filas.append({"campo": f.name, "metrica": "acierto",
+                          "valor": float(((a == b) | (a.isna() & b.isna())).mean())})
+        else:  # bool y categorías
+            filas.append({"campo": f.name, "metrica": "acierto",
+                          "valor": float((a.astype(str).str.lower() == b.astype(str).str.lower()).mean())})
+    return pd.DataFrame(filas)
+
+
+async def correr_local(df: pd.DataFrame, args, out: Path) -> dict:
+    from backend_local import TransformersBackend
+
+    t0 = time.perf_counter()
+    backend = TransformersBackend(args.local_model, batch_size=args.local_batch, threads=args.threads,
+                                  dtype=args.dtype)
+    t_carga = time.perf_counter() - t0
+    parts = out.with_name(out.name + ".parts")
+    shutil.rmtree(parts, ignore_errors=True)
+    writer = RowGroupWriter(parts, arrow_schema(), row_group_size=100)
+    ext = Extractor(backend, concurrency=2 * args.local_batch, presupuesto=args.presupuesto)
+    try:
+        stats = await ext.run(df, writer, out.with_name(out.name + ".errores.jsonl"), log_every=0)
+    finally:
+        await backend.close()
+    writer.merge(out, sorted(p.name for p in parts.glob("part-*.parquet")))
+    writer.cleanup()
+    n = max(1, stats["ok"])
+    return {"carga_s": t_carga, "notas_s": stats["notas_s"], "errores": stats["error"],
+            "lote_medio": float(np.mean(backend.lotes)) if backend.lotes else 0.0,
+            "tokens_in": stats["input_tokens"] / n, "tokens_out": stats["output_tokens"] / n,
+            "pesos_mb": backend.memoria_mb(),
+            "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}  # KB en Linux
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark del backend local de NewFeatures contra la nube.")
+    ap.add_argument("--nube", default="df_sample.csv", help="Features de referencia (OpenAI)")
+    ap.add_argument("--input", default="../../1-Scraping/dataset_consolidado/df.parquet")
+    ap.add_argument("--local", default=None, help="Salida local ya generada (no corre el modelo)")
+    ap.add_argument("--out", default="df_sample_local.parquet")
+    ap.add_argument("--local-model", default=LOCAL_MODEL)
+    ap.add_argument("--local-batch", type=int, default=8)
+    ap.add_argument("--threads", type=int, default=None, help="Threads de torch (default: todos)")
+    ap.add_argument("--dtype", default="float32", choices=["float32", "bfloat16"])
+    ap.add_argument("--presupuesto", type=int, default=2000, help="Tokens de contenido por nota")
+    args = ap.parse_args()
+
+    nube = pd.read_csv(args.nube)
+    if args.local:
+        local = pd.read_parquet(args.local)
+    else:
+        df = pd.read_parquet(args.input, filters=[("url", "in", nube["url"].tolist())])
+        df = df.drop_duplicates("url")
+        print(f"{len(df)}/{len(nube)} notas de {args.nube} encontradas en {args.input} | modelo {args.local_model}")
+        r = asyncio.run(correr_local(df, args, Path(args.out)))
+        print(f"carga {r['carga_s']:.1f} s | {r['notas_s']:.2f} notas/s (lote medio {r['lote_medio']:.1f}) | "
+              f"{r['errores']} errores | tokens in/out por nota {r['tokens_in']:.0f}/{r['tokens_out']:.0f} | "
+              f"pesos {r['pesos_mb']:.0f} MB, pico RSS {r['rss_mb']:.0f} MB")
+        local = pd.read_parquet(args.out)
+
+    tabla = acuerdo(nube, local)
+    print(f"\nAcuerdo con la nube ({len(nube.merge(local, on='url'))} notas emparejadas por URL):")
+    print(tabla.to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+    print("\nMedia por métrica:")
+    print(tabla.groupby("metrica")["valor"].mean().to_string(float_format=lambda x: f"{x:.3f}"))
+
+
+if __name__ == "__main__":
+    main()
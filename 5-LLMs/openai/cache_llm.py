@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache persistente de respuestas del LLM, direccionado por contenido.
+
+La clave de cada respuesta es el hash de:
+  (modelo, hash de SYSTEM_PROMPT + USER_TEMPLATE, hash del JSON schema de `NewFeatures`,
+   hash del mensaje de usuario ya armado para la nota).
+El mensaje armado incluye título, contenido (ya recortado) y metadatos de la nota: si la nota
+cambia, o cambia el recorte, la clave cambia. Si cambian el prompt, el esquema o el modelo,
+cambian todas las claves y nada viejo se reutiliza por error. El "modelo" es `Backend.nombre`:
+`local:<modelo>`, `stub:<modelo>` o `<modelo>@<base_url>` para endpoints compatibles, así las
+respuestas de un backend nunca se sirven como si fueran de otro.
+
+- Se guarda en SQLite (WAL): cada respuesta se confirma apenas llega, así que el cache es
+  también el checkpoint de una corrida interrumpida.
+- Desalojo por tamaño: si el total supera `max_bytes` se borran las entradas usadas hace más
+  tiempo (LRU) hasta quedar en el 90% del límite.
+
+Uso:
+  python cache_llm.py info  --db llm_cache.sqlite
+  python cache_llm.py evict --db llm_cache.sqlite --max-mb 200
+"""
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from features import SYSTEM_PROMPT, USER_TEMPLATE, NewFeatures
+
+
+def _h(s: str) -> str:
+    return hashlib.blake2b(s.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def prompt_hash(system: str = SYSTEM_PROMPT, template: str = USER_TEMPLATE) -> str:
+    return _h(system + "\x00" + template)
+
+
+def schema_hash(model: type = NewFeatures) -> str:
+    return _h(json.dumps(model.model_json_schema(), sort_keys=True, ensure_ascii=False))
+
+
+class LLMCache:
+    """Cache clave -> JSON de features, con LRU por tamaño."""
+
+    def __init__(self, path, model: str, max_bytes: int = 500 * 1024 ** 2,
+                 system: str = SYSTEM_PROMPT, template: str = USER_TEMPLATE, schema: type = NewFeatures):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.prefijo = "|".join([model, prompt_hash(system, template), schema_hash(schema)])
+        self.con = sqlite3.connect(self.path)
+        self.con.execute("PRAGMA journal_mode=WAL")
+        self.con.execute("PRAGMA synchronous=NORMAL")
+        self.con.execute("CREATE TABLE IF NOT EXISTS respuestas (key TEXT PRIMARY KEY, value TEXT, "
+                         "size INTEGER, creado REAL, usado REAL) WITHOUT ROWID")
+        self.con.execute("CREATE INDEX IF NOT EXISTS respuestas_usado ON respuestas (usado)")
+        self.total = self.con.execute("SELECT COALESCE(SUM(size), 0) FROM respuestas").fetchone()[0]
+        self.hits = self.misses = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self.con.commit()
+        self.con.close()
+
+    def key(self, user_prompt: str) -> str:
+        return _h(self.prefijo + "|" + _h(user_prompt))
+
+    def get(self, user_prompt: str) -> Optional[Dict]:
+        k = self.key(user_prompt)
+        row = self.con.execute("SELECT value FROM respuestas WHERE key = ?", (k,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.con.execute("UPDATE respuestas SET usado = ? WHERE key = ?", (time.time(), k))
+        return json.loads(row[0])
+
+    def put(self, user_prompt: str, value: Dict) -> None:
+        k = self.key(user_prompt)
+        data = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        old = self.con.execute("SELECT size FROM respuestas WHERE key = ?", (k,)).fetchone()
+        self.con.execute("INSERT OR REPLACE INTO respuestas VALUES (?, ?, ?, ?, ?)",
+                         (k, data, len(data), now, now))
+        self.con.commit()
+        self.total += len(data) - (old[0] if old else 0)
+        if self.total > self.max_bytes:
+            self.evict()
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """Borra las entradas menos usadas hasta quedar en el 90% de `max_bytes`. Devuelve cuántas."""
+        objetivo = 0.9 * (max_bytes or self.max_bytes)
+        borradas = 0
+        while self.total > objetivo:
+            filas = self.con.execute("SELECT key, size FROM respuestas ORDER BY usado LIMIT 500").fetchall()
+            if not filas:
+                break
+            for k, size in filas:
+                if self.total <= objetivo:
+                    break
+                self.con.execute("DELETE FROM respuestas WHERE key = ?", (k,))
+                self.total -= size
+                borradas += 1
+        self.con.commit()
+        return borradas
+
+    def __len__(self) -> int:
+        return self.con.execute("SELECT COUNT(*) FROM respuestas").fetchone()[0]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Mantenimiento del cache de respuestas del LLM.")
+    ap.add_argument("comando", choices=["info", "evict"])
+    ap.add_argument("--db", default="llm_cache.sqlite")
+    ap.add_argument("--max-mb", type=float, default=500)
+    args = ap.parse_args()
+
+    with LLMCache(args.db, model="", max_bytes=int(args.max_mb * 1024 ** 2)) as cache:
+        if args.comando == "evict":
+            print(f"{cache.evict()} entradas borradas")
+        print(f"{args.db}: {len(cache)} respuestas, {cache.total / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
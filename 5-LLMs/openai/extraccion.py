@@ -0,0 +1,543 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Extracción concurrente de `NewFeatures` con el cliente async de OpenAI (o un modelo local).
+
+Reemplaza el loop secuencial `for _, row in df_sample.iterrows()` de `prompt-eng.ipynb`:
+
+- Las requests salen en paralelo (`AsyncOpenAI.responses.parse`) con un límite de requests
+  en vuelo adaptativo (AIMD): ante un 429 se reduce a la mitad y todas las tareas esperan
+  el `Retry-After` (o un backoff exponencial con jitter); con respuestas OK vuelve a subir
+  gradualmente hasta `--concurrency`. Los 5xx y errores de red se reintentan con backoff.
+- Throttling propio por requests/min y tokens/min (token buckets); los tokens se estiman
+  antes de enviar y se corrigen con el `usage` real de cada respuesta.
+- Los resultados se escriben a Parquet a medida que llegan (`parquet_stream.RowGroupWriter`,
+  un part por row group); al final se unen en `--out`. Las filas que fallan van a
+  `<out>.errores.jsonl`.
+- Con `--cache` (default `llm_cache.sqlite`, ver `cache_llm.py`) las notas ya respondidas con
+  el mismo modelo, prompt y esquema no se vuelven a pedir. Cada respuesta se confirma en el
+  cache apenas llega: relanzar una corrida cortada solo paga las notas que faltaban.
+- Presupuesto de tokens en vez de `contenido[:8000]` (`presupuesto.py`): se saca el boilerplate
+  (firmas, "Seguí leyendo", líneas repetidas en muchas notas) y la nota se recorta a
+  `--presupuesto` tokens en bordes de párrafo/oración. Las notas cortas se empaquetan de a
+  `--max-por-request` por request (esquema `NewFeaturesLote`); el cache sigue siendo por nota.
+  Las líneas repetidas se aprenden una vez y se guardan en `--repetidas` (default
+  `<cache>.repetidas.json`): las corridas siguientes reusan la lista, así el prompt (la clave del
+  cache) de una nota no depende de qué otras notas tenga el input.
+- Cada intento contra la API queda en `<out>.metricas.parquet` (tokens in/cacheados/out,
+  latencia, estado, costo en US$ según `--precio-in/--precio-out`); al final se imprime el
+  costo y los tokens por cada 1000 notas.
+- `--backend local` corre un modelo chico en CPU con `transformers` (`backend_local.py`) en vez
+  de la API: mismo runner, cache (con otra clave de modelo) y formato de salida.
+- `--stub` levanta `stub_server.py` en el mismo proceso: corre completo sin red ni API key.
+
+Uso:
+  python extraccion.py --input ../../1-Scraping/dataset_consolidado/df.parquet --sample 1000 --out df_features.parquet
+  python extraccion.py --sample 200 --stub --concurrency 32
+  python extraccion.py --input df.parquet --rpm 500 --tpm 200000 --concurrency 16
+  python extraccion.py --sample 1000 --presupuesto 1500 --max-por-request 1   # sin empaquetar
+  python extraccion.py --sample 200 --backend local --local-model Qwen/Qwen2.5-1.5B-Instruct --concurrency 16
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import shutil
+import sys
+import time
+from contextlib import aclosing
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import openai
+import pandas as pd
+import pyarrow as pa
+from openai import AsyncOpenAI
+from pydantic import ValidationError
+
+from backend_local import LOCAL_MODEL
+from backends import Backend, BackendError, OpenAIBackend
+from cache_llm import LLMCache
+from features import (NewFeatures, NewFeaturesLote, aplanar, arrow_schema, build_prompt, build_prompt_lote,
+                      completar_metadatos)
+from presupuesto import LineasRepetidas, ajustar, contador_tokens, empaquetar, limpiar
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "1-Scraping"))
+from parquet_stream import RowGroupWriter  # noqa: E402
+
+MODEL = "gpt-5-mini"
+CHARS_POR_TOKEN = 3.5
+OUTPUT_TOKENS_EST = 800
+# US$ por millón de tokens (input, input cacheado, output) de gpt-5-mini
+PRECIOS = (0.25, 0.025, 2.00)
+RETRY_EXC = (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError,
+             openai.APITimeoutError)
+# errores de una request que se registran en <out>.errores.jsonl sin cortar la corrida
+NOTA_EXC = (openai.OpenAIError, BackendError, ValidationError, ValueError)
+
+
+class AsyncTokenBucket:
+    """Token bucket para asyncio: `rate` unidades/seg, ráfagas de hasta `burst`.
+
+    `acquire(n)` admite pedidos mayores que el burst (espera a acumular deuda) y
+    `ajustar(delta)` corrige una estimación previa (positivo = se consumió más).
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, n: float = 1.0) -> None:
+        if self.rate <= 0:
+            return
+        async with self.lock:  # FIFO: un pedido grande no queda postergado por los chicos
+            self._refill()
+            self.tokens -= n
+            if self.tokens < 0:
+                await asyncio.sleep(-self.tokens / self.rate)
+
+    def ajustar(self, delta: float) -> None:
+        if self.rate > 0:
+            self._refill()
+            self.tokens -= delta
+
+
+class LimiteAdaptativo:
+    """Semáforo con límite adaptativo (AIMD).
+
+    Cada respuesta OK suma `1/limite` (+1 por "ventana" completa de éxitos); un 429 parte el
+    límite a la mitad (a lo sumo una vez por segundo, para no reaccionar varias veces a la
+    misma ráfaga) y pausa las nuevas requests hasta que venza el `Retry-After`.
+    """
+
+    def __init__(self, maximo: int, inicial: Optional[int] = None):
+        self.maximo = max(1, maximo)
+        self.limite = float(min(self.maximo, inicial or self.maximo))
+        self.en_vuelo = 0
+        self.cond = asyncio.Condition()
+        self.pausa_hasta = 0.0
+        self.ultima_baja = 0.0
+
+    async def __aenter__(self):
+        async with self.cond:
+            while self.en_vuelo >= int(self.limite):
+                await self.cond.wait()
+            self.en_vuelo += 1
+        espera = self.pausa_hasta - time.monotonic()
+        if espera > 0:
+            await asyncio.sleep(espera)
+        return self
+
+    async def __aexit__(self, *exc):
+        async with self.cond:
+            self.en_vuelo -= 1
+            self.cond.notify_all()
+
+    def exito(self) -> None:
+        self.limite = min(self.maximo, self.limite + 1.0 / self.limite)
+
+    def rate_limited(self, espera: float) -> None:
+        now = time.monotonic()
+        if now - self.ultima_baja > 1.0:
+            self.limite = max(1.0, self.limite / 2)
+            self.ultima_baja = now
+        self.pausa_hasta = max(self.pausa_hasta, now + espera)
+
+
+def _retry_after(e: Exception) -> Optional[float]:
+    resp = getattr(e, "response", None)
+    if resp is None:
+        return None
+    for h in ("retry-after-ms", "retry-after"):
+        v = resp.headers.get(h)
+        if v:
+            try:
+                return float(v) / (1000 if h.endswith("ms") else 1)
+            except ValueError:
+                pass
+    return None
+
+
+def estimar_tokens(prompt: str) -> int:
+    return int(len(prompt) / CHARS_POR_TOKEN) + OUTPUT_TOKENS_EST
+
+
+METRICAS_SCHEMA = pa.schema([
+    ("ts", pa.float64()), ("modelo", pa.string()), ("notas", pa.int32()), ("intento", pa.int32()),
+    ("estado", pa.string()), ("latencia_s", pa.float64()), ("input_tokens", pa.int64()),
+    ("cached_tokens", pa.int64()), ("output_tokens", pa.int64()), ("costo_usd", pa.float64()),
+])
+
+
+class Extractor:
+    """Corre la extracción de un DataFrame con concurrencia, throttling y reintentos.
+
+    Cada nota se limpia y se ajusta a `presupuesto` tokens de contenido (`presupuesto.py`); las
+    notas de hasta `corta` tokens se empaquetan de a `max_por_request` (y hasta
+    `max_tokens_request` tokens de contenido) en una sola request.
+    """
+
+    def __init__(self, backend: Backend, concurrency: int = 8, rpm: float = 0,
+                 tpm: float = 0, retries: int = 6, backoff: float = 1.0, presupuesto: int = 2000,
+                 corta: int = 400, max_por_request: int = 4, max_tokens_request: int = 2400,
+                 cache: Optional[LLMCache] = None, metricas: Optional[RowGroupWriter] = None,
+                 repetidas: Optional[LineasRepetidas] = None):
+        self.backend = backend
+        self.cache = cache
+        self.metricas = metricas
+        self.model = backend.nombre
+        self.limite = LimiteAdaptativo(concurrency)
+        self.rpm = AsyncTokenBucket(rpm / 60, burst=max(1.0, rpm / 60)) if rpm else None
+        self.tpm = AsyncTokenBucket(tpm / 60, burst=tpm / 60 * 5) if tpm else None
+        self.retries = retries
+        self.backoff = backoff
+        self.presupuesto = presupuesto
+        self.corta = corta
+        self.max_por_request = max_por_request if backend.empaqueta else 1
+        self.max_tokens_request = max_tokens_request
+        self.repetidas = repetidas
+        self.precios = backend.precios
+        self.contar = contador_tokens()
+        self.stats = {"ok": 0, "cache": 0, "error": 0, "requests": 0, "reintentos": 0, "429": 0,
+                      "input_tokens": 0, "output_tokens": 0, "costo_usd": 0.0}
+
+    def costo(self, input_tokens: int, cached_tokens: int, output_tokens: int) -> float:
+        p_in, p_cached, p_out = self.precios
+        return ((input_tokens - cached_tokens) * p_in + cached_tokens * p_cached + output_tokens * p_out) / 1e6
+
+    def _registrar(self, notas: int, intento: int, estado: str, latencia: float, usage=None) -> float:
+        """Agrega un intento a la tabla de métricas; devuelve su costo en US$."""
+        tin = usage.input_tokens if usage is not None else 0
+        tout = usage.output_tokens if usage is not None else 0
+        details = getattr(usage, "input_tokens_details", None)
+        cached = (getattr(details, "cached_tokens", 0) or 0) if details is not None else 0
+        costo = self.costo(tin, cached, tout)
+        if self.metricas is None:
+            return costo
+        self.metricas.add({"ts": time.time(), "modelo": self.model, "notas": notas, "intento": intento,
+                           "estado": estado, "latencia_s": latencia, "input_tokens": tin,
+                           "cached_tokens": cached, "output_tokens": tout,
+                           "costo_usd": costo})
+        if self.metricas.full:
+            self.metricas.flush()
+        return costo
+
+    async def _llamar(self, prompt: str, formato=NewFeatures, notas: int = 1):
+        est = estimar_tokens(prompt) + OUTPUT_TOKENS_EST * (notas - 1)
+        for attempt in range(self.retries + 1):
+            if self.rpm:
+                await self.rpm.acquire()
+            if self.tpm:
+                await self.tpm.acquire(est)
+            t0 = time.perf_counter()
+            try:
+                async with self.limite:
+                    t0 = time.perf_counter()
+                    resp = await self.backend.parse(prompt, formato)
+            except RETRY_EXC as e:
+                self._registrar(notas, attempt, str(getattr(e, "status_code", None) or type(e).__name__),
+                                time.perf_counter() - t0)
+                if attempt == self.retries:
+                    raise
+                self.stats["reintentos"] += 1
+                espera = _retry_after(e) or random.uniform(0, self.backoff * (2 ** attempt))
+                if isinstance(e, openai.RateLimitError):
+                    self.stats["429"] += 1
+                    self.limite.rate_limited(espera)
+                if self.tpm:
+                    self.tpm.ajustar(-est)  # no se consumió
+                await asyncio.sleep(espera)  # fuera del semáforo: no ocupa un lugar en vuelo
+                continue
+            except NOTA_EXC:
+                raise
+            except Exception as e:  # cualquier otra falla del backend (p.ej. torch) es un error de estas notas
+                raise BackendError(f"{type(e).__name__}: {e}") from e
+            self.limite.exito()
+            self.stats["requests"] += 1
+            self.stats["costo_usd"] += self._registrar(notas, attempt, "ok", time.perf_counter() - t0, resp.usage)
+            if resp.usage is not None:
+                usados = resp.usage.input_tokens + resp.usage.output_tokens
+                self.stats["input_tokens"] += resp.usage.input_tokens
+                self.stats["output_tokens"] += resp.usage.output_tokens
+                if self.tpm:
+                    self.tpm.ajustar(usados - est)
+            return resp
+
+    def preparar(self, row: Dict) -> Tuple[Dict, str]:
+        """(fila con el contenido limpio y ajustado al presupuesto, prompt de una sola nota)."""
+        contenido = row.get("contenido")
+        contenido = limpiar(contenido if isinstance(contenido, str) else "", self.repetidas)
+        row = dict(row, contenido=ajustar(contenido, self.presupuesto, self.contar))
+        return row, build_prompt(row, max_chars=0)
+
+    async def extraer(self, row: Dict, prompt: str) -> Dict:
+        """Features aplanadas de una fila ya preparada, con una request propia."""
+        resp = await self._llamar(prompt)
+        if resp.output_parsed is None:
+            raise ValueError("Respuesta sin salida parseada")
+        return self._guardar(row, prompt, resp.output_parsed)
+
+    async def extraer_lote(self, grupo: List[Tuple[Dict, str]]) -> List[Tuple[Dict, Optional[Dict], Optional[Exception]]]:
+        """Varias notas en una request; las que el modelo no devuelva se piden de a una."""
+        if len(grupo) == 1:
+            row, prompt = grupo[0]
+            return [await self._seguro(self.extraer(row, prompt), row)]
+        rows = [r for r, _ in grupo]
+        try:
+            resp = await self._llamar(build_prompt_lote(rows, max_chars=0), NewFeaturesLote, len(rows))
+            items = resp.output_parsed.notas if resp.output_parsed is not None else []
+        except NOTA_EXC:
+            items = []
+        por_url = {it.url: it for it in items if it.url}
+        out, faltan = [], []
+        for i, (row, prompt) in enumerate(grupo):
+            it = por_url.get(row.get("url"))
+            if it is None and len(items) == len(rows):
+                it = items[i]  # mismo orden
+            if it is None:
+                faltan.append((row, prompt))
+            else:
+                out.append((row, self._guardar(row, prompt, it), None))
+        for row, prompt in faltan:
+            out.append(await self._seguro(self.extraer(row, prompt), row))
+        return out
+
+    async def _seguro(self, coro, row):
+        try:
+            return row, await coro, None
+        except NOTA_EXC as e:
+            return row, None, e
+
+    def _guardar(self, row: Dict, prompt: str, parsed: NewFeatures) -> Dict:
+        if self.cache is not None:
+            self.cache.put(prompt, parsed.model_dump())  # checkpoint: queda confirmado en disco
+        return aplanar(completar_metadatos(parsed, row).model_dump())
+
+    def _unidades(self, filas: List[Dict], bloque: int = 256):
+        """Por bloques de filas: ("hit", fila, features) para lo cacheado y ("grupo", [(fila, prompt)])
+        para lo que hay que pedir, ya empaquetado."""
+        for i in range(0, len(filas), bloque):
+            pendientes = []
+            for row in filas[i:i + bloque]:
+                row, prompt = self.preparar(row)
+                crudo = self.cache.get(prompt) if self.cache is not None else None
+                if crudo is not None:
+                    parsed = completar_metadatos(NewFeatures.model_validate(crudo), row)
+                    yield "hit", row, aplanar(parsed.model_dump())
+                else:
+                    pendientes.append((row, prompt))
+            tokens = [self.contar(r["contenido"]) for r, _ in pendientes]
+            for g in empaquetar(tokens, self.corta, self.max_por_request, self.max_tokens_request):
+                yield "grupo", [pendientes[j] for j in g], None
+
+    async def run(self, df: pd.DataFrame, writer: RowGroupWriter, errores: Path, log_every: int = 50) -> dict:
+        """Procesa todas las filas; escribe cada resultado apenas llega."""
+        t0 = time.perf_counter()
+        filas = df.to_dict("records")
+
+        async def resultados():
+            # ventana acotada de tareas: no se crean millones de corrutinas de una vez
+            pendientes, hechas, it = set(), set(), self._unidades(filas)
+            try:
+                while True:
+                    for tipo, a, b in it:
+                        if tipo == "hit":
+                            self.stats["cache"] += 1
+                            yield a, b, None
+                            continue
+                        pendientes.add(asyncio.ensure_future(self.extraer_lote(a)))
+                        if len(pendientes) >= 4 * self.limite.maximo:
+                            break
+                    if not pendientes:
+                        return
+                    hechas, pendientes = await asyncio.wait(pendientes, return_when=asyncio.FIRST_COMPLETED)
+                    for t in hechas:
+                        for res in t.result():
+                            yield res
+            finally:  # si se corta por un error, no quedan tareas sueltas pidiendo a la API
+                for t in pendientes:
+                    t.cancel()
+                await asyncio.gather(*pendientes, *hechas, return_exceptions=True)
+
+        with open(errores, "w", encoding="utf-8") as ferr:
+            i = 0
+            async with aclosing(resultados()) as gen:
+                async for row, feats, err in gen:
+                    i += 1
+                    if err is None:
+                        writer.add(feats)
+                        if writer.full:
+                            writer.flush()
+                        self.stats["ok"] += 1
+                    else:
+                        self.stats["error"] += 1
+                        ferr.write(json.dumps({"url": row.get("url"), "error": f"{type(err).__name__}: {err}"},
+                                              ensure_ascii=False) + "\n")
+                    if log_every and i % log_every == 0:
+                        dt = time.perf_counter() - t0
+                        print(f"{i}/{len(filas)} ({i / dt:.1f} notas/s) | en vuelo máx {int(self.limite.limite)} | "
+                              f"{self.stats['reintentos']} reintentos, {self.stats['error']} errores | "
+                              f"US$ {self.stats['costo_usd']:.4f}")
+        writer.flush()
+        if self.metricas is not None:
+            self.metricas.flush()
+        dt = time.perf_counter() - t0
+        self.stats["segundos"] = round(dt, 2)
+        self.stats["notas_s"] = self.stats["ok"] / max(dt, 1e-9)  # sin redondear: dt puede ser ~0
+        return self.stats
+
+
+async def crear_backend(args) -> Tuple[Backend, Optional[object]]:
+    """Backend pedido por CLI y, con `--stub`, el runner del stub (para cerrarlo al final)."""
+    if args.backend == "local":
+        from backend_local import TransformersBackend
+        backend = TransformersBackend(args.local_model, batch_size=args.local_batch, threads=args.local_threads,
+                                      dtype=args.local_dtype)
+        print(f"[INFO] Modelo local {args.local_model}: {backend.memoria_mb():.0f} MB de pesos")
+        return backend, None
+    stub = None
+    base_url, api_key = args.base_url, None
+    if args.stub:
+        from stub_server import iniciar
+        stub, base_url = await iniciar(latencia=args.stub_latencia, p_429=args.stub_p429, p_500=args.stub_p500)
+        api_key = "stub"
+    elif args.api_key_file and Path(args.api_key_file).exists():
+        api_key = Path(args.api_key_file).read_text(encoding="utf-8").strip()
+    client = AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0, timeout=args.timeout)
+    # el nombre va en la clave del cache: las respuestas inventadas del stub (o de otro endpoint)
+    # no pueden quedar guardadas como si fueran del modelo real
+    nombre = f"stub:{args.model}" if args.stub else (f"{args.model}@{base_url}" if base_url else args.model)
+    return OpenAIBackend(client, args.model, (args.precio_in, args.precio_cached, args.precio_out), nombre), stub
+
+
+async def amain(args) -> None:
+    df = pd.read_parquet(args.input)
+    if args.sample:
+        df = df.sample(min(args.sample, len(df)), random_state=args.seed)
+    backend, stub = await crear_backend(args)
+    print(f"[INFO] {len(df)} notas | modelo {backend.nombre} | concurrencia {args.concurrency}")
+
+    out = Path(args.out)
+    parts = out.with_name(out.name + ".parts")
+    shutil.rmtree(parts, ignore_errors=True)  # parts de una corrida cortada: lo ya respondido sale del cache
+    writer = RowGroupWriter(parts, arrow_schema(), row_group_size=args.row_group_size)
+    cache = None if args.no_cache else LLMCache(args.cache, backend.nombre, max_bytes=int(args.cache_max_mb * 1024 ** 2))
+    if cache is not None:
+        print(f"[INFO] Cache {args.cache}: {len(cache)} respuestas")
+    repetidas = cargar_repetidas(args, df)
+    metricas_path = out.with_name(out.name + ".metricas.parquet")
+    mparts = out.with_name(out.name + ".metricas.parts")
+    shutil.rmtree(mparts, ignore_errors=True)
+    metricas = RowGroupWriter(mparts, METRICAS_SCHEMA, row_group_size=500)
+    ext = Extractor(backend, args.concurrency, rpm=args.rpm, tpm=args.tpm, retries=args.retries,
+                    presupuesto=args.presupuesto, corta=args.corta, max_por_request=args.max_por_request,
+                    max_tokens_request=args.max_tokens_request, cache=cache, metricas=metricas,
+                    repetidas=repetidas)
+    try:
+        stats = await ext.run(df, writer, out.with_name(out.name + ".errores.jsonl"), log_every=args.log_every)
+    finally:
+        await backend.close()
+        if cache is not None:
+            cache.close()
+        if stub is not None:
+            await stub.cleanup()
+
+    n = writer.merge(out, sorted(p.name for p in parts.glob("part-*.parquet")))
+    writer.cleanup()
+    metricas.merge(metricas_path, sorted(p.name for p in mparts.glob("part-*.parquet")))
+    metricas.cleanup()
+    print(f"[OK] {out}: {n} filas | {stats['ok']} ok ({stats['cache']} del cache), {stats['error']} errores, {stats['reintentos']} reintentos "
+          f"({stats['429']} por 429) | {stats['notas_s']:.2f} notas/s")
+    resumen_metricas(metricas_path, stats["ok"] - stats["cache"])
+
+
+def cargar_repetidas(args, df: pd.DataFrame) -> Optional[LineasRepetidas]:
+    """Las líneas repetidas de `--repetidas`; si el archivo no existe (o con `--reaprender-repetidas`)
+    se aprenden del input y se guardan.
+
+    El texto limpio es parte del prompt y el prompt es la clave del cache: reaprender la lista en
+    cada corrida haría que agregar notas al corpus cambie los prompts de notas ya respondidas.
+    """
+    if not args.min_repeticiones:
+        return None
+    path = Path(args.repetidas or f"{args.cache}.repetidas.json")
+    if path.exists() and not args.reaprender_repetidas:
+        repetidas = LineasRepetidas.load(path)
+        print(f"[INFO] {path}: {len(repetidas.lineas)} líneas repetidas (>= {repetidas.min_notas} notas) se descartan")
+        return repetidas
+    repetidas = LineasRepetidas(args.min_repeticiones).fit(df["contenido"].dropna())
+    repetidas.save(path)
+    print(f"[INFO] {len(repetidas.lineas)} líneas repetidas (>= {args.min_repeticiones} notas) se descartan -> {path}")
+    return repetidas
+
+
+def resumen_metricas(path: Path, notas: int) -> None:
+    """Costo, tokens y latencia de las requests de una corrida (por cada 1000 notas pedidas)."""
+    m = pd.read_parquet(path)
+    ok = m[m["estado"] == "ok"]
+    if ok.empty or not notas:
+        print(f"[OK] {path}: sin requests a la API")
+        return
+    por_mil = 1000 / notas
+    print(f"[OK] {path}: {len(m)} intentos ({len(ok)} ok, {ok['notas'].mean():.2f} notas/request) | "
+          f"latencia p50/p95 {ok['latencia_s'].quantile(.5):.2f}/{ok['latencia_s'].quantile(.95):.2f} s")
+    print(f"     por 1000 notas: US$ {ok['costo_usd'].sum() * por_mil:.3f} | "
+          f"tokens in {ok['input_tokens'].sum() * por_mil:,.0f} (cacheados {ok['cached_tokens'].sum() * por_mil:,.0f}) | "
+          f"out {ok['output_tokens'].sum() * por_mil:,.0f} | total US$ {m['costo_usd'].sum():.4f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Extracción concurrente de NewFeatures con OpenAI.")
+    ap.add_argument("--input", default="../../1-Scraping/dataset_consolidado/df.parquet")
+    ap.add_argument("--sample", type=int, default=0, help="Notas al azar (0 = todas)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", default="df_features.parquet")
+    ap.add_argument("--backend", choices=["openai", "local"], default="openai")
+    ap.add_argument("--model", default=MODEL)
+    ap.add_argument("--local-model", default=LOCAL_MODEL, help="Modelo de HF (backend local)")
+    ap.add_argument("--local-batch", type=int, default=8, help="Notas por lote de generación (backend local)")
+    ap.add_argument("--local-threads", type=int, default=None)
+    ap.add_argument("--local-dtype", default="float32", choices=["float32", "bfloat16"])
+    ap.add_argument("--concurrency", type=int, default=8, help="Máximo de requests en vuelo")
+    ap.add_argument("--rpm", type=float, default=0, help="Requests por minuto (0 = sin límite)")
+    ap.add_argument("--tpm", type=float, default=0, help="Tokens por minuto (0 = sin límite)")
+    ap.add_argument("--retries", type=int, default=6)
+    ap.add_argument("--timeout", type=float, default=120)
+    ap.add_argument("--row-group-size", type=int, default=100)
+    ap.add_argument("--log-every", type=int, default=50)
+    ap.add_argument("--api-key-file", default="../../.secrets/openai_api_key.txt")
+    ap.add_argument("--presupuesto", type=int, default=2000, help="Tokens de contenido por nota")
+    ap.add_argument("--min-repeticiones", type=int, default=20,
+                    help="Descartar líneas que aparecen en al menos N notas del input (0 = no)")
+    ap.add_argument("--repetidas", default=None,
+                    help="Lista de líneas repetidas (JSON; default <cache>.repetidas.json). Si existe se reusa")
+    ap.add_argument("--reaprender-repetidas", action="store_true",
+                    help="Volver a aprender la lista del input (cambia los prompts: invalida el cache)")
+    ap.add_argument("--corta", type=int, default=400, help="Notas de hasta N tokens se empaquetan")
+    ap.add_argument("--max-por-request", type=int, default=4, help="Notas cortas por request (1 = no empaquetar)")
+    ap.add_argument("--max-tokens-request", type=int, default=2400, help="Tokens de contenido por request empaquetada")
+    ap.add_argument("--precio-in", type=float, default=PRECIOS[0], help="US$ por 1M tokens de input")
+    ap.add_argument("--precio-cached", type=float, default=PRECIOS[1], help="US$ por 1M tokens de input cacheados")
+    ap.add_argument("--precio-out", type=float, default=PRECIOS[2], help="US$ por 1M tokens de output")
+    ap.add_argument("--cache", default="llm_cache.sqlite", help="Cache de respuestas (SQLite)")
+    ap.add_argument("--cache-max-mb", type=float, default=500)
+    ap.add_argument("--no-cache", action="store_true")
+    ap.add_argument("--base-url", default=None, help="Endpoint compatible (p.ej. el stub local)")
+    ap.add_argument("--stub", action="store_true", help="Usar stub_server.py en el mismo proceso")
+    ap.add_argument("--stub-latencia", type=float, default=0.5)
+    ap.add_argument("--stub-p429", type=float, default=0.05)
+    ap.add_argument("--stub-p500", type=float, default=0.02)
+    asyncio.run(amain(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Esquema `NewFeatures`, prompts y helpers compartidos de la extracción de features con LLMs.
+
+Es el mismo esquema y los mismos prompts de `prompt-eng.ipynb`, movidos a un módulo para
+que el runner (`extraccion.py`), el stub local y el notebook usen exactamente lo mismo.
+
+- `build_prompt(row)`: arma el mensaje de usuario a partir de una fila del dataset;
+  `build_prompt_lote(rows)` arma uno con varias notas (respuesta `NewFeaturesLote`).
+- `completar_metadatos(parsed, row)`: completa diario/fecha/seccion/url desde la fila.
+- `aplanar(features)`: dict anidado -> columnas `a__b__c` (como `json_normalize(sep="__")`).
+- `arrow_schema()`: esquema Arrow de las columnas aplanadas (para escribir Parquet en streaming).
+"""
+
+from __future__ import annotations
+
+import typing
+from typing import Any, Dict, List, Literal, Optional
+
+import pyarrow as pa
+from pydantic import BaseModel, Field
+
+SEP = "__"
+MAX_CHARS = 8000
+
+
+class Evidencia(BaseModel):
+    citas_evidencia: List[str] = Field(description="Hasta 3 frases textuales del artículo")
+    notas: Optional[str] = Field(default=None, description="Resumen factual breve (sin especulación)")
+
+
+class ImpactoDireccional(BaseModel):
+    direccion: float = Field(description="[-1..1] Dirección esperada")
+    magnitud: float = Field(description="[0..1] Magnitud esperada")
+
+
+class SeñalesMercado(BaseModel):
+    merval: ImpactoDireccional
+    fx_ars: ImpactoDireccional
+    tasa_bcra: ImpactoDireccional
+    bonos_soberanos: ImpactoDireccional
+
+
+class Optimismos(BaseModel):
+    positividad_general: float
+    apoyo_gobernanza: float
+    optimismo_macro_corto: float
+    optimismo_macro_largo: float
+    optimismo_fin_corto: float
+    optimismo_fin_largo: float
+
+
+class Tematicas(BaseModel):
+    menciona_inflacion: bool
+    menciona_pbi: bool
+    menciona_reservas: bool
+    menciona_embi: bool
+    menciona_deuda: bool
+    menciona_fmi: bool
+    menciona_salarios_paritarias: bool
+
+
+class Entidades(BaseModel):
+    tipo_actor_principal: Literal[
+        "gobierno_nacional", "bcra", "provincia", "municipio",
+        "empresa_mercado_local", "empresa_mercado_ext",
+        "sindicato", "poder_judicial", "congreso", "organismo_internacional",
+        "desconocido"
+    ]
+    nombre_actor_principal: Optional[str] = "unknown"
+    empresas_mencionadas: List[str] = []
+    tickers_mencionados: List[str] = []
+    sectores_mencionados: List[str] = []
+
+
+class Evento(BaseModel):
+    tipo_evento: Literal[
+        "monetario", "fiscal", "regulatorio", "corporativo", "externo",
+        "sindical_social", "judicial", "electoral", "otro", "desconocido"
+    ]
+    shock: Literal["positivo", "negativo", "mixto", "neutro", "desconocido"]
+    caracter: Literal["retroactivo", "vigente", "prospectivo", "desconocido"]
+    horizonte_dias: Optional[int] = None
+
+
+class CalidadFuente(BaseModel):
+    categoria: Literal["oficial", "periodistica", "rumor", "analisis", "desconocido"]
+    calidad_fuente_score: float
+
+
+class NewFeatures(BaseModel):
+    # Metadatos
+    diario: Optional[str]
+    fecha: Optional[str]
+    seccion: Optional[str]
+    url: Optional[str]
+
+    # Núcleo
+    entidades: Entidades
+    evento: Evento
+    mercado: SeñalesMercado
+    optimismos: Optimismos
+    tematicas: Tematicas
+
+    # Calidad / confianza
+    calidad_fuente: CalidadFuente
+    confianza: float
+
+    # Evidencia
+    evidencia: Evidencia
+
+
+class NewFeaturesLote(BaseModel):
+    """Respuesta de una request con varias notas (una entrada por nota, en el mismo orden)."""
+    notas: List[NewFeatures]
+
+
+SYSTEM_PROMPT = """Eres un analista económico-financiero especializado en Argentina.
+Objetivo: extraer datos estructurados y auditables para modelar el MERVAL a partir de noticias.
+Instrucciones:
+- Usa SOLO la información presente en el texto de la noticia.
+- Si la evidencia es insuficiente, devuelve "unknown" donde corresponda y establece confianza baja (<=0.3).
+- Escalas: dirección [-1..1], magnitud [0..1], optimismos/apoyo [0..1], confianza [0..1].
+- Horizonte en días (entero) si el texto sugiere timing; en caso contrario "unknown".
+- Calidad de fuente: oficial/comunicado (0.9–1), periodística (0.6–0.8), análisis (0.5–0.7), rumor (0.2–0.4).
+- Devuelve hasta 3 frases textuales como 'citas_evidencia' que justifiquen tus etiquetas (sin razonamientos internos).
+- No inventes valores, no cites fuentes externas al artículo.
+"""
+
+USER_TEMPLATE = """Diario: {diario}
+Fecha: {fecha}
+Seccion: {seccion}
+Titulo: {titulo}
+Contenido: {contenido}
+URL: {url}
+
+Tareas:
+1) Identifica actor principal y tipo.
+2) Clasifica el tipo de evento, shock y carácter temporal.
+3) Estima impacto direccional y magnitud esperada en: MERVAL, FX ARS, tasa BCRA, bonos soberanos.
+4) Puntúa positividad general, apoyo a la gobernanza y optimismos macro/fin (corto/largo).
+5) Marca temáticas macro (inflación, PBI, reservas, EMBI, deuda, FMI, salarios/paritarias).
+6) Extrae empresas, sectores y tickers mencionados si existieran.
+7) Estima horizonte_dias (si corresponde), calidad de fuente y confianza.
+8) Devuelve citas_evidencia (máx. 3) y un breve resumen factual en 'notas'.
+Devuelve salida en el esquema dado.
+"""
+
+
+# partes de USER_TEMPLATE para armar requests con varias notas (el template no cambia: las
+# claves del cache de las requests de una nota siguen valiendo)
+_TAREAS = USER_TEMPLATE.partition("\n\nTareas:")[2]
+LOTE_TEMPLATE = """Vas a analizar {n} noticias independientes. Trata cada una por separado.
+
+{notas}
+
+Tareas (para CADA noticia):""" + _TAREAS.replace(
+    "Devuelve salida en el esquema dado.",
+    "Devuelve salida en el esquema dado: `notas` con exactamente {n} elementos, uno por noticia, "
+    "en el mismo orden y con su URL.")
+
+
+def _valor(row, col: str) -> Any:
+    v = row.get(col) if hasattr(row, "get") else None
+    return "unknown" if v is None or (isinstance(v, float) and v != v) else v
+
+
+def build_prompt(row, max_chars: int = MAX_CHARS) -> str:
+    """Mensaje de usuario para una fila (Series o dict) del dataset consolidado."""
+    contenido = row.get("contenido") or ""
+    if isinstance(contenido, float):  # NaN
+        contenido = ""
+    return USER_TEMPLATE.format(
+        diario=_valor(row, "diario"),
+        fecha=str(_valor(row, "fecha")),
+        seccion=_valor(row, "seccion"),
+        titulo=_valor(row, "titulo"),
+        contenido=contenido[:max_chars] if max_chars else contenido,
+        url=_valor(row, "url"),
+    )
+
+
+def build_prompt_lote(rows: List, max_chars: int = MAX_CHARS) -> str:
+    """Mensaje de usuario con varias notas (esquema `NewFeaturesLote`)."""
+    bloques = []
+    for i, row in enumerate(rows, 1):
+        nota = build_prompt(row, max_chars).partition("\n\nTareas:")[0]
+        bloques.append(f"### Noticia {i}\n{nota}")
+    return LOTE_TEMPLATE.format(n=len(rows), notas="\n\n".join(bloques))
+
+
+def mensajes(prompt: str) -> List[Dict[str, str]]:
+    return [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": prompt}]
+
+
+def completar_metadatos(parsed: NewFeatures, row) -> NewFeatures:
+    """Completa los metadatos desde la fila si el modelo los dejó vacíos."""
+    parsed.diario = parsed.diario or row.get("diario")
+    parsed.fecha = parsed.fecha or str(row.get("fecha"))
+    parsed.seccion = parsed.seccion or row.get("seccion")
+    parsed.url = parsed.url or row.get("url")
+    return parsed
+
+
+def aplanar(d: Dict[str, Any], prefijo: str = "") -> Dict[str, Any]:
+    """Dict anidado -> dict plano con claves `a__b` (listas quedan como listas)."""
+    out: Dict[str, Any] = {}
+    for k, v in d.items():
+        key = f"{prefijo}{SEP}{k}" if prefijo else k
+        if isinstance(v, dict):
+            out.update(aplanar(v, key))
+        else:
+            out[key] = v
+    return out
+
+
+def _arrow_type(tp) -> pa.DataType:
+    origin = typing.get_origin(tp)
+    args = [a for a in typing.get_args(tp) if a is not type(None)]
+    if origin is typing.Union:
+        return _arrow_type(args[0])
+    if origin in (list, List):
+        return pa.list_(_arrow_type(args[0]))
+    if origin is Literal or tp is str:
+        return pa.string()
+    return {bool: pa.bool_(), int: pa.int64(), float: pa.float64()}[tp]
+
+
+def _campos(model: type, prefijo: str = "") -> List[pa.Field]:
+    fields = []
+    for name, info in model.model_fields.items():
+        key = f"{prefijo}{SEP}{name}" if prefijo else name
+        tp = info.annotation
+        if isinstance(tp, type) and issubclass(tp, BaseModel):
+            fields.extend(_campos(tp, key))
+        else:
+            fields.append(pa.field(key, _arrow_type(tp)))
+    return fields
+
+
+def arrow_schema(model: type = NewFeatures) -> pa.Schema:
+    """Esquema Arrow de las columnas aplanadas de `model`."""
+    return pa.schema(_campos(model))
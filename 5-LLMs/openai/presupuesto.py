@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Presupuesto de tokens para las notas que se mandan al LLM.
+
+Reemplaza el recorte ciego `contenido[:8000]` de `prompt-eng.ipynb`:
+
+- `limpiar()`: saca boilerplate de los diarios (firmas, "Seguí leyendo", "Mirá también",
+  bloques de notas relacionadas, créditos de foto, avisos de newsletter) y, si se le pasa un
+  `LineasRepetidas` entrenado sobre el corpus, cualquier línea que se repita en muchas notas.
+  La lista aprendida se guarda (`save`/`load`) para que el texto limpio de una nota no cambie
+  cuando el corpus crece.
+- `ajustar()`: recorta la nota a un presupuesto de tokens en bordes de párrafo (y, si el primer
+  párrafo ya no entra, en bordes de oración). Nunca corta una palabra al medio.
+- `empaquetar()`: agrupa notas cortas para mandar varias en una sola request (esquema
+  `NewFeaturesLote`), respetando un máximo de notas y de tokens por request.
+
+Los tokens se cuentan con `tiktoken` si está instalado (`o200k_base`, la codificación de los
+modelos gpt-4o / gpt-5); si no, se estiman a ~3.5 caracteres por token.
+"""
+
+import json
+import os
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, Sequence
+
+CHARS_POR_TOKEN = 3.5
+
+try:
+    import tiktoken
+except ImportError:  # dependencia opcional
+    tiktoken = None
+
+
+def contador_tokens(encoding: str = "o200k_base") -> Callable[[str], int]:
+    """Función texto -> cantidad de tokens (tiktoken, o estimación por caracteres)."""
+    if tiktoken is not None:
+        enc = tiktoken.get_encoding(encoding)
+        return lambda s: len(enc.encode(s, disallowed_special=()))
+    return lambda s: int(len(s) / CHARS_POR_TOKEN) + 1
+
+
+# líneas completas que son boilerplate (se comparan en minúsculas, sin espacios de borde)
+BOILERPLATE = [
+    r"seguí leyendo.*", r"segui leyendo.*", r"mirá también.*", r"mira tambien.*", r"leé también.*",
+    r"lee también.*", r"te puede interesar.*", r"más información.*", r"más noticias.*",
+    r"otras noticias de .*", r"conforme a los criterios de.*", r"conocé the trust project.*",
+    r"temas", r"compartir( en .*)?", r"comentar", r"suscribite.*", r"newsletter.*",
+    r"recibí .* en tu (correo|mail|email).*", r"(foto|fotos|crédito|créditos|fuente)\s*:.*",
+    r"(la nacion|clarín|clarin|página/12|pagina12|ámbito)",
+    r"escuchar (nota|noticia).*", r"publicidad", r"\d+\s*min(uto)?s? de lectura",
+]
+_BOILER_RE = re.compile(r"^(?:" + "|".join(BOILERPLATE) + r")$", re.IGNORECASE)
+# firma: "Por Nombre Apellido" (sensible a mayúsculas, para no borrar "Por qué ...")
+_FIRMA_RE = re.compile(r"^Por\s+[A-ZÁÉÍÓÚÑ][\wáéíóúñ\.]+(\s+(de\s+|del\s+|y\s+)?[A-ZÁÉÍÓÚÑ][\wáéíóúñ\.]+){0,3}$")
+_ESPACIOS = re.compile(r"[ \t ]+")
+_ORACION = re.compile(r"(?<=[\.\!\?…])\s+(?=[A-ZÁÉÍÓÚÑ¿¡\"“])")
+
+
+def parrafos(texto: str) -> List[str]:
+    return [p for p in (_ESPACIOS.sub(" ", l).strip() for l in (texto or "").splitlines()) if p]
+
+
+class LineasRepetidas:
+    """Líneas que aparecen en al menos `min_notas` notas distintas (boilerplate del sitio)."""
+
+    def __init__(self, min_notas: int = 20, max_chars: int = 200):
+        self.min_notas = min_notas
+        self.max_chars = max_chars
+        self.conteo: Counter = Counter()
+        self.lineas: set = set()
+
+    def fit(self, textos: Iterable[str]) -> "LineasRepetidas":
+        for t in textos:
+            self.conteo.update({p.lower() for p in parrafos(t) if len(p) <= self.max_chars})
+        self.lineas = {l for l, c in self.conteo.items() if c >= self.min_notas}
+        return self
+
+    def __contains__(self, linea: str) -> bool:
+        return linea.lower() in self.lineas
+
+    def save(self, path) -> None:
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"min_notas": self.min_notas, "max_chars": self.max_chars, "lineas": sorted(self.lineas)},
+                      f, ensure_ascii=False, indent=1)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path) -> "LineasRepetidas":
+        with open(path, encoding="utf-8") as f:
+            d = json.load(f)
+        rep = cls(d["min_notas"], d["max_chars"])
+        rep.lineas = set(d["lineas"])
+        return rep
+
+
+def limpiar(texto: str, repetidas: Optional[LineasRepetidas] = None) -> str:
+    """Texto sin líneas de boilerplate, un párrafo por línea."""
+    out = []
+    for p in parrafos(texto):
+        if _BOILER_RE.match(p) or _FIRMA_RE.match(p) or (repetidas is not None and p in repetidas):
+            continue
+        out.append(p)
+    return "\n".join(out)
+
+
+def ajustar(texto: str, presupuesto: int, contar: Callable[[str], int]) -> str:
+    """Los primeros párrafos de `texto` que entran en `presupuesto` tokens.
+
+    Si ni el primer párrafo entra, se toman sus primeras oraciones (y, en última instancia,
+    sus primeras palabras).
+    """
+    if contar(texto) <= presupuesto:
+        return texto
+    out: List[str] = []
+    usados = 0
+    for p in texto.split("\n"):
+        n = contar(p) + 1
+        if usados + n > presupuesto:
+            if not out:
+                out.append(_cortar_parrafo(p, presupuesto, contar))
+            break
+        out.append(p)
+        usados += n
+    return "\n".join(out)
+
+
+def _cortar_parrafo(p: str, presupuesto: int, contar: Callable[[str], int]) -> str:
+    oraciones = _ORACION.split(p)
+    acc = ""
+    for o in oraciones:
+        cand = f"{acc} {o}".strip()
+        if contar(cand) > presupuesto:
+            break
+        acc = cand
+    if acc:
+        return acc
+    palabras = p.split(" ")
+    lo, hi = 0, len(palabras)
+    while lo < hi:  # búsqueda binaria de la cantidad de palabras que entra
+        mid = (lo + hi + 1) // 2
+        if contar(" ".join(palabras[:mid])) <= presupuesto:
+            lo = mid
+        else:
+            hi = mid - 1
+    return " ".join(palabras[:lo])
+
+
+def empaquetar(tokens: Sequence[int], corta: int, max_notas: int, max_tokens: int) -> List[List[int]]:
+    """Agrupa índices de notas: las de más de `corta` tokens van solas; las cortas se juntan
+    (en orden) hasta `max_notas` notas o `max_tokens` tokens por grupo.
+    """
+    grupos: List[List[int]] = []
+    actual: List[int] = []
+    usados = 0
+    for i, n in enumerate(tokens):
+        if n > corta or max_notas <= 1:
+            grupos.append([i])
+            continue
+        if actual and (len(actual) >= max_notas or usados + n > max_tokens):
+            grupos.append(actual)
+            actual, usados = [], 0
+        actual.append(i)
+        usados += n
+    if actual:
+        grupos.append(actual)
+    return grupos
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Servidor local que imita el endpoint de structured outputs (`POST /v1/responses`).
+
+Sirve para probar y medir `extraccion.py` sin red ni costo: devuelve un `NewFeatures`
+válido (armado de forma determinística a partir del texto de la nota) con el mismo
+formato de respuesta que usa `client.responses.parse(..., text_format=NewFeatures)`.
+Si el mensaje trae varias notas (`### Noticia i`) responde un `NewFeaturesLote`.
+
+Se pueden inyectar fallas para ejercitar el backoff:
+- `latencia` (s, con jitter), `p_429` / `p_500` (probabilidad de error por request),
+- `rpm`: límite de requests por minuto del lado del servidor (429 con `Retry-After`).
+
+Uso:
+  python stub_server.py --port 8765 --latencia 0.5 --p-429 0.05
+  python extraccion.py --base-url http://127.0.0.1:8765/v1 ...
+  (o directamente `python extraccion.py --stub`, que lo levanta en el mismo proceso)
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+import zlib
+from collections import deque
+from typing import Optional
+
+from aiohttp import web
+
+from features import NewFeatures
+
+PALABRAS = {
+    "menciona_inflacion": ("inflación", "ipc", "precios"),
+    "menciona_pbi": ("pbi", "actividad", "emae"),
+    "menciona_reservas": ("reservas",),
+    "menciona_embi": ("riesgo país", "embi"),
+    "menciona_deuda": ("deuda", "bonos"),
+    "menciona_fmi": ("fmi", "fondo monetario"),
+    "menciona_salarios_paritarias": ("salario", "paritaria"),
+}
+
+
+def _campo(texto: str, nombre: str) -> Optional[str]:
+    for line in texto.splitlines():
+        if line.startswith(nombre + ":"):
+            v = line.split(":", 1)[1].strip()
+            return None if v in ("", "unknown") else v
+    return None
+
+
+def features_falsas(texto: str) -> dict:
+    """`NewFeatures` determinístico (mismo texto -> misma salida) y válido para el esquema."""
+    low = texto.lower()
+    rng = random.Random(zlib.crc32(texto.encode("utf-8")))
+
+    def imp():
+        return {"direccion": round(rng.uniform(-1, 1), 2), "magnitud": round(rng.random(), 2)}
+
+    oraciones = [s.strip() for s in _campo(texto, "Contenido").split(".")] if _campo(texto, "Contenido") else []
+    feats = {
+        "diario": _campo(texto, "Diario"), "fecha": _campo(texto, "Fecha"),
+        "seccion": _campo(texto, "Seccion"), "url": _campo(texto, "URL"),
+        "entidades": {"tipo_actor_principal": "gobierno_nacional" if "gobierno" in low else "desconocido",
+                      "nombre_actor_principal": "unknown", "empresas_mencionadas": [],
+                      "tickers_mencionados": [], "sectores_mencionados": []},
+        "evento": {"tipo_evento": "monetario" if "bcra" in low else "otro", "shock": "neutro",
+                   "caracter": "vigente", "horizonte_dias": None},
+        "mercado": {"merval": imp(), "fx_ars": imp(), "tasa_bcra": imp(), "bonos_soberanos": imp()},
+        "optimismos": {k: round(rng.random(), 2) for k in (
+            "positividad_general", "apoyo_gobernanza", "optimismo_macro_corto", "optimismo_macro_largo",
+            "optimismo_fin_corto", "optimismo_fin_largo")},
+        "tematicas": {k: any(p in low for p in ps) for k, ps in PALABRAS.items()},
+        "calidad_fuente": {"categoria": "periodistica", "calidad_fuente_score": 0.7},
+        "confianza": round(rng.uniform(0.3, 0.9), 2),
+        "evidencia": {"citas_evidencia": [o for o in oraciones if o][:3], "notas": None},
+    }
+    return NewFeatures.model_validate(feats).model_dump()
+
+
+def respuesta(model: str, text: str, input_tokens: int) -> dict:
+    output_tokens = max(1, len(text) // 4)
+    return {
+        "id": f"resp_{uuid.uuid4().hex}", "object": "response", "created_at": int(time.time()),
+        "model": model, "status": "completed", "parallel_tool_calls": True, "tool_choice": "auto",
+        "tools": [], "output": [{
+            "type": "message", "id": f"msg_{uuid.uuid4().hex}", "status": "completed", "role": "assistant",
+            "content": [{"type": "output_text", "text": text, "annotations": []}],
+        }],
+        "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                  "total_tokens": input_tokens + output_tokens,
+                  "input_tokens_details": {"cached_tokens": 0},
+                  "output_tokens_details": {"reasoning_tokens": 0}},
+    }
+
+
+def error(status: int, msg: str, retry_after: Optional[float] = None) -> web.Response:
+    headers = {"retry-after": f"{retry_after:.2f}"} if retry_after else None
+    body = {"error": {"message": msg, "type": "stub_error", "code": str(status)}}
+    return web.json_response(body, status=status, headers=headers)
+
+
+def crear_app(latencia: float = 0.2, p_429: float = 0.0, p_500: float = 0.0, rpm: int = 0) -> web.Application:
+    ventana: deque = deque()
+    stats = {"requests": 0, "429": 0, "500": 0}
+
+    async def responses(request: web.Request) -> web.Response:
+        stats["requests"] += 1
+        body = await request.json()
+        now = time.monotonic()
+        if rpm:
+            while ventana and now - ventana[0] > 60:
+                ventana.popleft()
+            if len(ventana) >= rpm:
+                stats["429"] += 1
+                return error(429, "Rate limit (rpm) del stub", retry_after=60 - (now - ventana[0]))
+            ventana.append(now)
+        r = random.random()
+        if r < p_429:
+            stats["429"] += 1
+            return error(429, "Rate limit simulado", retry_after=0.5)
+        if r < p_429 + p_500:
+            stats["500"] += 1
+            return error(500, "Error interno simulado")
+
+        await asyncio.sleep(max(0.0, random.gauss(latencia, latencia / 4)))
+        texto = "\n".join(m["content"] if isinstance(m["content"], str) else json.dumps(m["content"])
+                          for m in body.get("input", []) if m.get("role") == "user")
+        bloques = re.split(r"^### Noticia \d+\n", texto, flags=re.MULTILINE)[1:]
+        if bloques:  # request con varias notas (`NewFeaturesLote`)
+            out = json.dumps({"notas": [features_falsas(b) for b in bloques]}, ensure_ascii=False)
+        else:
+            out = json.dumps(features_falsas(texto), ensure_ascii=False)
+        n_in = sum(len(str(m.get("content", ""))) for m in body.get("input", [])) // 4
+        return web.json_response(respuesta(body.get("model", "stub"), out, n_in))
+
+    app = web.Application(client_max_size=32 * 1024 ** 2)
+    app.router.add_post("/v1/responses", responses)
+    app["stats"] = stats
+    return app
+
+
+async def iniciar(port: int = 0, **kwargs):
+    """Levanta el stub en 127.0.0.1 (port 0 = libre). Devuelve (runner, base_url)."""
+    runner = web.AppRunner(crear_app(**kwargs))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/v1"
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Stub local del endpoint /v1/responses.")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latencia", type=float, default=0.2, help="Latencia media por request (s)")
+    ap.add_argument("--p-429", type=float, default=0.0)
+    ap.add_argument("--p-500", type=float, default=0.0)
+    ap.add_argument("--rpm", type=int, default=0, help="Límite de requests/min (0 = sin límite)")
+    args = ap.parse_args()
+    web.run_app(crear_app(args.latencia, args.p_429, args.p_500, args.rpm), host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()